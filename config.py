@@ -10,8 +10,113 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 SMMBOX_API_TOKEN = os.getenv('SMMBOX_API_TOKEN')
 SMMBOX_API_URL = 'https://smmbox.com/api/v1'
 
+# Пул соединений к SMMBox (асинхронный клиент)
+SMMBOX_POOL_SIZE = int(os.getenv('SMMBOX_POOL_SIZE', '20'))  # Максимум одновременных соединений
+SMMBOX_KEEPALIVE_TIMEOUT = int(os.getenv('SMMBOX_KEEPALIVE_TIMEOUT', '30'))  # Сколько держать простаивающее соединение (сек)
+SMMBOX_CONNECT_TIMEOUT = int(os.getenv('SMMBOX_CONNECT_TIMEOUT', '10'))  # Таймаут на установку соединения (сек)
+SMMBOX_REQUEST_TIMEOUT = int(os.getenv('SMMBOX_REQUEST_TIMEOUT', '30'))  # Таймаут на весь запрос (сек)
+
+# Куда публиковать каждое видео: пусто - первая VK группа; "vk" - все VK группы; "all" - все группы;
+# или список через запятую: "vk:123,ok:456,Мой канал" (соцсеть:id или название группы)
+SMMBOX_TARGET_GROUPS = os.getenv('SMMBOX_TARGET_GROUPS', '')
+# Сколько секунд держать в кеше VK группу, чтобы не запрашивать /groups перед каждым постом
+SMMBOX_GROUPS_CACHE_TTL = int(os.getenv('SMMBOX_GROUPS_CACHE_TTL', '600'))
+
+# Повторы запросов к SMMBox и автомат отключения при его недоступности
+SMMBOX_RETRY_BASE_DELAY = float(os.getenv('SMMBOX_RETRY_BASE_DELAY', '1'))  # Пауза после первой неудачи, дальше удваивается (сек)
+SMMBOX_RETRY_MAX_DELAY = float(os.getenv('SMMBOX_RETRY_MAX_DELAY', '30'))  # Максимальная пауза между повторами (сек)
+SMMBOX_BREAKER_FAILURE_THRESHOLD = int(os.getenv('SMMBOX_BREAKER_FAILURE_THRESHOLD', '5'))  # Ошибок подряд до отключения
+SMMBOX_BREAKER_RESET_TIMEOUT = float(os.getenv('SMMBOX_BREAKER_RESET_TIMEOUT', '60'))  # Через сколько пробовать снова (сек)
+
+# Ограничение частоты запросов к SMMBox (на стороне бота)
+SMMBOX_RATE_LIMIT = float(os.getenv('SMMBOX_RATE_LIMIT', '3'))  # Запросов в секунду на все методы (0 - без ограничения)
+SMMBOX_RATE_BURST = int(os.getenv('SMMBOX_RATE_BURST', '5'))  # Сколько запросов можно отправить подряд
+# Лимиты отдельных методов: "/posts/postpone=1:3,/groups=0.5" (путь=запросов в секунду[:запас])
+SMMBOX_ENDPOINT_RATE_LIMITS = os.getenv('SMMBOX_ENDPOINT_RATE_LIMITS', '')
+
+# Сколько постов отправлять одним запросом /posts/postpone
+SMMBOX_BATCH_SIZE = int(os.getenv('SMMBOX_BATCH_SIZE', '10'))
+
+# Сверка расписания с реальной очередью отложенных постов SMMBox
+SMMBOX_POSTPONED_PATH = os.getenv('SMMBOX_POSTPONED_PATH', '/posts/postponed')  # Метод API со списком отложенных постов
+SMMBOX_SYNC_INTERVAL = int(os.getenv('SMMBOX_SYNC_INTERVAL', '900'))  # Как часто сверяться (сек)
+
+# Пул потоков для блокирующих вызовов (yt-dlp, перевод, SQLite)
+EXECUTOR_MAX_WORKERS = int(os.getenv('EXECUTOR_MAX_WORKERS', '32'))
+# Сколько одновременных вызовов разрешено каждому сервису
+EXECUTOR_LIMITS = {
+    'extract': int(os.getenv('EXTRACT_CONCURRENCY', '8')),
+    'translate': int(os.getenv('TRANSLATE_CONCURRENCY', '8')),  # Клиенты переводчиков у каждого потока свои
+    'db': int(os.getenv('DB_CONCURRENCY', '1')),  # SQLite пишет в один поток
+}
+
+# Пул процессов yt-dlp (0 - извлекать прямо в процессе бота)
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+EXTRACTION_MAX_JOBS_PER_WORKER = int(os.getenv('EXTRACTION_MAX_JOBS_PER_WORKER', '50'))  # После скольких задач заменять воркер новым
+EXTRACTION_MAX_RSS_MB = int(os.getenv('EXTRACTION_MAX_RSS_MB', '500'))  # Лимит памяти воркера (МБ)
+EXTRACTION_TIMEOUT = int(os.getenv('EXTRACTION_TIMEOUT', '120'))  # Максимальное время одного извлечения (сек)
+
+# Кеш информации о видео (ключ - платформа + ID видео)
+METADATA_CACHE_DB = os.getenv('METADATA_CACHE_DB', 'video_cache.db')
+METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', str(7 * 24 * 3600)))  # Срок жизни метаданных (сек)
+MEDIA_URL_TTL = int(os.getenv('MEDIA_URL_TTL', '3600'))  # Срок жизни прямой ссылки, если в ней нет expire (сек)
+MEDIA_URL_REFRESH_MARGIN = int(os.getenv('MEDIA_URL_REFRESH_MARGIN', '300'))  # Обновлять ссылку заранее, за столько секунд (сек)
+
+# Переводчики в порядке предпочтения (google, mymemory, libre)
+TRANSLATION_BACKENDS = [name.strip() for name in os.getenv('TRANSLATION_BACKENDS', 'google,mymemory').split(',') if name.strip()]
+TRANSLATION_HEDGE_DELAY = float(os.getenv('TRANSLATION_HEDGE_DELAY', '2.0'))  # Через сколько секунд дублировать запрос, пока нет статистики p95
+TRANSLATION_HEDGE_MIN_DELAY = float(os.getenv('TRANSLATION_HEDGE_MIN_DELAY', '0.3'))  # Не дублировать раньше (сек)
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', '10'))  # Максимальное время перевода (сек)
+TRANSLATION_BACKEND_MAX_FAILURES = int(os.getenv('TRANSLATION_BACKEND_MAX_FAILURES', '3'))  # Ошибок подряд до понижения переводчика
+TRANSLATION_BACKEND_COOLDOWN = int(os.getenv('TRANSLATION_BACKEND_COOLDOWN', '60'))  # На сколько понижать (сек)
+LIBRE_TRANSLATE_URL = os.getenv('LIBRE_TRANSLATE_URL')
+LIBRE_TRANSLATE_API_KEY = os.getenv('LIBRE_TRANSLATE_API_KEY')
+
+# Пакетный перевод
+TRANSLATE_BATCH_MAX_CHARS = int(os.getenv('TRANSLATE_BATCH_MAX_CHARS', '4500'))  # Google принимает до 5000 символов за запрос
+TRANSLATE_BATCH_CONCURRENCY = int(os.getenv('TRANSLATE_BATCH_CONCURRENCY', '4'))  # Сколько пачек переводить одновременно
+
+# Кеш переводов (SQLite + LRU в памяти)
+TRANSLATION_CACHE_DB = os.getenv('TRANSLATION_CACHE_DB', 'translation_cache.db')
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.getenv('TRANSLATION_CACHE_MEMORY_SIZE', '1024'))  # Записей в памяти
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv('TRANSLATION_CACHE_MAX_ENTRIES', '50000'))  # Записей на диске
+
 # Настройки постинга
-POSTS_PER_DAY = 6
+POSTS_PER_DAY = int(os.getenv('POSTS_PER_DAY', '6'))
+# Окна публикаций: "8-22" для всех дней или по дням недели "mon-fri=8-22;sat,sun=10:30-23"
+POSTING_WINDOWS = os.getenv('POSTING_WINDOWS', '8-22')
+SLOT_INTERVAL_HOURS = float(os.getenv('SLOT_INTERVAL_HOURS', '2'))  # Желаемый интервал между постами (часы)
+SLOT_PLAN_HORIZON_DAYS = int(os.getenv('SLOT_PLAN_HORIZON_DAYS', '60'))  # На сколько дней вперёд держать сетку слотов
+
+# Очередь публикаций (таблица publish_jobs в базе планировщика)
+PUBLISH_WORKERS = int(os.getenv('PUBLISH_WORKERS', '2'))  # Сколько публикаций идёт одновременно
+PUBLISH_MAX_ATTEMPTS = int(os.getenv('PUBLISH_MAX_ATTEMPTS', '5'))  # Попыток на задачу до отказа
+PUBLISH_RETRY_DELAY = int(os.getenv('PUBLISH_RETRY_DELAY', '30'))  # Пауза перед повтором, удваивается с каждой попыткой (сек)
+# Через сколько задачу упавшего воркера заберёт другой (сек). Живой воркер продлевает аренду,
+# а по умолчанию её хватает на пачку, где каждая задача упирается в таймауты извлечения и SMMBox
+PUBLISH_LEASE_SECONDS = int(os.getenv(
+    'PUBLISH_LEASE_SECONDS',
+    str(max(300, SMMBOX_BATCH_SIZE * (EXTRACTION_TIMEOUT + SMMBOX_REQUEST_TIMEOUT)))
+))
+PUBLISH_POLL_INTERVAL = float(os.getenv('PUBLISH_POLL_INTERVAL', '5'))  # Как часто воркеры проверяют очередь без сигнала (сек)
+
+# Пакетная загрузка ссылок (/batch и .txt со списком)
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '500'))  # Сколько ссылок принимать за раз
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))  # Сколько видео извлекать одновременно
+BATCH_PROGRESS_INTERVAL = float(os.getenv('BATCH_PROGRESS_INTERVAL', '3'))  # Не чаще раза в столько секунд обновлять сообщение прогресса
+
+# Отслеживание каналов и профилей (/track)
+SOURCE_POLL_INTERVAL = int(os.getenv('SOURCE_POLL_INTERVAL', '1800'))  # Как часто проверять новые видео (сек)
+SOURCE_SCAN_LIMIT = int(os.getenv('SOURCE_SCAN_LIMIT', '50'))  # Сколько записей списка читать за проверку
+SOURCE_INITIAL_LIMIT = int(os.getenv('SOURCE_INITIAL_LIMIT', '10'))  # Сколько последних видео взять при добавлении источника
+SOURCE_STOP_AFTER_KNOWN = int(os.getenv('SOURCE_STOP_AFTER_KNOWN', '5'))  # После скольких известных видео подряд остановить чтение
+SOURCE_FAILED_RETRY_INTERVAL = int(os.getenv('SOURCE_FAILED_RETRY_INTERVAL', '86400'))  # Через сколько снова пробовать видео, которое не удалось извлечь (сек)
+
+# Обслуживание базы планировщика
+RETENTION_POSTED_DAYS = int(os.getenv('RETENTION_POSTED_DAYS', '30'))  # Через сколько дней переносить опубликованные посты в архив
+FAILED_SLOT_EXPIRY_HOURS = int(os.getenv('FAILED_SLOT_EXPIRY_HOURS', '24'))  # Через сколько часов освобождать failed-слоты
+COMPACTION_INTERVAL_HOURS = float(os.getenv('COMPACTION_INTERVAL_HOURS', '6'))  # Как часто запускать обслуживание
+VACUUM_INTERVAL_HOURS = float(os.getenv('VACUUM_INTERVAL_HOURS', '168'))  # Как часто сжимать базу (VACUUM)
 
 # Проверка наличия обязательных переменных
 if not TELEGRAM_BOT_TOKEN:
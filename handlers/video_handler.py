@@ -1,25 +1,66 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
 
-from config import POSTS_PER_DAY
+from config import (
+    POSTS_PER_DAY,
+    POSTING_WINDOWS,
+    SLOT_INTERVAL_HOURS,
+    SLOT_PLAN_HORIZON_DAYS,
+    EXTRACTION_WORKERS,
+)
 from services.video_downloader import VideoDownloader
 from services.translator import Translator
-from services.smmbox_api import SMMBoxAPI
+from services.translation_cache import TranslationCache
+from services.smmbox_api import AsyncSMMBoxAPI
 from services.scheduler import PostScheduler
+from services.slot_plan import SlotPlanner, parse_posting_windows
+from services.executor import BlockingExecutor
+from services.extraction_pool import ExtractionPool
+from services.metadata_cache import VideoMetadataCache
+from services.publish_queue import PublishQueue
+from services.publisher import PublishWorkers
+from services.retry_policy import CircuitOpenError
+from services.batch_ingest import BatchIngestor, extract_urls
+from services.source_tracker import SourceStore, SourceTracker
 from utils.keyboards import get_title_confirmation_keyboard, get_cancel_keyboard
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 # Инициализация сервисов
-video_downloader = VideoDownloader()
-translator = Translator()
-smmbox_api = SMMBoxAPI()
-scheduler = PostScheduler(posts_per_day=POSTS_PER_DAY)
+# yt-dlp работает в отдельных процессах, чтобы не держать GIL и память бота
+extraction_pool = ExtractionPool() if EXTRACTION_WORKERS > 0 else None
+video_downloader = VideoDownloader(
+    extraction_pool=extraction_pool,
+    metadata_cache=VideoMetadataCache()
+)
+translator = Translator(cache=TranslationCache())
+smmbox_api = AsyncSMMBoxAPI()
+slot_planner = SlotPlanner(
+    posts_per_day=POSTS_PER_DAY,
+    windows=parse_posting_windows(POSTING_WINDOWS),
+    interval_hours=SLOT_INTERVAL_HOURS,
+    horizon_days=SLOT_PLAN_HORIZON_DAYS
+)
+slot_planner.warm_up()
+scheduler = PostScheduler(posts_per_day=POSTS_PER_DAY, slot_planner=slot_planner)
+# Все блокирующие вызовы сервисов идут через общий пул, чтобы не останавливать event loop
+executor = BlockingExecutor()
+# Публикация идёт в фоне: обработчики только ставят задачу в очередь (воркеры запускает main.py)
+publish_queue = PublishQueue()
+publish_workers = PublishWorkers(publish_queue, scheduler, smmbox_api, video_downloader, executor)
+# Пакетная загрузка (/batch): извлечение и перевод конвейером, публикация - через очередь
+batch_ingestor = BatchIngestor(video_downloader, translator, publish_queue, publish_workers, smmbox_api, executor)
+# Отслеживание каналов (/track): новые видео уходят в пакетную загрузку (опрос запускает main.py)
+source_store = SourceStore()
+source_tracker = SourceTracker(source_store, video_downloader, scheduler, publish_queue, batch_ingestor, executor)
+
+# Максимальный размер .txt со ссылками
+BATCH_FILE_MAX_BYTES = 1024 * 1024
 
 
 class VideoUploadStates(StatesGroup):
@@ -27,6 +68,7 @@ class VideoUploadStates(StatesGroup):
     waiting_for_title_confirmation = State()
     waiting_for_custom_title = State()
     uploading = State()
+    waiting_for_batch = State()
 
 
 @router.message(Command("start"))
@@ -44,6 +86,9 @@ async def cmd_start(message: Message, state: FSMContext):
         "Я переведу название и загружу видео в твою VK группу!\n\n"
         "📊 Команды:\n"
         "/stats - статистика очереди постов\n"
+        "/batch - загрузить сразу много ссылок (списком или .txt файлом)\n"
+        "/track - отслеживать канал или профиль автора\n"
+        "/sources - отслеживаемые каналы\n"
         "/cancel - отменить текущую операцию"
     )
 
@@ -53,13 +98,28 @@ async def cmd_stats(message: Message):
     """
     Показать статистику очереди постов
     """
-    stats = scheduler.get_stats()
+    stats = await executor.run('db', scheduler.get_stats)
+    publishing = await executor.run('db', publish_queue.count_active)
+    limiter = smmbox_api.rate_limiter.get_stats()
+    
+    # Гистограмма очереди на неделю вперёд
+    weekdays = ['пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс']
+    limit = stats['posts_per_day_limit']
+    histogram = "\n".join(
+        f"<code>{day.strftime('%d.%m')} {weekdays[day.weekday()]} "
+        f"{'█' * min(count, limit)}{'░' * max(limit - count, 0)} {count}/{limit}</code>"
+        for day, count in stats['week']
+    )
     
     await message.answer(
         f"📊 <b>Статистика очереди постов</b>\n\n"
         f"📅 Сегодня: {stats['today']}/{stats['posts_per_day_limit']}\n"
         f"📅 Завтра: {stats['tomorrow']}/{stats['posts_per_day_limit']}\n"
-        f"📦 Всего в очереди: {stats['total_pending']}\n\n"
+        f"📦 Всего в очереди: {stats['total_scheduled']}\n"
+        f"📥 Ждут публикации в SMMBox: {publishing}\n"
+        f"🚦 Запросов к SMMBox: {limiter['requests']}, ждут лимита: {limiter['waiting']}, "
+        f"среднее ожидание {limiter['avg_wait']:.1f} с, 429: {limiter['rate_limited']}\n\n"
+        f"🗓 <b>На неделю вперёд:</b>\n{histogram}\n\n"
         f"⚙️ Лимит: {stats['posts_per_day_limit']} постов в день",
         parse_mode="HTML"
     )
@@ -74,6 +134,170 @@ async def cmd_cancel(message: Message, state: FSMContext):
     await message.answer("❌ Операция отменена. Отправь новую ссылку для загрузки.")
 
 
+@router.message(Command("batch"))
+async def cmd_batch(message: Message, command: CommandObject, state: FSMContext):
+    """
+    Пакетная загрузка: ссылки сразу после команды или следующим сообщением / .txt файлом
+    """
+    await state.clear()
+    
+    if command.args:
+        await start_batch(message, command.args)
+        return
+    
+    await message.answer(
+        "📦 Отправь список ссылок (по одной на строку) или .txt файл со ссылками.\n\n"
+        f"За раз - до {batch_ingestor.max_urls} ссылок. Названия переведутся и подтвердятся автоматически.",
+        reply_markup=get_cancel_keyboard()
+    )
+    await state.set_state(VideoUploadStates.waiting_for_batch)
+
+
+@router.message(Command("track"))
+async def cmd_track(message: Message, command: CommandObject, state: FSMContext):
+    """
+    Начать отслеживать канал YouTube (Shorts), профиль TikTok/Instagram или плейлист
+    """
+    await state.clear()
+    url = (command.args or '').strip()
+    
+    platform = video_downloader.get_platform_for_source(url) if url else None
+    if not platform:
+        await message.answer(
+            "📡 Отправь команду со ссылкой на автора:\n"
+            "/track https://www.youtube.com/@channel\n\n"
+            "Поддерживаются: каналы и плейлисты YouTube, профили TikTok и Instagram"
+        )
+        return
+    
+    source, created = await executor.run('db', source_store.add, message.chat.id, url, platform.get_platform_name())
+    if not created:
+        await message.answer(f"📡 Источник уже отслеживается (#{source['id']}).")
+        return
+    
+    await message.answer(
+        f"📡 Отслеживаю источник #{source['id']}: {url}\n"
+        f"Новые видео будут проверяться каждые {source_tracker.poll_interval // 60} мин."
+    )
+    
+    if batch_ingestor.is_running(message.chat.id):
+        return
+    
+    try:
+        found = await source_tracker.poll(source)
+    except Exception as e:
+        logger.error(f"Ошибка первого опроса источника {url}: {e}")
+        await message.answer("⚠️ Не удалось получить список видео, попробую при следующей проверке.")
+        return
+    
+    if not found:
+        await message.answer("Новых видео пока нет.")
+
+
+@router.message(Command("sources"))
+async def cmd_sources(message: Message):
+    """
+    Список отслеживаемых источников
+    """
+    sources = await executor.run('db', source_store.list_for_chat, message.chat.id)
+    
+    if not sources:
+        await message.answer("📡 Нет отслеживаемых источников. Добавь: /track ссылка")
+        return
+    
+    lines = "\n".join(f"#{source['id']} {source['platform']}: {source['url']}" for source in sources)
+    await message.answer(f"📡 Отслеживаемые источники:\n{lines}\n\nУдалить: /untrack номер")
+
+
+@router.message(Command("untrack"))
+async def cmd_untrack(message: Message, command: CommandObject):
+    """
+    Перестать отслеживать источник
+    """
+    try:
+        source_id = int((command.args or '').strip().lstrip('#'))
+    except ValueError:
+        await message.answer("Укажи номер источника из /sources, например: /untrack 3")
+        return
+    
+    if await executor.run('db', source_store.remove, message.chat.id, source_id):
+        await message.answer(f"✅ Источник #{source_id} больше не отслеживается.")
+    else:
+        await message.answer(f"❌ Источник #{source_id} не найден.")
+
+
+@router.message(VideoUploadStates.waiting_for_batch)
+async def process_batch_list(message: Message, state: FSMContext):
+    """
+    Список ссылок для пакетной загрузки (текстом или файлом)
+    """
+    text = await read_batch_text(message)
+    if text is None:
+        return
+    
+    await state.clear()
+    await start_batch(message, text)
+
+
+@router.message(StateFilter(None), F.document)
+async def handle_batch_file(message: Message):
+    """
+    .txt файл со ссылками без команды /batch
+    """
+    text = await read_batch_text(message)
+    if text is not None:
+        await start_batch(message, text)
+
+
+async def read_batch_text(message: Message):
+    """
+    Получить текст со ссылками из сообщения или приложенного .txt файла
+    
+    Returns:
+        Текст или None, если пользователю уже ответили об ошибке
+    """
+    document = message.document
+    if not document:
+        return message.text or message.caption or ""
+    
+    if not (document.file_name or '').lower().endswith('.txt') and document.mime_type != 'text/plain':
+        await message.answer("❌ Пришли .txt файл со ссылками (по одной на строку).")
+        return None
+    
+    if document.file_size and document.file_size > BATCH_FILE_MAX_BYTES:
+        await message.answer("❌ Файл слишком большой, максимум 1 МБ.")
+        return None
+    
+    content = await message.bot.download(document)
+    return content.read().decode('utf-8', errors='replace')
+
+
+async def start_batch(message: Message, text: str):
+    """
+    Запустить пакетную загрузку ссылок из text и показать сообщение прогресса
+    """
+    urls = extract_urls(text)
+    
+    if not urls:
+        await message.answer("❌ Не нашёл ни одной ссылки. Отправь ссылки по одной на строку.")
+        return
+    
+    if len(urls) > batch_ingestor.max_urls:
+        await message.answer(f"❌ Слишком много ссылок: {len(urls)}. За раз - до {batch_ingestor.max_urls}.")
+        return
+    
+    if batch_ingestor.is_running(message.chat.id):
+        await message.answer("⏳ Предыдущая пакетная загрузка ещё идёт. Дождись её завершения.")
+        return
+    
+    progress_msg = await message.answer(f"📦 Принято ссылок: {len(urls)}. Начинаю обработку...")
+    
+    async def report(text: str):
+        await progress_msg.edit_text(text, parse_mode="HTML")
+    
+    batch_ingestor.start(message.chat.id, progress_msg.message_id, urls, report)
+
+
 @router.message(StateFilter(None))
 async def handle_video_url(message: Message, state: FSMContext):
     """
@@ -89,6 +313,14 @@ async def handle_video_url(message: Message, state: FSMContext):
         )
         return
     
+    # Ссылка на автора, а не на видео
+    if video_downloader.is_source_url(url):
+        await message.answer(
+            "📡 Это ссылка на канал или профиль.\n\n"
+            f"Чтобы загружать новые видео автора автоматически, отправь:\n/track {url}"
+        )
+        return
+    
     # Проверяем, поддерживается ли платформа
     if not video_downloader.is_valid_url(url):
         await message.answer(
@@ -100,8 +332,10 @@ async def handle_video_url(message: Message, state: FSMContext):
     # Отправляем сообщение о загрузке
     processing_msg = await message.answer("⏳ Получаю информацию о видео...")
     
-    # Получаем информацию о видео
-    video_info = video_downloader.get_video_info(url)
+    # Получаем информацию о видео (если эту же ссылку сейчас обрабатывают для другого
+    # редактора, ждём то же извлечение и тот же перевод, а не запускаем свои)
+    video_key = video_downloader.get_video_key(url)
+    video_info = await executor.run_shared('extract', video_key, video_downloader.get_video_info, url)
     
     if not video_info:
         await processing_msg.edit_text(
@@ -114,7 +348,7 @@ async def handle_video_url(message: Message, state: FSMContext):
     original_title = video_info['title']
     await processing_msg.edit_text(f"📝 Оригинальное название: {original_title}\n\n⏳ Перевожу...")
     
-    translated_title = translator.translate_to_russian(original_title)
+    translated_title = await executor.run_shared('translate', video_key, translator.translate_to_russian, original_title)
     
     # Сохраняем данные в состояние
     await state.update_data(
@@ -137,83 +371,63 @@ async def handle_video_url(message: Message, state: FSMContext):
     await state.set_state(VideoUploadStates.waiting_for_title_confirmation)
 
 
-@router.callback_query(F.data == "title_confirm", VideoUploadStates.waiting_for_title_confirmation)
-async def confirm_title(callback: CallbackQuery, state: FSMContext):
-    """
-    Подтверждение названия и загрузка видео
+async def enqueue_publish(status_message: Message, state: FSMContext, title: str):
     """
-    await callback.answer()
-    await callback.message.edit_text("📅 Планирую публикацию...")
+    Поставить видео из состояния в очередь публикаций и сразу ответить пользователю
     
-    # Получаем данные из состояния
+    Публикуют фоновые воркеры (services/publisher.py): они обновят status_message,
+    когда пост попадёт в отложенные, даже если бот за это время перезапустится.
+    На каждую группу из SMMBOX_TARGET_GROUPS ставится своя задача.
+    """
     data = await state.get_data()
-    video_info = data['video_info']
-    title = data['translated_title']
-    
-    # Добавляем в планировщик
-    schedule_info = scheduler.add_post(
-        video_url=video_info['url'],
-        video_title=title,
-        platform=video_info.get('platform', 'Unknown')
-    )
     
-    # Публикуем видео с текстом на стену (VK конвертирует в клип)
-    # Пробуем до 3 раз если время занято
-    result = None
-    for attempt in range(3):
-        result = smmbox_api.post_video_clip_to_wall(
-            video_url=video_info['url'],
-            title=title,
-            scheduled_timestamp=schedule_info['scheduled_timestamp'],
-            preview_url=video_info.get('thumbnail')
-        )
-        
-        if result:
-            break  # Успех!
-        
-        # Если не успех, помечаем слот как занятый и пробуем следующий
-        scheduler.mark_as_failed(schedule_info['id'])
-        logger.info(f"Попытка {attempt + 1}/3: время занято, пробую следующий слот...")
-        
-        # Получаем новый слот
-        schedule_info = scheduler.add_post(
-            video_url=video_info['url'],
-            video_title=title,
-            platform=video_info.get('platform', 'Unknown')
-        )
+    try:
+        targets = await smmbox_api.get_target_groups()
+    except CircuitOpenError:
+        targets = []
+    # Группы сейчас не получить - воркер возьмёт первую VK группу сам
+    groups = targets or [None]
     
-    # Получаем статистику
-    stats = scheduler.get_stats()
-    scheduled_dt = schedule_info['scheduled_datetime']
-    
-    if result:
-        # Отмечаем как опубликованное
-        scheduler.mark_as_posted(schedule_info['id'])
-        
-        await callback.message.edit_text(
-            f"✅ Видео добавлено в отложенные!\n\n"
-            f"📝 Название: <b>{title}</b>\n"
-            f"🎬 Платформа: {video_info.get('platform', 'Unknown')}\n"
-            f"📅 Запланировано на: <b>{scheduled_dt.strftime('%d.%m.%Y в %H:%M')}</b>\n"
-            f"📌 Запись с клипом на стене\n\n"
-            f"📊 Статистика очереди:\n"
-            f"• Сегодня: {stats['today']}/{stats['posts_per_day_limit']}\n"
-            f"• Завтра: {stats['tomorrow']}/{stats['posts_per_day_limit']}\n"
-            f"• Всего в очереди: {stats['total_pending']}",
-            parse_mode="HTML"
+    job_ids = await executor.run(
+        'db',
+        publish_queue.enqueue_many,
+        chat_id=status_message.chat.id,
+        message_id=status_message.message_id,
+        video_info=data['video_info'],
+        title=title,
+        groups=groups
+    )
+    publish_workers.wake()
+    
+    if len(job_ids) > 1:
+        queued = (
+            f"📥 Видео поставлено в очередь на публикацию в {len(job_ids)} групп "
+            f"(задачи #{job_ids[0]}–#{job_ids[-1]}).\n\n"
+            f"👥 Группы: {', '.join(group.get('name', 'VK') for group in groups)}\n"
         )
     else:
-        # Помечаем последний слот как занятый
-        scheduler.mark_as_failed(schedule_info['id'])
-        
-        await callback.message.edit_text(
-            "❌ Все слоты на сегодня заняты.\n"
-            "Попробуй позже или очисти отложенные посты в SMMBox."
-        )
+        queued = f"📥 Видео поставлено в очередь на публикацию (задача #{job_ids[0]}).\n\n"
     
+    await status_message.edit_text(
+        f"{queued}"
+        f"📝 Название: <b>{title}</b>\n"
+        f"Я обновлю это сообщение, когда пост попадёт в отложенные.",
+        parse_mode="HTML"
+    )
     await state.clear()
 
 
+@router.callback_query(F.data == "title_confirm", VideoUploadStates.waiting_for_title_confirmation)
+async def confirm_title(callback: CallbackQuery, state: FSMContext):
+    """
+    Подтверждение названия и постановка видео в очередь публикаций
+    """
+    await callback.answer()
+    
+    data = await state.get_data()
+    await enqueue_publish(callback.message, state, data['translated_title'])
+
+
 @router.callback_query(F.data == "title_edit", VideoUploadStates.waiting_for_title_confirmation)
 async def edit_title(callback: CallbackQuery, state: FSMContext):
     """
@@ -241,74 +455,8 @@ async def process_custom_title(message: Message, state: FSMContext):
     # Обновляем название
     await state.update_data(translated_title=custom_title)
     
-    # Загружаем видео
     processing_msg = await message.answer("📅 Планирую публикацию...")
-    
-    data = await state.get_data()
-    video_info = data['video_info']
-    
-    # Добавляем в планировщик
-    schedule_info = scheduler.add_post(
-        video_url=video_info['url'],
-        video_title=custom_title,
-        platform=video_info.get('platform', 'Unknown')
-    )
-    
-    # Публикуем видео с текстом на стену (VK конвертирует в клип)
-    # Пробуем до 3 раз если время занято
-    result = None
-    for attempt in range(3):
-        result = smmbox_api.post_video_clip_to_wall(
-            video_url=video_info['url'],
-            title=custom_title,
-            scheduled_timestamp=schedule_info['scheduled_timestamp'],
-            preview_url=video_info.get('thumbnail')
-        )
-        
-        if result:
-            break  # Успех!
-        
-        # Если не успех, помечаем слот как занятый и пробуем следующий
-        scheduler.mark_as_failed(schedule_info['id'])
-        logger.info(f"Попытка {attempt + 1}/3: время занято, пробую следующий слот...")
-        
-        # Получаем новый слот
-        schedule_info = scheduler.add_post(
-            video_url=video_info['url'],
-            video_title=custom_title,
-            platform=video_info.get('platform', 'Unknown')
-        )
-    
-    # Получаем статистику
-    stats = scheduler.get_stats()
-    scheduled_dt = schedule_info['scheduled_datetime']
-    
-    if result:
-        # Отмечаем как опубликованное
-        scheduler.mark_as_posted(schedule_info['id'])
-        
-        await processing_msg.edit_text(
-            f"✅ Видео добавлено в отложенные!\n\n"
-            f"📝 Название: <b>{custom_title}</b>\n"
-            f"🎬 Платформа: {video_info.get('platform', 'Unknown')}\n"
-            f"📅 Запланировано на: <b>{scheduled_dt.strftime('%d.%m.%Y в %H:%M')}</b>\n"
-            f"📌 Запись с клипом на стене\n\n"
-            f"📊 Статистика очереди:\n"
-            f"• Сегодня: {stats['today']}/{stats['posts_per_day_limit']}\n"
-            f"• Завтра: {stats['tomorrow']}/{stats['posts_per_day_limit']}\n"
-            f"• Всего в очереди: {stats['total_pending']}",
-            parse_mode="HTML"
-        )
-    else:
-        # Помечаем последний слот как занятый
-        scheduler.mark_as_failed(schedule_info['id'])
-        
-        await processing_msg.edit_text(
-            "❌ Все слоты на сегодня заняты.\n"
-            "Попробуй позже или очисти отложенные посты в SMMBox."
-        )
-    
-    await state.clear()
+    await enqueue_publish(processing_msg, state, custom_title)
 
 
 @router.callback_query(F.data == "cancel")
@@ -4,7 +4,20 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import TELEGRAM_BOT_TOKEN
-from handlers.video_handler import router
+from handlers.video_handler import (
+    router,
+    smmbox_api,
+    executor,
+    extraction_pool,
+    scheduler,
+    publish_queue,
+    publish_workers,
+    batch_ingestor,
+    source_store,
+    source_tracker,
+)
+from services.maintenance import start_compaction, start_queue_sync
+from services.smmbox_api import group_key
 
 # Настройка логирования
 logging.basicConfig(
@@ -39,12 +52,57 @@ async def main():
     # Удаление вебхука и запуск polling
     await bot.delete_webhook(drop_pending_updates=True)
     
+    # Прогреваем кеш VK группы, чтобы первый пост не ждал запрос /groups
+    vk_group = await smmbox_api.warm_up()
+    
+    # Посты, запланированные до появления групп, принадлежат первой VK группе
+    if vk_group:
+        await executor.run('db', scheduler.adopt_legacy_posts, group_key(vk_group))
+    
+    # Фоновое обслуживание базы планировщика
+    compaction_task = start_compaction(scheduler, executor, publish_queue)
+    
+    # Сверка карты занятости с реальной очередью отложенных постов SMMBox
+    queue_sync_task = start_queue_sync(smmbox_api, scheduler, executor)
+    
+    # Воркеры очереди публикаций: сообщают результат, редактируя сообщение пользователя
+    async def notify(job, text):
+        try:
+            await bot.edit_message_text(text, chat_id=job['chat_id'], message_id=job['message_id'], parse_mode="HTML")
+        except Exception:
+            await bot.send_message(job['chat_id'], text, parse_mode="HTML")
+    
+    await publish_workers.start(notify)
+    
+    # Опрос отслеживаемых каналов: о новых видео сообщаем отдельным сообщением прогресса
+    async def open_progress(chat_id, text):
+        message = await bot.send_message(chat_id, text)
+        
+        async def report(progress_text):
+            await bot.edit_message_text(progress_text, chat_id=chat_id, message_id=message.message_id, parse_mode="HTML")
+        
+        return message.message_id, report
+    
+    source_tracker.start(open_progress)
+    
     logger.info("🚀 Бот запущен!")
     
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        compaction_task.cancel()
+        queue_sync_task.cancel()
+        await source_tracker.stop()
+        await batch_ingestor.stop()
+        await publish_workers.stop()
+        await smmbox_api.close()
         await bot.session.close()
+        executor.shutdown(wait=False)
+        scheduler.close()
+        publish_queue.close()
+        source_store.close()
+        if extraction_pool:
+            extraction_pool.shutdown(wait=False)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,333 @@
+import asyncio
+import html
+import logging
+import re
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import BATCH_MAX_URLS, BATCH_CONCURRENCY, BATCH_PROGRESS_INTERVAL
+from services.retry_policy import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Обновление сообщения прогресса: текст в HTML
+Reporter = Callable[[str], Awaitable]
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+
+# Сколько ошибок показывать в итоговом сообщении
+MAX_REPORTED_ERRORS = 10
+
+
+def extract_urls(text: Optional[str]) -> List[str]:
+    """
+    Найти ссылки в тексте (по одной на строку, через пробел или вперемешку с текстом)
+
+    Returns:
+        Ссылки без повторов в порядке появления
+    """
+    urls = []
+    seen = set()
+    for match in URL_PATTERN.finditer(text or ''):
+        url = match.group(0).rstrip('.,;:!?)]}')
+        if url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+class BatchIngestor:
+    """
+    Пакетная загрузка ссылок: извлечение -> перевод -> очередь публикаций
+
+    Стадии связаны ограниченными очередями asyncio, поэтому сотни ссылок
+    обрабатываются конвейером: пока одни видео извлекаются, уже полученные
+    названия переводятся пачками, а переведённые сразу уходят в PublishQueue.
+    Слоты и отправку в SMMBox берут на себя PublishWorkers (они же склеивают
+    посты в пакетные запросы). Названия подтверждаются автоматически,
+    а пользователь видит одно сообщение с прогрессом.
+    """
+
+    def __init__(
+        self,
+        video_downloader,
+        translator,
+        publish_queue,
+        publish_workers,
+        smmbox_api,
+        executor,
+        concurrency: int = BATCH_CONCURRENCY,
+        max_urls: int = BATCH_MAX_URLS,
+        progress_interval: float = BATCH_PROGRESS_INTERVAL
+    ):
+        """
+        Args:
+            video_downloader: VideoDownloader
+            translator: Translator
+            publish_queue: PublishQueue
+            publish_workers: PublishWorkers (будятся после постановки задач)
+            smmbox_api: AsyncSMMBoxAPI (группы для публикации)
+            executor: BlockingExecutor
+            concurrency: Сколько видео извлекать одновременно
+            max_urls: Сколько ссылок принимать за раз
+            progress_interval: Не чаще раза в столько секунд обновлять прогресс (сек)
+        """
+        self.video_downloader = video_downloader
+        self.translator = translator
+        self.publish_queue = publish_queue
+        self.publish_workers = publish_workers
+        self.smmbox_api = smmbox_api
+        self.executor = executor
+        self.concurrency = max(1, concurrency)
+        self.max_urls = max_urls
+        self.progress_interval = progress_interval
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def is_running(self, chat_id: int) -> bool:
+        """
+        Идёт ли в чате пакетная загрузка
+        """
+        task = self._tasks.get(chat_id)
+        return task is not None and not task.done()
+
+    def start(self, chat_id: int, message_id: int, urls: List[str], report: Reporter) -> asyncio.Task:
+        """
+        Запустить пакетную загрузку в фоне (одна на чат)
+
+        Args:
+            chat_id: Чат пользователя
+            message_id: Сообщение прогресса
+            urls: Ссылки (см. extract_urls)
+            report: Обновление сообщения прогресса
+        """
+        task = asyncio.create_task(self.run(chat_id, message_id, urls, report))
+        self._tasks[chat_id] = task
+
+        def forget(_):
+            if self._tasks.get(chat_id) is task:
+                del self._tasks[chat_id]
+
+        task.add_done_callback(forget)
+        return task
+
+    async def stop(self):
+        """
+        Прервать все пакетные загрузки (поставленные задачи публикаций остаются в очереди)
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, chat_id: int, message_id: int, urls: List[str], report: Reporter) -> Dict:
+        """
+        Провести ссылки через конвейер и дождаться их публикации
+
+        Returns:
+            Итоговый прогресс (см. _progress_text)
+        """
+        batch_id = uuid.uuid4().hex
+        progress = {
+            'total': len(urls),
+            'extracted': 0,
+            'translated': 0,
+            'queued': 0,
+            'published': 0,
+            'failed': 0,
+            'errors': [],
+            'finished': False
+        }
+
+        try:
+            targets = await self.smmbox_api.get_target_groups()
+        except CircuitOpenError:
+            targets = []
+        # Группы сейчас не получить - воркер возьмёт первую VK группу сам
+        groups = targets or [None]
+        progress['jobs_per_video'] = len(groups)
+
+        logger.info(f"Пакетная загрузка {batch_id}: {len(urls)} ссылок, групп: {len(groups)}")
+
+        url_queue: asyncio.Queue = asyncio.Queue()
+        for url in urls:
+            url_queue.put_nowait(url)
+        # Ограниченная очередь: извлечение не убегает далеко вперёд перевода
+        extracted_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 4)
+
+        reporter = asyncio.create_task(self._report_loop(batch_id, progress, report))
+        extractors = [
+            asyncio.create_task(self._extract_stage(url_queue, extracted_queue, progress))
+            for _ in range(self.concurrency)
+        ]
+        translator = asyncio.create_task(
+            self._translate_stage(extracted_queue, progress, chat_id, message_id, groups, batch_id)
+        )
+
+        try:
+            await asyncio.gather(*extractors)
+            await extracted_queue.put(None)
+            await translator
+            # Ждём, пока воркеры опубликуют (или окончательно отклонят) все задачи пакета
+            while True:
+                counts = await self.executor.run('db', self.publish_queue.batch_progress, batch_id)
+                self._apply_counts(progress, counts)
+                if not counts.get('queued') and not counts.get('running'):
+                    break
+                await asyncio.sleep(self.progress_interval)
+        finally:
+            for task in extractors + [translator]:
+                task.cancel()
+            progress['finished'] = True
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+
+        await self._safe_report(report, self._progress_text(progress))
+        logger.info(
+            f"Пакетная загрузка {batch_id} завершена: опубликовано {progress['published']}, "
+            f"ошибок {progress['failed']} из {progress['total']}"
+        )
+        return progress
+
+    async def _extract_stage(self, url_queue: asyncio.Queue, extracted_queue: asyncio.Queue, progress: Dict):
+        """
+        Стадия извлечения: берёт ссылки, пока они есть
+        """
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            if not self.video_downloader.is_valid_url(url):
+                self._record_error(progress, url, "неподдерживаемая платформа")
+                continue
+
+            try:
+                video_info = await self.executor.run_shared(
+                    'extract', self.video_downloader.get_video_key(url), self.video_downloader.get_video_info, url
+                )
+            except Exception as e:
+                logger.error(f"Пакетная загрузка: ошибка извлечения {url}: {e}")
+                video_info = None
+
+            if not video_info:
+                self._record_error(progress, url, "не удалось получить информацию о видео")
+                continue
+
+            progress['extracted'] += 1
+            await extracted_queue.put((url, video_info))
+
+    async def _translate_stage(
+        self,
+        extracted_queue: asyncio.Queue,
+        progress: Dict,
+        chat_id: int,
+        message_id: int,
+        groups: List[Optional[Dict]],
+        batch_id: str
+    ):
+        """
+        Стадия перевода и постановки в очередь публикаций
+
+        Берёт все накопившиеся видео разом и переводит их названия одним
+        вызовом translate_many_async (меньше запросов к переводчику).
+        """
+        finished = False
+        while not finished:
+            items = [await extracted_queue.get()]
+            while True:
+                try:
+                    items.append(extracted_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            if None in items:
+                finished = True
+                items = [item for item in items if item is not None]
+            if not items:
+                continue
+
+            titles = await self.translator.translate_many_async(
+                [video_info['title'] for _, video_info in items], self.executor
+            )
+            progress['translated'] += len(items)
+
+            for (url, video_info), title in zip(items, titles):
+                # Стадия не должна падать: извлечение ждёт её в ограниченной очереди
+                try:
+                    await self.executor.run(
+                        'db',
+                        self.publish_queue.enqueue_many,
+                        chat_id=chat_id,
+                        message_id=message_id,
+                        video_info=video_info,
+                        title=title or video_info['title'],
+                        groups=groups,
+                        batch_id=batch_id
+                    )
+                except Exception as e:
+                    logger.error(f"Пакетная загрузка: не удалось поставить {url} в очередь: {e}")
+                    self._record_error(progress, url, "не удалось поставить в очередь")
+                    continue
+                progress['queued'] += 1
+            self.publish_workers.wake()
+
+    @staticmethod
+    def _apply_counts(progress: Dict, counts: Dict[str, int]):
+        """
+        Перенести статусы задач пакета в прогресс (в видео, а не в задачах по группам)
+        """
+        jobs_per_video = progress.get('jobs_per_video', 1)
+        progress['published'] = counts.get('done', 0) // jobs_per_video
+        progress['publish_failed'] = -(-counts.get('failed', 0) // jobs_per_video)
+
+    @staticmethod
+    def _record_error(progress: Dict, url: str, reason: str):
+        progress['failed'] += 1
+        progress['errors'].append((url, reason))
+
+    async def _report_loop(self, batch_id: str, progress: Dict, report: Reporter):
+        """
+        Обновлять сообщение прогресса, когда он меняется (не чаще progress_interval)
+        """
+        last_text = None
+        while True:
+            if progress['queued']:
+                counts = await self.executor.run('db', self.publish_queue.batch_progress, batch_id)
+                self._apply_counts(progress, counts)
+            text = self._progress_text(progress)
+            if text != last_text:
+                await self._safe_report(report, text)
+                last_text = text
+            await asyncio.sleep(self.progress_interval)
+
+    @staticmethod
+    async def _safe_report(report: Reporter, text: str):
+        """
+        Обновить прогресс (ошибка Telegram не должна останавливать загрузку)
+        """
+        try:
+            await report(text)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить прогресс пакетной загрузки: {e}")
+
+    @staticmethod
+    def _progress_text(progress: Dict) -> str:
+        failed = progress['failed'] + progress.get('publish_failed', 0)
+        header = "✅ Пакетная загрузка завершена" if progress['finished'] else "⏳ Пакетная загрузка"
+        text = (
+            f"{header}\n\n"
+            f"🔗 Ссылок: {progress['total']}\n"
+            f"🔎 Получено видео: {progress['extracted']}/{progress['total']}\n"
+            f"🇷🇺 Переведено: {progress['translated']}\n"
+            f"📥 В очереди публикаций: {progress['queued']}\n"
+            f"📌 В отложенных SMMBox: {progress['published']}\n"
+            f"❌ Ошибок: {failed}"
+        )
+
+        errors = progress['errors']
+        if progress['finished'] and errors:
+            text += "\n\n" + "\n".join(f"• {html.escape(url)} - {reason}" for url, reason in errors[:MAX_REPORTED_ERRORS])
+            if len(errors) > MAX_REPORTED_ERRORS:
+                text += f"\n• ...и ещё {len(errors) - MAX_REPORTED_ERRORS}"
+        return text
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import EXECUTOR_MAX_WORKERS, EXECUTOR_LIMITS
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingExecutor:
+    """
+    Общий пул потоков для блокирующих вызовов сервисов (yt-dlp, перевод, SQLite)
+
+    Каждый сервис получает свой лимит одновременных вызовов, чтобы, например,
+    всплеск ссылок не занял все потоки извлечением и не остановил работу с базой.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXECUTOR_MAX_WORKERS,
+        limits: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            max_workers: Размер общего пула потоков
+            limits: Лимиты одновременных вызовов по сервисам, например {'extract': 8}
+        """
+        self.max_workers = max_workers
+        self.limits = dict(EXECUTOR_LIMITS if limits is None else limits)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='blocking')
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Идущие общие вызовы: (сервис, функция, ключ) -> задача
+        self._inflight: Dict[Tuple[str, str, Hashable], asyncio.Task] = {}
+        self.coalesced = 0
+
+    def _get_semaphore(self, service: str) -> asyncio.Semaphore:
+        """
+        Получить семафор сервиса (без явного лимита сервис ограничен только размером пула)
+        """
+        semaphore = self._semaphores.get(service)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(service, self.max_workers))
+            self._semaphores[service] = semaphore
+        return semaphore
+
+    async def run(self, service: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Выполнить блокирующую функцию в пуле, не занимая event loop
+
+        Args:
+            service: Имя сервиса для лимита ('extract', 'translate', 'db', ...)
+            func: Блокирующая функция
+        """
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(service):
+            return await loop.run_in_executor(self._pool, partial(func, *args, **kwargs))
+
+    async def run_shared(self, service: str, key: Optional[Hashable], func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Выполнить блокирующую функцию один раз на все одновременные вызовы с тем же ключом
+
+        Если такой же вызов (та же функция и key) уже идёт, новый вызов не занимает
+        поток, а ждёт его результата. Например, ссылку на одно видео прислали
+        несколько редакторов - yt-dlp извлечёт его один раз.
+        Результат общий для всех ждущих, изменять его нельзя.
+
+        Args:
+            service: Имя сервиса для лимита (см. run)
+            key: Ключ объединения (None - выполнить без объединения)
+            func: Блокирующая функция
+        """
+        if key is None:
+            return await self.run(service, func, *args, **kwargs)
+
+        flight_key = (service, getattr(func, '__qualname__', repr(func)), key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self.run(service, func, *args, **kwargs))
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._forget_flight(flight_key, done))
+        else:
+            self.coalesced += 1
+            logger.info(f"Вызов {flight_key[1]} для {key} уже выполняется, жду его результат")
+
+        # Отмена одного из ждущих не должна отменять общий вызов
+        return await asyncio.shield(task)
+
+    def _forget_flight(self, flight_key: Tuple[str, str, Hashable], task: asyncio.Task):
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        # Ошибку получили ждущие; если все они отменены, не даём asyncio ругаться на неё
+        if not task.cancelled():
+            task.exception()
+
+    def shutdown(self, wait: bool = True):
+        """
+        Остановить пул потоков
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info("Пул блокирующих задач остановлен")
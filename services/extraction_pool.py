@@ -0,0 +1,192 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_MAX_JOBS_PER_WORKER,
+    EXTRACTION_MAX_RSS_MB,
+    EXTRACTION_TIMEOUT,
+)
+from services.platforms.base import extract_compact_info
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_rss_mb() -> float:
+    """
+    Пиковое потребление памяти текущего процесса в МБ (0, если неизвестно)
+    """
+    if resource is None:
+        return 0.0
+    # На Linux ru_maxrss в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _extract_in_worker(url: str, ydl_opts: Dict) -> Dict:
+    """
+    Точка входа воркера: извлечь информацию и вернуть только компактный словарь
+    """
+    try:
+        info = extract_compact_info(url, ydl_opts)
+    except Exception as e:
+        # Исключения yt-dlp не всегда сериализуются, передаём только текст
+        raise RuntimeError(str(e)) from None
+
+    info['worker_rss_mb'] = _worker_rss_mb()
+    return info
+
+
+def _kill_workers(pool: ProcessPoolExecutor):
+    """
+    Убить процессы пула (задачу в зависшем воркере иначе не остановить)
+    """
+    kill_workers = getattr(pool, 'kill_workers', None)
+    if kill_workers is not None:  # Python 3.14+
+        kill_workers()
+        return
+    # В старых версиях процессы доступны только через внутренний словарь пула
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.kill()
+
+
+class ExtractionPool:
+    """
+    Пул процессов для yt-dlp
+
+    Извлечение (разбор JS, огромные JSON) нагружает CPU и держит GIL,
+    а память yt-dlp со временем растёт. Поэтому извлечение идёт в отдельных
+    процессах: каждый воркер заменяется новым после заданного числа задач
+    (max_tasks_per_child), а пул целиком пересоздаётся, когда воркер превысил
+    лимит памяти или завис. В процесс бота возвращается
+    только компактный словарь с нужными полями.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        max_jobs_per_worker: int = EXTRACTION_MAX_JOBS_PER_WORKER,
+        max_rss_mb: int = EXTRACTION_MAX_RSS_MB,
+        timeout: int = EXTRACTION_TIMEOUT
+    ):
+        """
+        Args:
+            workers: Количество процессов-воркеров
+            max_jobs_per_worker: После скольких задач заменять воркер новым (0 - не заменять)
+            max_rss_mb: Лимит памяти воркера в МБ, после которого пул пересоздаётся
+            timeout: Максимальное время одного извлечения в секундах
+        """
+        self.workers = max(1, workers)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.timeout = timeout
+
+        # fork из многопоточного процесса бота (asyncio, потоки исполнителя)
+        # может унаследовать захваченные блокировки. forkserver форкает воркеры
+        # из чистого однопоточного процесса, где заранее импортирован только
+        # этот модуль (вместе с yt-dlp), а не main.py
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self._mp_context = multiprocessing.get_context('forkserver')
+            self._mp_context.set_forkserver_preload([__name__])
+        else:
+            self._mp_context = multiprocessing.get_context('spawn')
+
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.generation = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Получить текущий пул (или запустить новый)
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self._mp_context,
+                    max_tasks_per_child=self.max_jobs_per_worker or None
+                )
+                self.generation += 1
+                logger.info(f"Запущен пул извлечения #{self.generation} ({self.workers} процессов)")
+            return self._pool
+
+    def _recycle_locked(self, reason: str, kill: bool = False):
+        """
+        Заменить пул на новый
+
+        Args:
+            reason: Причина (для лога)
+            kill: Убить процессы старого пула. Иначе его текущие задачи доработают сами,
+                но зависший воркер так и остался бы висеть
+        """
+        if self._pool is None:
+            return
+        logger.info(f"Пересоздаю пул извлечения #{self.generation}: {reason}")
+        if kill:
+            # Остальные задачи убитого пула получат BrokenProcessPool и повторятся в новом
+            _kill_workers(self._pool)
+        self._pool.shutdown(wait=False, cancel_futures=kill)
+        self._pool = None
+
+    def recycle(self, reason: str = "по запросу", kill: bool = False):
+        with self._lock:
+            self._recycle_locked(reason, kill=kill)
+
+    def _recycle_if_current(self, pool: ProcessPoolExecutor, reason: str, kill: bool = False):
+        """
+        Пересоздать пул, если его ещё не заменил другой поток
+
+        Когда пул ломается, ошибку получают все его задачи сразу - без проверки
+        каждая из них снесла бы уже созданный на замену пул.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._recycle_locked(reason, kill=kill)
+
+    def extract(self, url: str, ydl_opts: Dict) -> Dict:
+        """
+        Извлечь информацию о видео в процессе-воркере (блокирующий вызов)
+
+        Raises:
+            Исключение воркера (RuntimeError с текстом ошибки yt-dlp) или TimeoutError
+        """
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                info = pool.submit(_extract_in_worker, url, ydl_opts).result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # Воркер завис: без пересоздания он навсегда занял бы место в пуле
+                logger.error(f"Извлечение {url} не уложилось в {self.timeout} сек")
+                self._recycle_if_current(pool, "воркер завис", kill=True)
+                raise
+            except BrokenProcessPool:
+                # Воркер упал (например, убит OOM) - поднимаем новый пул и пробуем ещё раз
+                logger.error(f"Пул извлечения сломан (попытка {attempt + 1}/2)")
+                self._recycle_if_current(pool, "воркер аварийно завершился")
+                continue
+
+            rss_mb = info.pop('worker_rss_mb', 0)
+            if self.max_rss_mb and rss_mb > self.max_rss_mb:
+                self._recycle_if_current(pool, f"воркер занял {rss_mb:.0f} МБ (лимит {self.max_rss_mb} МБ)")
+            return info
+
+        raise RuntimeError("Пул извлечения недоступен")
+
+    def shutdown(self, wait: bool = True):
+        """
+        Остановить все процессы пула
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
+        logger.info("Пул извлечения остановлен")
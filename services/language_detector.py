@@ -0,0 +1,172 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Optional, Tuple
+
+# Ссылки, хештеги и упоминания не переводятся
+URL_PATTERN = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'[#@]\w+')
+
+# Какой язык означает преобладающая письменность (для нелатинских алфавитов)
+SCRIPT_LANGUAGES = {
+    'HIRAGANA': 'ja',
+    'KATAKANA': 'ja',
+    'HANGUL': 'ko',
+    'CJK': 'zh-CN',
+    'ARABIC': 'ar',
+    'DEVANAGARI': 'hi',
+    'THAI': 'th',
+    'GREEK': 'el',
+    'HEBREW': 'iw',
+    'ARMENIAN': 'hy',
+    'GEORGIAN': 'ka',
+}
+
+# Буквы, которые есть только в конкретных кириллических языках
+UKRAINIAN_CHARS = frozenset('їєґ')
+BELARUSIAN_CHARS = frozenset('ў')
+SERBIAN_CHARS = frozenset('ђјљњћџ')
+RUSSIAN_ONLY_CHARS = frozenset('ыэъё')
+
+# Частые короткие слова латинских языков
+LATIN_STOPWORDS = {
+    'en': frozenset('the and you this that with for are what how when my your is it of to in on'.split()),
+    'es': frozenset('el la los las que con por para una uno es del y mi como cuando pero muy'.split()),
+    'pt': frozenset('o os que com não uma um para você meu como quando mas muito é do da'.split()),
+    'fr': frozenset('le la les et est une un pour que avec dans mon ce qui pas sur très'.split()),
+    'de': frozenset('der die das und ist ein eine nicht mit ich du wie wenn mein auf sehr'.split()),
+    'it': frozenset('il lo gli che con per una uno non è mio come quando ma molto della'.split()),
+    'tr': frozenset('bir ve bu ne için ile çok ama gibi benim sen ben nasıl değil'.split()),
+    'pl': frozenset('i w na nie że jest to się jak mój ale bardzo czy ten'.split()),
+    'id': frozenset('yang dan di ini itu dengan untuk tidak aku kamu apa ada'.split()),
+}
+
+# Буквы с диакритикой, характерные для языка (если стоп-слов не нашлось)
+LATIN_CHAR_HINTS = {
+    'es': frozenset('ñ¿¡'),
+    'pt': frozenset('ãõ'),
+    'de': frozenset('ßäö'),
+    'fr': frozenset('èêëœç'),
+    'tr': frozenset('ğış'),
+    'pl': frozenset('ąęłńśźż'),
+}
+
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+# Когда латинскому языку можно верить: минимум очков (стоп-слова и диакритика)
+# и во сколько раз он должен обогнать следующий. Иначе source='auto' - неверно
+# указанный исходный язык Google возвращает без перевода или искажённым
+LATIN_MIN_SCORE = 2
+LATIN_MIN_LEAD = 2
+
+
+def _letter_script(char: str) -> Optional[str]:
+    """
+    Письменность буквы по её имени в Unicode (LATIN, CYRILLIC, CJK, ...)
+    """
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return None
+    script = name.split(' ', 1)[0]
+    return 'HANGUL' if script.startswith('HANGUL') else script
+
+
+def _cyrillic_language(letters: str) -> str:
+    """
+    Различить кириллические языки по характерным буквам
+    """
+    chars = set(letters)
+    if chars & BELARUSIAN_CHARS:
+        return 'be'
+    if chars & UKRAINIAN_CHARS:
+        return 'uk'
+    if chars & SERBIAN_CHARS:
+        return 'sr'
+    # "і" есть в украинском и белорусском, но не в русском
+    if 'і' in chars:
+        return 'be' if chars & RUSSIAN_ONLY_CHARS else 'uk'
+    return 'ru'
+
+
+def _latin_language(text: str) -> Optional[str]:
+    """
+    Угадать латинский язык по частым словам и диакритике (None - не уверены)
+
+    Каждое стоп-слово - очко языку, характерная диакритика - ещё одно.
+    Язык принимается, только если набрал LATIN_MIN_SCORE очков и в LATIN_MIN_LEAD
+    раз обогнал следующий: близкие языки (нидерландский, шведский) и смешанный
+    текст делят одни и те же короткие слова.
+    """
+    words = WORD_PATTERN.findall(text)
+    scores = Counter()
+    for word in words:
+        for language, stopwords in LATIN_STOPWORDS.items():
+            if word in stopwords:
+                scores[language] += 1
+
+    chars = set(text)
+    for language, hints in LATIN_CHAR_HINTS.items():
+        if chars & hints:
+            scores[language] += 1
+
+    if not scores:
+        return None
+    (best, best_score), *rest = scores.most_common(2) + [(None, 0)]
+    if best_score >= LATIN_MIN_SCORE and best_score >= LATIN_MIN_LEAD * rest[0][1]:
+        return best
+    return None
+
+
+def strip_untranslatable(text: str) -> str:
+    """
+    Оставить только то, что имеет смысл переводить (без ссылок, хештегов и упоминаний)
+    """
+    text = URL_PATTERN.sub(' ', text)
+    return TAG_PATTERN.sub(' ', text)
+
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Определить язык текста без сетевых запросов
+
+    Returns:
+        Код языка в формате Google Translate ('ru', 'uk', 'en', 'ja', ...),
+        'und', если в тексте нет слов (эмодзи, цифры, ссылки, хештеги),
+        или None, если язык не удалось определить уверенно
+    """
+    cleaned = strip_untranslatable(text).lower()
+    letters = [char for char in cleaned if char.isalpha()]
+    if not letters:
+        return 'und'
+
+    scripts = Counter(_letter_script(char) for char in letters)
+    script, count = scripts.most_common(1)[0]
+
+    # Кириллицы больше всего - русский заголовок с латинскими названиями
+    # ("Обзор нового iPhone"), его не переводим, даже если латиницы заметная доля
+    if script == 'CYRILLIC':
+        return _cyrillic_language(''.join(letters))
+
+    # Заметная доля другой письменности - смешанный текст, пусть решает переводчик
+    if count / len(letters) < 0.6:
+        return None
+
+    if script == 'LATIN':
+        return _latin_language(cleaned)
+    if script in ('HIRAGANA', 'KATAKANA') or (script == 'CJK' and (scripts['HIRAGANA'] or scripts['KATAKANA'])):
+        return 'ja'
+    return SCRIPT_LANGUAGES.get(script)
+
+
+def needs_translation(text: str, target: str = 'ru') -> Tuple[bool, Optional[str]]:
+    """
+    Решить, нужен ли перевод, и подсказать исходный язык
+
+    Returns:
+        (нужен ли перевод, исходный язык или None - тогда source='auto')
+    """
+    language = detect_language(text)
+    if language in ('und', target):
+        return False, language
+    return True, language
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from config import (
+    RETENTION_POSTED_DAYS,
+    FAILED_SLOT_EXPIRY_HOURS,
+    COMPACTION_INTERVAL_HOURS,
+    VACUUM_INTERVAL_HOURS,
+    SMMBOX_SYNC_INTERVAL,
+)
+from services.retry_policy import CircuitOpenError
+from services.smmbox_api import group_key
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(name: str, interval: float, job: Callable[[], Awaitable], initial_delay: float = 0):
+    """
+    Выполнять асинхронную задачу каждые interval секунд, пока задачу не отменят
+
+    Ошибки задачи логируются и не останавливают цикл.
+    """
+    await asyncio.sleep(initial_delay)
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка фоновой задачи {name}: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_compaction(scheduler, executor, publish_queue=None) -> asyncio.Task:
+    """
+    Запустить фоновое обслуживание базы планировщика
+
+    Каждые COMPACTION_INTERVAL_HOURS часов архивирует старые посты, освобождает
+    зависшие failed-слоты и удаляет завершённые задачи очереди публикаций,
+    раз в VACUUM_INTERVAL_HOURS часов дополнительно сжимает базу.
+    """
+    last_vacuum = time.monotonic()
+
+    async def compact():
+        nonlocal last_vacuum
+        vacuum = time.monotonic() - last_vacuum >= VACUUM_INTERVAL_HOURS * 3600
+        await executor.run(
+            'db',
+            scheduler.compact,
+            posted_retention_days=RETENTION_POSTED_DAYS,
+            failed_expiry_hours=FAILED_SLOT_EXPIRY_HOURS,
+            vacuum=vacuum
+        )
+        if publish_queue is not None:
+            await executor.run('db', publish_queue.purge, RETENTION_POSTED_DAYS)
+        if vacuum:
+            last_vacuum = time.monotonic()
+
+    # Первый проход - через минуту после старта, чтобы не мешать запуску
+    return asyncio.create_task(
+        run_periodically('compaction', COMPACTION_INTERVAL_HOURS * 3600, compact, initial_delay=60)
+    )
+
+
+async def sync_postponed_queue(smmbox_api, scheduler, executor) -> Optional[int]:
+    """
+    Загрузить очереди отложенных постов всех групп публикации (по запросу на группу)
+    и отметить их слоты занятыми в расписании соответствующей группы
+
+    Returns:
+        Сколько слотов занято только в SMMBox, или None если ни одну очередь получить не удалось
+    """
+    try:
+        groups = await smmbox_api.get_target_groups()
+    except CircuitOpenError as e:
+        logger.warning(f"Очередь SMMBox не загружена: {e}")
+        return None
+
+    total = None
+    for group in groups:
+        posts = await smmbox_api.get_postponed_posts(group)
+        if posts is None:
+            continue
+
+        timestamps = []
+        for post in posts:
+            try:
+                timestamps.append(int(post['date']))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        external = await executor.run('db', scheduler.sync_external_slots, timestamps, group_key(group))
+        logger.info(
+            f"Очередь SMMBox сверена ({group['name']}): {len(timestamps)} отложенных постов, "
+            f"{external} слотов занято вне бота"
+        )
+        total = (total or 0) + external
+    return total
+
+
+def start_queue_sync(smmbox_api, scheduler, executor) -> asyncio.Task:
+    """
+    Запустить периодическую сверку расписания с очередью SMMBox
+
+    Первая сверка - сразу при старте, дальше каждые SMMBOX_SYNC_INTERVAL секунд.
+    """
+    async def sync():
+        await sync_postponed_queue(smmbox_api, scheduler, executor)
+
+    return asyncio.create_task(run_periodically('queue sync', SMMBOX_SYNC_INTERVAL, sync))
@@ -0,0 +1,67 @@
+import calendar
+import time
+from typing import Optional, Dict
+from urllib.parse import urlparse, parse_qs
+
+from config import MEDIA_URL_TTL, MEDIA_URL_REFRESH_MARGIN
+
+
+def parse_media_url_expiry(url: Optional[str]) -> Optional[int]:
+    """
+    Достать время истечения подписанной ссылки CDN из её параметров
+
+    Поддерживаются:
+    - googlevideo (YouTube): expire=<unix>
+    - TikTok CDN: x-expires=<unix>
+    - Instagram/Facebook CDN: oe=<unix в hex>
+    - S3/CloudFront: Expires=<unix> или X-Amz-Date + X-Amz-Expires
+
+    Returns:
+        Unix timestamp истечения или None, если ссылка его не содержит
+    """
+    if not url:
+        return None
+
+    try:
+        params = {key.lower(): values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+        for key in ('expire', 'x-expires', 'expires'):
+            if params.get(key, '').isdigit():
+                return int(params[key])
+
+        if 'oe' in params:
+            return int(params['oe'], 16)
+
+        if 'x-amz-date' in params and params.get('x-amz-expires', '').isdigit():
+            signed_at = time.strptime(params['x-amz-date'], '%Y%m%dT%H%M%SZ')
+            return calendar.timegm(signed_at) + int(params['x-amz-expires'])
+
+    except (ValueError, OverflowError):
+        return None
+
+    return None
+
+
+def media_url_expires_at(url: Optional[str], default_ttl: int = MEDIA_URL_TTL) -> Optional[int]:
+    """
+    Время истечения ссылки: из её параметров, а если их нет - через default_ttl от текущего момента
+    """
+    if not url:
+        return None
+    return parse_media_url_expiry(url) or int(time.time()) + default_ttl
+
+
+def is_media_url_fresh(video_info: Dict, margin: int = MEDIA_URL_REFRESH_MARGIN) -> bool:
+    """
+    Проверить, что прямой ссылкой из video_info ещё можно пользоваться
+
+    Args:
+        video_info: Информация о видео (поля url и url_expires_at)
+        margin: Запас в секундах - SMMBox скачивает файл не мгновенно
+    """
+    if not video_info.get('url'):
+        return False
+    expires_at = video_info.get('url_expires_at')
+    if not expires_at:
+        return True
+    return expires_at - margin > time.time()
@@ -0,0 +1,130 @@
+import sqlite3
+import logging
+import threading
+import time
+from typing import Optional, Dict
+
+from config import METADATA_CACHE_DB, METADATA_CACHE_TTL, MEDIA_URL_TTL
+from services.media_url import media_url_expires_at
+
+logger = logging.getLogger(__name__)
+
+
+class VideoMetadataCache:
+    """
+    Постоянный кеш информации о видео по ключу (платформа, ID видео)
+
+    Метаданные (название, описание, автор, обложка, длительность) живут долго,
+    а прямая ссылка на файл быстро протухает, поэтому у неё свой срок годности.
+    """
+
+    def __init__(
+        self,
+        db_path: str = METADATA_CACHE_DB,
+        ttl: int = METADATA_CACHE_TTL,
+        media_url_ttl: int = MEDIA_URL_TTL
+    ):
+        """
+        Args:
+            db_path: Путь к файлу SQLite
+            ttl: Сколько секунд хранить метаданные
+            media_url_ttl: Срок жизни прямой ссылки, если в ней самой нет времени истечения
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.media_url_ttl = media_url_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.init_db()
+
+    def init_db(self):
+        """
+        Инициализация таблицы кеша
+        """
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_metadata (
+                    platform TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    uploader TEXT,
+                    thumbnail TEXT,
+                    duration INTEGER,
+                    webpage_url TEXT,
+                    media_url TEXT,
+                    media_url_expires_at INTEGER,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (platform, video_id)
+                )
+            ''')
+            self._conn.commit()
+        logger.info(f"Кеш метаданных видео инициализирован: {self.db_path}")
+
+    def get(self, platform: str, video_id: str) -> Optional[Dict]:
+        """
+        Получить информацию о видео из кеша
+
+        Returns:
+            Dict в формате BasePlatform.get_video_info или None, если записи нет
+            или она устарела. Поле url равно None, если прямая ссылка протухла
+            (её можно обновить через VideoDownloader.ensure_fresh_media_url).
+        """
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT title, description, uploader, thumbnail, duration, webpage_url,
+                       media_url, media_url_expires_at, updated_at
+                FROM video_metadata
+                WHERE platform = ? AND video_id = ?
+            ''', (platform, video_id)).fetchone()
+
+        if not row:
+            return None
+
+        (title, description, uploader, thumbnail, duration, webpage_url,
+         media_url, media_url_expires_at, updated_at) = row
+
+        now = int(time.time())
+        if now - updated_at > self.ttl:
+            return None
+
+        if not media_url_expires_at or media_url_expires_at <= now:
+            media_url = None
+            media_url_expires_at = None
+
+        return {
+            'id': video_id,
+            'title': title,
+            'url': media_url,
+            'url_expires_at': media_url_expires_at,
+            'thumbnail': thumbnail,
+            'duration': duration or 0,
+            'description': description or '',
+            'uploader': uploader or '',
+            'webpage_url': webpage_url,
+            'platform': platform
+        }
+
+    def put(self, video_id: str, info: Dict):
+        """
+        Сохранить информацию о видео (результат BasePlatform.get_video_info)
+        """
+        now = int(time.time())
+        expires_at = info.get('url_expires_at') or media_url_expires_at(info.get('url'), self.media_url_ttl)
+
+        with self._lock:
+            self._conn.execute('''
+                INSERT OR REPLACE INTO video_metadata (
+                    platform, video_id, title, description, uploader, thumbnail, duration,
+                    webpage_url, media_url, media_url_expires_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                info['platform'], video_id, info.get('title', 'Без названия'), info.get('description'),
+                info.get('uploader'), info.get('thumbnail'), info.get('duration'),
+                info.get('webpage_url'), info.get('url'), expires_at, now
+            ))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
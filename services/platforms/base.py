@@ -1,11 +1,79 @@
 import yt_dlp
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator
 from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
 
 
+def select_video_url(info: Dict) -> Optional[str]:
+    """
+    Извлечь прямую ссылку на видео из информации yt-dlp
+    """
+    # Ищем формат с видео и аудио
+    if 'formats' in info:
+        video_url = None
+        for fmt in info['formats']:
+            if fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none':
+                video_url = fmt.get('url')
+                break
+
+        # Если не нашли комбинированный формат, берём просто видео
+        if not video_url and info['formats']:
+            video_url = info['formats'][-1].get('url')
+
+        return video_url
+
+    return info.get('url')
+
+
+def compact_video_info(info: Dict) -> Dict:
+    """
+    Оставить из огромного ответа yt-dlp только нужные боту поля
+    """
+    return {
+        'id': info.get('id'),
+        'title': info.get('title', 'Без названия'),
+        'url': select_video_url(info),
+        'thumbnail': info.get('thumbnail'),
+        'duration': info.get('duration', 0),
+        'description': info.get('description', ''),
+        'uploader': info.get('uploader', ''),
+        'webpage_url': info.get('webpage_url'),
+    }
+
+
+def extract_compact_info(url: str, ydl_opts: Dict) -> Dict:
+    """
+    Запустить yt-dlp и вернуть компактный результат
+
+    Используется и в процессе бота, и в воркерах ExtractionPool.
+    """
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return compact_video_info(info)
+
+
+def iter_flat_entries(url: str, ydl_opts: Dict) -> Iterator[Dict]:
+    """
+    Перечислить видео канала/профиля/плейлиста без полного извлечения каждого
+
+    Плоское извлечение (extract_flat) отдаёт только ID, ссылку и название,
+    а lazy_playlist подгружает страницы списка по мере чтения: если
+    остановиться на первых записях, остальные страницы не запрашиваются.
+    """
+    opts = dict(ydl_opts, extract_flat='in_playlist', lazy_playlist=True)
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        for entry in (info or {}).get('entries') or []:
+            if not entry:
+                continue
+            if not entry.get('id'):
+                logger.warning(f"Запись списка {url} без ID пропущена: {entry.get('url') or entry.get('title')}")
+                continue
+            yield entry
+
+
 class BasePlatform(ABC):
     """
     Базовый класс для всех платформ
@@ -22,6 +90,9 @@ class BasePlatform(ABC):
         if cookies_file:
             self.ydl_opts['cookiefile'] = cookies_file
             logger.info(f"Используем cookies из файла: {cookies_file}")
+        
+        # Пул процессов для yt-dlp (назначается VideoDownloader), без него извлекаем в текущем процессе
+        self.extraction_pool = None
     
     @abstractmethod
     def get_platform_name(self) -> str:
@@ -33,6 +104,55 @@ class BasePlatform(ABC):
         """Проверка, что URL принадлежит этой платформе"""
         pass
     
+    def extract_video_id(self, url: str) -> Optional[str]:
+        """
+        Получить канонический ID видео из URL без сетевых запросов
+        
+        Returns:
+            ID видео или None, если из ссылки его не достать (например, короткие ссылки)
+        """
+        return None
+    
+    def is_source_url(self, url: str) -> bool:
+        """
+        Проверка, что URL - канал, профиль или плейлист (источник многих видео)
+        """
+        return False
+    
+    def normalize_source_url(self, url: str) -> str:
+        """
+        Привести ссылку на источник к виду, который перечисляет только нужные видео
+        """
+        return url
+    
+    def build_video_url(self, entry: Dict) -> Optional[str]:
+        """
+        Ссылка на отдельное видео по записи плоского списка
+        """
+        url = entry.get('webpage_url') or entry.get('url')
+        return url if url and self.is_valid_url(url) else None
+    
+    def iter_source_entries(self, url: str) -> Iterator[Dict]:
+        """
+        Лениво перечислить видео источника (сначала новые)
+        
+        Извлечение идёт в процессе бота, а не в ExtractionPool: генератор
+        нельзя передать из другого процесса, а плоский список дешёвый.
+        
+        Yields:
+            Dict с полями id, url (ссылка на видео) и title
+        """
+        logger.info(f"[{self.get_platform_name()}] Список видео источника: {url}")
+        for entry in iter_flat_entries(self.normalize_source_url(url), self.ydl_opts):
+            video_url = self.build_video_url(entry)
+            if not video_url:
+                continue
+            yield {
+                'id': str(entry['id']),
+                'url': video_url,
+                'title': entry.get('title')
+            }
+    
     def get_video_info(self, url: str) -> Optional[Dict]:
         """
         Получить информацию о видео без скачивания
@@ -45,29 +165,24 @@ class BasePlatform(ABC):
             - duration: длительность в секундах
         """
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                logger.info(f"[{self.get_platform_name()}] Получение информации о видео: {url}")
-                info = ydl.extract_info(url, download=False)
-                
-                # Получаем прямую ссылку на видео
-                video_url = self._extract_video_url(info)
-                
-                if not video_url:
-                    logger.error(f"[{self.get_platform_name()}] Не удалось получить прямую ссылку на видео")
-                    return None
-                
-                result = {
-                    'title': info.get('title', 'Без названия'),
-                    'url': video_url,
-                    'thumbnail': info.get('thumbnail'),
-                    'duration': info.get('duration', 0),
-                    'description': info.get('description', ''),
-                    'uploader': info.get('uploader', ''),
-                    'platform': self.get_platform_name()
-                }
-                
-                logger.info(f"[{self.get_platform_name()}] Информация получена: {result['title']}")
-                return result
+            logger.info(f"[{self.get_platform_name()}] Получение информации о видео: {url}")
+            
+            if self.extraction_pool is not None:
+                info = self.extraction_pool.extract(url, self.ydl_opts)
+            else:
+                info = extract_compact_info(url, self.ydl_opts)
+            
+            if not info:
+                return None
+            
+            if not info.get('url'):
+                logger.error(f"[{self.get_platform_name()}] Не удалось получить прямую ссылку на видео")
+                return None
+            
+            result = dict(info, platform=self.get_platform_name())
+            
+            logger.info(f"[{self.get_platform_name()}] Информация получена: {result['title']}")
+            return result
                 
         except Exception as e:
             logger.error(f"[{self.get_platform_name()}] Ошибка получения информации: {e}")
@@ -77,18 +192,4 @@ class BasePlatform(ABC):
         """
         Извлечь прямую ссылку на видео из информации
         """
-        # Ищем формат с видео и аудио
-        if 'formats' in info:
-            video_url = None
-            for fmt in info['formats']:
-                if fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none':
-                    video_url = fmt.get('url')
-                    break
-            
-            # Если не нашли комбинированный формат, берём просто видео
-            if not video_url and info['formats']:
-                video_url = info['formats'][-1].get('url')
-            
-            return video_url
-        
-        return info.get('url')
+        return select_video_url(info)
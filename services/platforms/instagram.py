@@ -1,9 +1,17 @@
 import logging
-from typing import Optional
+import re
+from typing import Optional, Dict
 from .base import BasePlatform
 
 logger = logging.getLogger(__name__)
 
+# instagram.com/reel/ID, instagram.com/reels/ID, instagram.com/p/ID
+INSTAGRAM_ID_PATTERN = re.compile(r'instagram\.com/(?:reels?|p)/([A-Za-z0-9_-]+)')
+# instagram.com/username - профиль (yt-dlp перечисляет его только с cookies)
+INSTAGRAM_PROFILE_PATTERN = re.compile(r'instagram\.com/([A-Za-z0-9_.]+)/?(?:reels/?)?(?:[?#].*)?$')
+# Служебные разделы, которые выглядят как имя профиля
+INSTAGRAM_RESERVED_PATHS = {'reel', 'reels', 'p', 'tv', 'stories', 'explore', 'accounts', 'direct'}
+
 
 class InstagramPlatform(BasePlatform):
     """
@@ -26,6 +34,24 @@ class InstagramPlatform(BasePlatform):
         ]
         return any(pattern in url for pattern in instagram_patterns)
     
+    def extract_video_id(self, url: str) -> Optional[str]:
+        match = INSTAGRAM_ID_PATTERN.search(url)
+        return match.group(1) if match else None
+    
+    def is_source_url(self, url: str) -> bool:
+        match = INSTAGRAM_PROFILE_PATTERN.search(url)
+        return bool(match) and match.group(1).lower() not in INSTAGRAM_RESERVED_PATHS
+    
+    def normalize_source_url(self, url: str) -> str:
+        return f"https://www.instagram.com/{INSTAGRAM_PROFILE_PATTERN.search(url).group(1)}/"
+    
+    def build_video_url(self, entry: Dict) -> Optional[str]:
+        url = super().build_video_url(entry)
+        if url:
+            return url
+        # В плоском списке профиля id - это shortcode поста
+        return f"https://www.instagram.com/reel/{entry['id']}/"
+    
     def get_video_info(self, url: str):
         """
         Получить информацию о Instagram Reels
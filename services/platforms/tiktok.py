@@ -1,8 +1,15 @@
 import logging
+import re
+from typing import Optional, Dict
 from .base import BasePlatform
 
 logger = logging.getLogger(__name__)
 
+# tiktok.com/@user/video/ID (у коротких ссылок vm.tiktok.com ID в адресе нет)
+TIKTOK_ID_PATTERN = re.compile(r'tiktok\.com/.*?/video/(\d+)')
+# tiktok.com/@user - профиль (без /video/ID)
+TIKTOK_PROFILE_PATTERN = re.compile(r'tiktok\.com/(@[^/?#]+)/?(?:[?#].*)?$')
+
 
 class TikTokPlatform(BasePlatform):
     """
@@ -25,6 +32,23 @@ class TikTokPlatform(BasePlatform):
         ]
         return any(pattern in url for pattern in tiktok_patterns)
     
+    def extract_video_id(self, url: str) -> Optional[str]:
+        match = TIKTOK_ID_PATTERN.search(url)
+        return match.group(1) if match else None
+    
+    def is_source_url(self, url: str) -> bool:
+        return bool(TIKTOK_PROFILE_PATTERN.search(url))
+    
+    def normalize_source_url(self, url: str) -> str:
+        return f"https://www.tiktok.com/{TIKTOK_PROFILE_PATTERN.search(url).group(1)}"
+    
+    def build_video_url(self, entry: Dict) -> Optional[str]:
+        url = super().build_video_url(entry)
+        if url and self.extract_video_id(url):
+            return url
+        uploader = entry.get('uploader') or entry.get('channel')
+        return f"https://www.tiktok.com/@{uploader}/video/{entry['id']}" if uploader else None
+    
     def get_video_info(self, url: str):
         """
         Получить информацию о TikTok видео
@@ -1,8 +1,18 @@
 import logging
+import re
+from typing import Optional, Dict
 from .base import BasePlatform
 
 logger = logging.getLogger(__name__)
 
+# youtube.com/shorts/ID, youtu.be/ID, youtube.com/watch?v=ID
+YOUTUBE_ID_PATTERN = re.compile(
+    r'(?:youtube\.com/shorts/|youtu\.be/|youtube\.com/watch\?(?:.*&)?v=)([A-Za-z0-9_-]{11})'
+)
+# youtube.com/@name, /channel/ID, /c/name, /user/name (с вкладкой или без)
+YOUTUBE_CHANNEL_PATTERN = re.compile(r'youtube\.com/(@[^/?#]+|channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+)')
+YOUTUBE_PLAYLIST_PATTERN = re.compile(r'youtube\.com/playlist\?(?:.*&)?list=')
+
 
 class YouTubePlatform(BasePlatform):
     """
@@ -26,6 +36,31 @@ class YouTubePlatform(BasePlatform):
         ]
         return any(pattern in url for pattern in youtube_patterns)
     
+    def extract_video_id(self, url: str) -> Optional[str]:
+        """
+        ID видео одинаковый для youtu.be, /shorts/ и /watch?v=
+        """
+        match = YOUTUBE_ID_PATTERN.search(url)
+        return match.group(1) if match else None
+    
+    def is_source_url(self, url: str) -> bool:
+        """
+        Канал (вкладка Shorts) или плейлист
+        """
+        return bool(YOUTUBE_CHANNEL_PATTERN.search(url) or YOUTUBE_PLAYLIST_PATTERN.search(url))
+    
+    def normalize_source_url(self, url: str) -> str:
+        """
+        У канала берём только вкладку Shorts (главная страница канала - это список вкладок)
+        """
+        match = YOUTUBE_CHANNEL_PATTERN.search(url)
+        if match:
+            return f"https://www.youtube.com/{match.group(1)}/shorts"
+        return url
+    
+    def build_video_url(self, entry: Dict) -> Optional[str]:
+        return f"https://www.youtube.com/shorts/{entry['id']}"
+    
     def get_video_info(self, url: str):
         """
         Получить информацию о YouTube видео
@@ -0,0 +1,391 @@
+import json
+import sqlite3
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Iterable, List, Set
+
+from config import PUBLISH_MAX_ATTEMPTS, PUBLISH_LEASE_SECONDS
+from services.scheduler import CONNECTION_PRAGMAS, migrate
+
+logger = logging.getLogger(__name__)
+
+# Статусы задачи: queued -> running -> done / failed (running без продления аренды снова берётся в работу)
+# Таблица publish_jobs создаётся миграциями планировщика (SCHEMA_MIGRATIONS 8-9)
+
+SQL_INSERT_JOB = '''
+    INSERT INTO publish_jobs (
+        chat_id, message_id, video_info, title, target, batch_id, platform, video_id, available_at, created_at, updated_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# Следующие задачи: готовые к запуску или брошенные упавшим воркером (аренда истекла)
+SQL_NEXT_JOBS = '''
+    SELECT id FROM publish_jobs
+    WHERE (status = 'queued' AND available_at <= ?)
+       OR (status = 'running' AND lease_until < ?)
+    ORDER BY available_at, id
+    LIMIT ?
+'''
+SQL_LEASE_JOB = '''
+    UPDATE publish_jobs
+    SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_until = ?, updated_at = ?
+    WHERE id = ?
+'''
+SQL_GET_JOB = '''
+    SELECT id, chat_id, message_id, video_info, title, target, batch_id, attempts, post_id, lease_owner
+    FROM publish_jobs WHERE id = ?
+'''
+SQL_EXTEND_LEASE = '''
+    UPDATE publish_jobs SET lease_until = ?, updated_at = ?
+    WHERE id = ? AND lease_owner = ? AND status = 'running'
+'''
+SQL_ATTACH_POST = '''
+    UPDATE publish_jobs SET post_id = ?, updated_at = ?
+    WHERE id = ? AND lease_owner = ?
+'''
+SQL_FINISH_JOB = '''
+    UPDATE publish_jobs
+    SET status = ?, last_error = ?, lease_owner = NULL, lease_until = NULL, updated_at = ?
+    WHERE id = ? AND lease_owner = ?
+'''
+SQL_REQUEUE_JOB = '''
+    UPDATE publish_jobs
+    SET status = 'queued', available_at = ?, last_error = ?, lease_owner = NULL, lease_until = NULL, updated_at = ?
+    WHERE id = ? AND lease_owner = ?
+'''
+SQL_RELEASE_JOB = '''
+    UPDATE publish_jobs
+    SET status = 'queued', available_at = ?,
+        lease_owner = NULL, lease_until = NULL, updated_at = ?
+    WHERE id = ? AND lease_owner = ? AND status = 'running'
+'''
+SQL_RELEASE_ALL = '''
+    UPDATE publish_jobs
+    SET status = 'queued', lease_owner = NULL, lease_until = NULL, updated_at = ?
+    WHERE status = 'running'
+'''
+SQL_KNOWN_VIDEO_IDS = '''
+    SELECT DISTINCT video_id FROM publish_jobs
+    WHERE platform = ? AND video_id IN (SELECT value FROM json_each(?)) AND status IN ('queued', 'running', 'done')
+'''
+SQL_BATCH_PROGRESS = "SELECT status, COUNT(*) FROM publish_jobs WHERE batch_id = ? GROUP BY status"
+SQL_COUNT_ACTIVE = "SELECT COUNT(*) FROM publish_jobs WHERE status IN ('queued', 'running')"
+SQL_PURGE_FINISHED = "DELETE FROM publish_jobs WHERE status IN ('done', 'failed') AND updated_at < ?"
+
+
+class PublishQueue:
+    """
+    Постоянная очередь публикаций в базе планировщика
+
+    Обработчики только кладут задачу и сразу отвечают пользователю, а публикуют
+    фоновые воркеры. Задачу воркер берёт в аренду: если он упал или бот
+    перезапустили, по истечении аренды задачу заберёт другой воркер.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "scheduler.db",
+        max_attempts: int = PUBLISH_MAX_ATTEMPTS,
+        lease_seconds: int = PUBLISH_LEASE_SECONDS
+    ):
+        """
+        Args:
+            db_path: Путь к файлу SQLite (тот же, что у PostScheduler)
+            max_attempts: Сколько раз пробовать задачу, прежде чем отказаться
+            lease_seconds: На сколько секунд воркер берёт задачу
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.init_db()
+
+    def init_db(self):
+        """
+        Инициализация таблицы очереди
+        """
+        with self._lock:
+            for pragma in CONNECTION_PRAGMAS:
+                self._conn.execute(pragma)
+            migrate(self._conn)
+        logger.info(f"Очередь публикаций инициализирована: {self.db_path}")
+
+    def enqueue(
+        self,
+        chat_id: int,
+        message_id: Optional[int],
+        video_info: Dict,
+        title: str,
+        group: Optional[Dict] = None
+    ) -> int:
+        """
+        Поставить видео в очередь на публикацию
+
+        Args:
+            chat_id: Чат пользователя для уведомления о результате
+            message_id: Сообщение, которое воркер обновит результатом
+            video_info: Информация о видео (результат VideoDownloader.get_video_info)
+            title: Подтверждённое название
+            group: Группа SMMBox (None - первая VK группа)
+
+        Returns:
+            ID задачи
+        """
+        return self.enqueue_many(chat_id, message_id, video_info, title, [group])[0]
+
+    def enqueue_many(
+        self,
+        chat_id: int,
+        message_id: Optional[int],
+        video_info: Dict,
+        title: str,
+        groups: List[Optional[Dict]],
+        batch_id: Optional[str] = None
+    ) -> List[int]:
+        """
+        Поставить видео в очередь на публикацию в несколько групп одной транзакцией
+
+        На каждую группу своя задача: слоты и повторы у групп независимы.
+
+        Args:
+            batch_id: ID пакетной загрузки - воркеры не сообщают о таких задачах по отдельности
+
+        Returns:
+            ID задач в порядке groups
+        """
+        now = int(datetime.now().timestamp())
+        video_json = json.dumps(video_info, ensure_ascii=False, default=str)
+        job_ids = []
+        with self._lock:
+            try:
+                for group in groups:
+                    target = json.dumps(group, ensure_ascii=False, default=str) if group else None
+                    cursor = self._conn.execute(
+                        SQL_INSERT_JOB,
+                        (
+                            chat_id, message_id, video_json, title, target, batch_id,
+                            video_info.get('platform'), video_info.get('id'), now, now, now
+                        )
+                    )
+                    job_ids.append(cursor.lastrowid)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        logger.info(f"Задачи публикации ID={job_ids} поставлены в очередь")
+        return job_ids
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Взять в аренду следующую задачу
+
+        Returns:
+            Dict задачи или None, если очередь пуста (см. claim_many)
+        """
+        jobs = self.claim_many(1)
+        return jobs[0] if jobs else None
+
+    def claim_many(self, limit: int) -> List[Dict]:
+        """
+        Взять в аренду до limit задач одной транзакцией (для пакетной публикации)
+
+        Returns:
+            Список Dict задач (id, chat_id, message_id, video_info, title, group, batch_id, attempts, post_id, lease)
+        """
+        now = int(datetime.now().timestamp())
+        lease = uuid.uuid4().hex
+
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                job_ids = [row[0] for row in self._conn.execute(SQL_NEXT_JOBS, (now, now, limit)).fetchall()]
+                rows = []
+                for job_id in job_ids:
+                    self._conn.execute(SQL_LEASE_JOB, (lease, now + self.lease_seconds, now, job_id))
+                    rows.append(self._conn.execute(SQL_GET_JOB, (job_id,)).fetchone())
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        return [
+            {
+                'id': job_id,
+                'chat_id': chat_id,
+                'message_id': message_id,
+                'video_info': json.loads(video_info),
+                'title': title,
+                'group': json.loads(target) if target else None,
+                'batch_id': batch_id,
+                'attempts': attempts,
+                'post_id': post_id,
+                'lease': lease_owner
+            }
+            for job_id, chat_id, message_id, video_info, title, target, batch_id, attempts, post_id, lease_owner in rows
+        ]
+
+    def extend_lease(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Продлить аренду задач ещё на lease_seconds (пульс живого воркера)
+
+        Задачу, аренда которой уже истекла и перешла к другому воркеру,
+        публиковать нельзя: у неё выставляется job['lease_lost'].
+
+        Returns:
+            Задачи, аренда которых всё ещё у этого воркера
+        """
+        now = int(datetime.now().timestamp())
+        held = []
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                for job in jobs:
+                    # Завершённые задачи (аренда снята) и уже потерянные не продлеваем
+                    if not job.get('lease') or job.get('lease_lost'):
+                        continue
+                    updated = self._conn.execute(
+                        SQL_EXTEND_LEASE, (now + self.lease_seconds, now, job['id'], job['lease'])
+                    ).rowcount
+                    if updated:
+                        held.append(job)
+                    else:
+                        job['lease_lost'] = True
+                        logger.warning(f"Аренда задачи публикации ID={job['id']} потеряна, задачу ведёт другой воркер")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return held
+
+    def release(self, jobs: List[Dict], delay: float = 0) -> int:
+        """
+        Вернуть задачи в очередь через delay секунд (воркер не смог их обработать)
+
+        Returns:
+            Сколько задач возвращено (чужие и завершённые не трогаются)
+        """
+        now = int(datetime.now().timestamp())
+        released = 0
+        with self._lock:
+            for job in jobs:
+                if not job.get('lease'):
+                    continue
+                released += self._conn.execute(
+                    SQL_RELEASE_JOB, (now + int(delay), now, job['id'], job['lease'])
+                ).rowcount
+                job['lease'] = None
+            self._conn.commit()
+        return released
+
+    def attach_post(self, job: Dict, post_id: int):
+        """
+        Запомнить слот, занятый задачей (чтобы после сбоя знать, что с ним стало)
+        """
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._conn.execute(SQL_ATTACH_POST, (post_id, now, job['id'], job['lease']))
+            self._conn.commit()
+        job['post_id'] = post_id
+
+    def complete(self, job: Dict):
+        """
+        Отметить задачу выполненной
+        """
+        self._finish(job, 'done', None)
+
+    def fail(self, job: Dict, error: str):
+        """
+        Отказаться от задачи окончательно
+        """
+        self._finish(job, 'failed', error)
+        logger.error(f"Задача публикации ID={job['id']} отменена: {error}")
+
+    def retry(self, job: Dict, error: str, delay: float) -> bool:
+        """
+        Вернуть задачу в очередь через delay секунд
+
+        Returns:
+            False, если попытки кончились и задача отменена
+        """
+        if job['attempts'] >= self.max_attempts:
+            self.fail(job, error)
+            return False
+
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._conn.execute(SQL_REQUEUE_JOB, (now + int(delay), error, now, job['id'], job['lease']))
+            self._conn.commit()
+        job['lease'] = None
+
+        logger.warning(
+            f"Задача публикации ID={job['id']} будет повторена через {int(delay)} сек "
+            f"(попытка {job['attempts']}/{self.max_attempts}): {error}"
+        )
+        return True
+
+    def _finish(self, job: Dict, status: str, error: Optional[str]):
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._conn.execute(SQL_FINISH_JOB, (status, error, now, job['id'], job['lease']))
+            self._conn.commit()
+        # Задача больше не принадлежит воркеру - продлевать и возвращать её нельзя
+        job['lease'] = None
+
+    def release_all(self) -> int:
+        """
+        Вернуть в очередь все задачи в работе (при старте бота их воркеров уже нет)
+
+        Returns:
+            Сколько задач возвращено
+        """
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            released = self._conn.execute(SQL_RELEASE_ALL, (now,)).rowcount
+            self._conn.commit()
+
+        if released:
+            logger.info(f"Возвращено в очередь прерванных публикаций: {released}")
+        return released
+
+    def count_active(self) -> int:
+        """
+        Сколько задач ждут публикации или публикуются
+        """
+        with self._lock:
+            return self._conn.execute(SQL_COUNT_ACTIVE).fetchone()[0]
+
+    def known_video_ids(self, platform: str, video_ids: Iterable[str]) -> Set[str]:
+        """
+        Выбрать из video_ids видео, которые уже ждут публикации или опубликованы через очередь
+        """
+        with self._lock:
+            rows = self._conn.execute(SQL_KNOWN_VIDEO_IDS, (platform, json.dumps(list(video_ids)))).fetchall()
+        return {row[0] for row in rows}
+
+    def batch_progress(self, batch_id: str) -> Dict[str, int]:
+        """
+        Сколько задач пакетной загрузки в каждом статусе
+
+        Returns:
+            {статус: число задач}, например {'queued': 3, 'done': 10}
+        """
+        with self._lock:
+            return dict(self._conn.execute(SQL_BATCH_PROGRESS, (batch_id,)).fetchall())
+
+    def purge(self, retention_days: int = 30) -> int:
+        """
+        Удалить завершённые задачи старше retention_days дней
+        """
+        cutoff = int(datetime.now().timestamp()) - retention_days * 24 * 3600
+        with self._lock:
+            deleted = self._conn.execute(SQL_PURGE_FINISHED, (cutoff,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
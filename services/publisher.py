@@ -0,0 +1,412 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import PUBLISH_WORKERS, PUBLISH_RETRY_DELAY, PUBLISH_POLL_INTERVAL, SMMBOX_BATCH_SIZE
+from services.maintenance import sync_postponed_queue
+from services.retry_policy import CircuitOpenError
+from services.smmbox_api import group_key
+
+logger = logging.getLogger(__name__)
+
+# Уведомление пользователя: (задача, текст в HTML)
+Notifier = Callable[[Dict, str], Awaitable]
+
+
+class PublishError(Exception):
+    """Публикация не удалась, задачу можно повторить позже"""
+
+
+class PublishWorkers:
+    """
+    Фоновые воркеры, которые разбирают очередь публикаций
+
+    Каждый воркер берёт из PublishQueue до batch_size задач, занимает им слоты
+    в PostScheduler, отправляет посты в SMMBox одним запросом и сообщает
+    пользователям результат. Число воркеров ограничивает, сколько запросов
+    публикации идёт одновременно.
+    """
+
+    def __init__(
+        self,
+        queue,
+        scheduler,
+        smmbox_api,
+        video_downloader,
+        executor,
+        workers: int = PUBLISH_WORKERS,
+        retry_delay: float = PUBLISH_RETRY_DELAY,
+        poll_interval: float = PUBLISH_POLL_INTERVAL,
+        batch_size: int = SMMBOX_BATCH_SIZE
+    ):
+        """
+        Args:
+            queue: PublishQueue
+            scheduler: PostScheduler
+            smmbox_api: AsyncSMMBoxAPI
+            video_downloader: VideoDownloader (для обновления протухших ссылок)
+            executor: BlockingExecutor для вызовов базы и yt-dlp
+            workers: Сколько публикаций выполнять одновременно
+            retry_delay: Пауза перед первым повтором, дальше удваивается (сек)
+            poll_interval: Как часто проверять очередь, если не было сигнала (сек)
+            batch_size: Сколько задач публиковать одним запросом
+        """
+        self.queue = queue
+        self.scheduler = scheduler
+        self.smmbox_api = smmbox_api
+        self.video_downloader = video_downloader
+        self.executor = executor
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.batch_size = max(1, batch_size)
+        self._notify: Optional[Notifier] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, notify: Notifier):
+        """
+        Вернуть в очередь задачи, прерванные прошлым запуском, и запустить воркеров
+
+        Args:
+            notify: Корутина для сообщений пользователю о результате публикации
+        """
+        self._notify = notify
+        self._wakeup = asyncio.Event()
+        await self.executor.run('db', self.queue.release_all)
+
+        self._tasks = [
+            asyncio.create_task(self._worker(number), name=f'publish-worker-{number}')
+            for number in range(self.workers)
+        ]
+        logger.info(f"Запущено воркеров публикации: {self.workers}")
+
+    def wake(self):
+        """
+        Сообщить воркерам, что в очереди появилась задача
+        """
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def stop(self):
+        """
+        Остановить воркеров (незавершённые задачи подхватит следующий запуск)
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, number: int):
+        while True:
+            self._wakeup.clear()
+            try:
+                jobs = await self.executor.run('db', self.queue.claim_many, self.batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Воркер публикации {number}: не удалось взять задачи: {e}")
+                jobs = []
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Пока пачка публикуется, аренда её задач продлевается
+            heartbeat = asyncio.create_task(self._heartbeat(jobs))
+            try:
+                await self._publish_batch(jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Непредвиденная ошибка пачки: незавершённые задачи сразу возвращаем в очередь
+                logger.error(f"Воркер публикации {number}: ошибка пачки из {len(jobs)} задач: {e}")
+                try:
+                    await self.executor.run('db', self.queue.release, jobs, self.retry_delay)
+                except Exception as release_error:
+                    logger.error(f"Воркер публикации {number}: не удалось вернуть задачи в очередь: {release_error}")
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, jobs: List[Dict]):
+        """
+        Продлевать аренду задач, пока пачка не опубликована
+
+        Извлечение, повторы и ожидание лимита SMMBox могут занять больше одной
+        аренды - без продления задачи забрал бы другой воркер и опубликовал их повторно.
+        """
+        interval = max(self.queue.lease_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.executor.run('db', self.queue.extend_lease, jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду задач публикации: {e}")
+
+    async def _retry_later(self, job: Dict, exc: Exception) -> str:
+        """
+        Вернуть задачу в очередь с растущей паузой или отказаться от неё
+
+        Returns:
+            Текст для пользователя
+        """
+        error = str(exc) or exc.__class__.__name__
+        logger.error(f"Ошибка публикации задачи ID={job['id']}: {error}")
+
+        # Пока SMMBox недоступен, повторять раньше, чем закроется автомат, бессмысленно
+        delay = max(self.retry_delay * 2 ** (job['attempts'] - 1), getattr(exc, 'retry_after', 0))
+        requeued = await self.executor.run('db', self.queue.retry, job, error, delay)
+
+        if requeued:
+            return (
+                f"⏳ {self._group_prefix(job)}Публикация не удалась, повторю через {int(delay)} сек "
+                f"(попытка {job['attempts']}/{self.queue.max_attempts})..."
+            )
+        return (
+            f"❌ {self._group_prefix(job)}Не удалось опубликовать видео: {error}\n"
+            f"Попробуй позже или очисти отложенные посты в SMMBox."
+        )
+
+    async def _prepare(self, job: Dict, fresh: Dict[str, Dict]) -> Optional[Dict]:
+        """
+        Подготовить задачу к публикации
+
+        Args:
+            fresh: Уже обновлённые в этой пачке видео (одно видео в нескольких группах
+                обновляется один раз)
+
+        Returns:
+            Информация о видео со свежей прямой ссылкой или None, если задача
+            уже выполнена прошлой (прерванной) попыткой
+        """
+        # Прошлая попытка прервалась, успев занять слот
+        if job['post_id']:
+            post = await self.executor.run('db', self.scheduler.get_post, job['post_id'])
+            if post and post['status'] == 'posted':
+                await self.executor.run('db', self.queue.complete, job)
+                return None
+            if post and post['status'] == 'pending':
+                # Неизвестно, успел ли SMMBox принять пост - считаем слот занятым
+                await self.executor.run('db', self.scheduler.mark_as_failed, job['post_id'])
+
+        if job['group'] is None:
+            # Задача без группы - публикуем в первую VK группу
+            job['group'] = await self.smmbox_api.get_vk_group()
+            if not job['group']:
+                raise PublishError("не удалось получить данные VK группы")
+
+        # Прямая ссылка могла истечь, пока задача ждала в очереди
+        # (другой воркер, обновляющий то же видео, поделится своим результатом)
+        video_key = self.video_downloader.get_video_key(
+            job['video_info'].get('source_url') or job['video_info'].get('url')
+        )
+        if video_key not in fresh:
+            video_info = await self.executor.run_shared(
+                'extract', video_key, self.video_downloader.ensure_fresh_media_url, job['video_info']
+            )
+            if not video_info:
+                raise PublishError("ссылка на видео устарела, а получить новую не удалось")
+            fresh[video_key] = video_info
+        return fresh[video_key]
+
+    async def _publish_batch(self, jobs: List[Dict]):
+        """
+        Опубликовать пачку задач одним запросом /posts/postpone
+
+        Результат каждого поста разносится по его строке scheduled_posts и задаче.
+        Посты, чьё время оказалось занято, получают новый слот (до 3 раз).
+        Задачи одного видео в разные группы обычно попадают в одну пачку,
+        и пользователь получает по ним одно общее сообщение.
+        """
+        notes: List[Tuple[Dict, str]] = []  # (задача, текст для пользователя)
+        posted: List[Tuple[Dict, Dict]] = []  # (задача, слот)
+        fresh: Dict[str, Dict] = {}
+
+        pending = []  # (задача, информация о видео)
+        for job in jobs:
+            if job.get('lease_lost'):
+                continue
+            try:
+                video_info = await self._prepare(job, fresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                notes.append((job, await self._retry_later(job, e)))
+                continue
+            if video_info:
+                pending.append((job, video_info))
+            else:
+                post = await self.executor.run('db', self.scheduler.get_post, job['post_id'])
+                posted.append((job, post))
+
+        # Публикуем видео с текстом на стену (VK конвертирует в клип)
+        # Пробуем до 3 раз если время занято
+        for attempt in range(3):
+            if not pending:
+                break
+
+            reserved = []  # (задача, информация о видео, слот)
+            for job, video_info in pending:
+                try:
+                    schedule_info = await self._reserve(job, video_info, job['title'], video_info.get('platform', 'Unknown'))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    notes.append((job, await self._retry_later(job, e)))
+                    continue
+                reserved.append((job, video_info, schedule_info))
+
+            # Перед отправкой убеждаемся, что задачи всё ещё наши: задачу с истекшей арендой
+            # уже мог взять другой воркер, и отправка дала бы дубль поста
+            await self.executor.run('db', self.queue.extend_lease, [job for job, _, _ in reserved])
+            for job, _, schedule_info in reserved:
+                if job.get('lease_lost'):
+                    await self.executor.run('db', self.scheduler.delete_post, schedule_info['id'])
+            reserved = [item for item in reserved if not item[0].get('lease_lost')]
+            if not reserved:
+                break
+
+            try:
+                results = await self.smmbox_api.post_video_clips_to_wall([
+                    {
+                        'video_url': video_info['url'],
+                        'title': job['title'],
+                        'scheduled_timestamp': schedule_info['scheduled_timestamp'],
+                        'preview_url': video_info.get('thumbnail'),
+                        'group': job['group']
+                    }
+                    for job, video_info, schedule_info in reserved
+                ])
+            except CircuitOpenError as e:
+                # SMMBox недоступен ещё до отправки (не получить группу) - слоты свободны, задачи повторим позже
+                for job, _, schedule_info in reserved:
+                    await self.executor.run('db', self.scheduler.delete_post, schedule_info['id'])
+                    notes.append((job, await self._retry_later(job, e)))
+                break
+
+            pending = []
+            for (job, video_info, schedule_info), result in zip(reserved, results):
+                if result['ok']:
+                    # Отмечаем как опубликованное
+                    await self.executor.run('db', self.scheduler.mark_as_posted, schedule_info['id'])
+                    await self.executor.run('db', self.queue.complete, job)
+                    posted.append((job, schedule_info))
+                    continue
+
+                if not result['sent']:
+                    # Пост до SMMBox не дошёл - слот свободен, задачу повторим позже
+                    await self.executor.run('db', self.scheduler.delete_post, schedule_info['id'])
+                    error = (
+                        CircuitOpenError(result['retry_after']) if result['retry_after']
+                        else PublishError(result['error'])
+                    )
+                    notes.append((job, await self._retry_later(job, error)))
+                    continue
+
+                # Если не успех, помечаем слот как занятый
+                await self.executor.run('db', self.scheduler.mark_as_failed, schedule_info['id'])
+                if result['conflict'] and attempt < 2:
+                    pending.append((job, video_info))
+                elif result['conflict']:
+                    notes.append((job, await self._retry_later(job, PublishError("все слоты заняты"))))
+                else:
+                    notes.append((job, await self._retry_later(job, PublishError(result['error']))))
+
+            if pending:
+                logger.info(f"Попытка {attempt + 1}/3: время занято у {len(pending)} постов, пробую следующие слоты...")
+                # Карта разошлась с SMMBox - подтягиваем его очередь, чтобы следующие слоты были свободны
+                await sync_postponed_queue(self.smmbox_api, self.scheduler, self.executor)
+
+        await self._notify_batch(posted, notes)
+
+    async def _reserve(self, job: Dict, video_info: Dict, title: str, platform: str) -> Dict:
+        """
+        Занять слот в расписании группы задачи и привязать его к задаче
+        """
+        schedule_info = await self.executor.run(
+            'db',
+            self.scheduler.add_post,
+            video_url=video_info['url'],
+            video_title=title,
+            platform=platform,
+            group_key=group_key(job['group']),
+            video_id=video_info.get('id')
+        )
+        try:
+            await self.executor.run('db', self.queue.attach_post, job, schedule_info['id'])
+        except BaseException:
+            # Слот без задачи остался бы pending навсегда
+            await self.executor.run('db', self.scheduler.delete_post, schedule_info['id'])
+            raise
+        return schedule_info
+
+    @staticmethod
+    def _group_prefix(job: Dict) -> str:
+        group = job.get('group')
+        return f"[{group.get('name', 'VK')}] " if group else ''
+
+    async def _notify_batch(self, posted: List[Tuple[Dict, Dict]], notes: List[Tuple[Dict, str]]):
+        """
+        Сообщить пользователям итог пачки: одно сообщение на исходное сообщение пользователя
+        """
+        # О задачах пакетной загрузки сообщает общее сообщение пакета (services/batch_ingest.py)
+        posted = [(job, schedule_info) for job, schedule_info in posted if not job.get('batch_id')]
+        notes = [(job, text) for job, text in notes if not job.get('batch_id')]
+
+        messages: Dict[Tuple[int, Optional[int]], Dict] = {}
+        for job, schedule_info in posted:
+            message = messages.setdefault((job['chat_id'], job['message_id']), {'job': job, 'posted': [], 'notes': []})
+            message['posted'].append((job, schedule_info))
+        for job, text in notes:
+            message = messages.setdefault((job['chat_id'], job['message_id']), {'job': job, 'posted': [], 'notes': []})
+            message['notes'].append(text)
+
+        stats = None
+        for message in messages.values():
+            parts = []
+            if message['posted']:
+                if stats is None:
+                    stats = await self.executor.run('db', self.scheduler.get_stats)
+                parts.append(self._success_text(message['posted'], stats))
+            parts.extend(message['notes'])
+            await self._send(message['job'], "\n\n".join(parts))
+
+    @staticmethod
+    def _success_text(posted: List[Tuple[Dict, Dict]], stats: Dict) -> str:
+        job = posted[0][0]
+        if len(posted) == 1:
+            schedule = f"📅 Запланировано на: <b>{posted[0][1]['scheduled_datetime'].strftime('%d.%m.%Y в %H:%M')}</b>\n"
+            if job.get('group'):
+                schedule += f"👥 Группа: {job['group'].get('name', 'VK')}\n"
+        else:
+            schedule = "📅 Запланировано:\n" + "".join(
+                f"• {(item_job.get('group') or {}).get('name', 'VK')}: "
+                f"<b>{schedule_info['scheduled_datetime'].strftime('%d.%m.%Y в %H:%M')}</b>\n"
+                for item_job, schedule_info in posted
+            )
+
+        return (
+            f"✅ Видео добавлено в отложенные!\n\n"
+            f"📝 Название: <b>{job['title']}</b>\n"
+            f"🎬 Платформа: {job['video_info'].get('platform', 'Unknown')}\n"
+            f"{schedule}"
+            f"📌 Запись с клипом на стене\n\n"
+            f"📊 Статистика очереди:\n"
+            f"• Сегодня: {stats['today']}/{stats['posts_per_day_limit']}\n"
+            f"• Завтра: {stats['tomorrow']}/{stats['posts_per_day_limit']}\n"
+            f"• Всего в очереди: {stats['total_scheduled']}"
+        )
+
+    async def _send(self, job: Dict, text: str):
+        """
+        Сообщить пользователю о задаче (ошибка уведомления не влияет на публикацию)
+        """
+        try:
+            await self._notify(job, text)
+        except Exception as e:
+            logger.warning(f"Не удалось уведомить о задаче ID={job['id']}: {e}")
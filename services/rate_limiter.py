@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from config import SMMBOX_RATE_LIMIT, SMMBOX_RATE_BURST, SMMBOX_ENDPOINT_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+
+def parse_endpoint_limits(spec: Optional[str]) -> Dict[str, Tuple[float, int]]:
+    """
+    Разобрать лимиты по методам API
+
+    Формат: "/posts/postpone=2:5,/groups=0.5" - путь=запросов в секунду[:запас].
+    Без запаса он равен округлённой вверх скорости (минимум 1).
+
+    Returns:
+        {путь: (скорость, запас)}
+
+    Raises:
+        ValueError: если строка записана неверно
+    """
+    limits = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        path, _, value = part.partition('=')
+        rate, _, burst = value.partition(':')
+        try:
+            rate = float(rate)
+            burst = int(burst) if burst else max(1, int(rate + 0.999))
+        except ValueError:
+            raise ValueError(f"Неверный лимит SMMBox '{part}', ожидается путь=скорость[:запас]")
+        limits[path.strip()] = (rate, burst)
+    return limits
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Сколько секунд ждать по заголовку Retry-After (число секунд или HTTP-дата)
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """
+    Ведро токенов: в среднем rate запросов в секунду, всплеск до burst подряд
+
+    Ждущие запросы проходят по очереди (asyncio.Lock пропускает в порядке прихода).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Запросов в секунду (0 - без ограничения)
+            burst: Сколько запросов можно отправить подряд без ожидания
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.waiting = 0
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> float:
+        """
+        Дождаться токена
+
+        Returns:
+            Сколько секунд пришлось ждать
+        """
+        if self.rate <= 0 and not self._paused_until:
+            return 0.0
+
+        # Lock создаётся лениво внутри работающего event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    wait = self._paused_until - now
+                    if wait <= 0:
+                        if self.rate <= 0:
+                            break
+                        self._refill(now)
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            break
+                        wait = (1 - self._tokens) / self.rate
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+        return time.monotonic() - started
+
+    def pause(self, seconds: float):
+        """
+        Не выдавать токены seconds секунд (сервер попросил подождать)
+        """
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._refill(now)
+        self._tokens = 0.0
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов к SMMBox на стороне клиента
+
+    Каждый запрос берёт токен из общего ведра и из ведра своего метода API.
+    Ответ 429 с Retry-After останавливает выдачу токенов на указанное время,
+    поэтому пакетная загрузка идёт с максимальной скоростью, не упираясь в лимит токена.
+    """
+
+    def __init__(
+        self,
+        rate: float = SMMBOX_RATE_LIMIT,
+        burst: int = SMMBOX_RATE_BURST,
+        endpoint_limits: Optional[Dict[str, Tuple[float, int]]] = None
+    ):
+        """
+        Args:
+            rate: Общий лимит запросов в секунду (0 - без ограничения)
+            burst: Общий запас запросов подряд
+            endpoint_limits: Лимиты по путям {путь: (скорость, запас)},
+                по умолчанию из SMMBOX_ENDPOINT_RATE_LIMITS
+        """
+        self.global_bucket = TokenBucket(rate, burst)
+        if endpoint_limits is None:
+            endpoint_limits = parse_endpoint_limits(SMMBOX_ENDPOINT_RATE_LIMITS)
+        self.endpoint_buckets = {
+            path: TokenBucket(endpoint_rate, endpoint_burst)
+            for path, (endpoint_rate, endpoint_burst) in endpoint_limits.items()
+        }
+
+        self.requests = 0
+        self.delayed = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, path: str) -> float:
+        """
+        Дождаться разрешения на запрос к path
+
+        Returns:
+            Сколько секунд запрос простоял в очереди
+        """
+        waited = 0.0
+        bucket = self.endpoint_buckets.get(path)
+        if bucket:
+            waited += await bucket.acquire()
+        waited += await self.global_bucket.acquire()
+
+        self.requests += 1
+        if waited > 0.001:
+            self.delayed += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def penalize(self, path: str, retry_after: Optional[float]):
+        """
+        Учесть ответ 429: приостановить запросы на retry_after секунд
+
+        Лимит SMMBox считается на токен, поэтому пауза общая для всех методов.
+        """
+        self.rate_limited += 1
+        delay = retry_after if retry_after is not None else 1.0
+        self.global_bucket.pause(delay)
+        bucket = self.endpoint_buckets.get(path)
+        if bucket:
+            bucket.pause(delay)
+        logger.warning(f"SMMBox ограничил частоту запросов ({path}), пауза {delay:.1f} сек")
+
+    def get_stats(self) -> Dict:
+        """
+        Метрики очереди запросов
+        """
+        return {
+            'requests': self.requests,
+            'delayed': self.delayed,
+            'rate_limited': self.rate_limited,
+            'waiting': self.global_bucket.waiting + sum(b.waiting for b in self.endpoint_buckets.values()),
+            'avg_wait': self.total_wait / self.delayed if self.delayed else 0.0,
+            'max_wait': self.max_wait
+        }
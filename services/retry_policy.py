@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import aiohttp
+
+from config import (
+    SMMBOX_RETRY_BASE_DELAY,
+    SMMBOX_RETRY_MAX_DELAY,
+    SMMBOX_BREAKER_FAILURE_THRESHOLD,
+    SMMBOX_BREAKER_RESET_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Классы ошибок SMMBox
+CONFLICT = 'conflict'    # "на это время уже запланирован пост" - повтор бессмысленен, нужен другой слот
+RETRYABLE = 'retryable'  # 5xx, 429, таймаут, обрыв соединения - SMMBox временно недоступен
+FATAL = 'fatal'          # запрос отклонён (4xx или ошибка в ответе) - повтор даст то же самое
+
+# HTTP статусы, которые говорят о временной недоступности
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def is_slot_conflict(message: Optional[str]) -> bool:
+    """
+    Проверить, что SMMBox отказал, потому что на это время уже есть пост
+    """
+    return 'время запланирован' in (message or '').lower()
+
+
+def classify_error(message: Optional[str] = None, exc: Optional[BaseException] = None) -> str:
+    """
+    Определить класс ошибки SMMBox: CONFLICT, RETRYABLE или FATAL
+
+    Args:
+        message: Текст ошибки из ответа API (success = false)
+        exc: Исключение транспорта
+    """
+    if exc is not None:
+        if isinstance(exc, aiohttp.ClientResponseError):
+            return RETRYABLE if exc.status in RETRYABLE_STATUSES else FATAL
+        if isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)):
+            return RETRYABLE
+        # Битый JSON обычно значит HTML-страницу ошибки от прокси
+        if isinstance(exc, ValueError):
+            return RETRYABLE
+        return FATAL
+
+    return CONFLICT if is_slot_conflict(message) else FATAL
+
+
+class RetryPolicy:
+    """
+    Экспоненциальная пауза между повторами со случайным разбросом (full jitter)
+
+    Разброс не даёт всем ждущим запросам вернуться к SMMBox одновременно.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = SMMBOX_RETRY_BASE_DELAY,
+        max_delay: float = SMMBOX_RETRY_MAX_DELAY
+    ):
+        """
+        Args:
+            max_attempts: Сколько всего попыток
+            base_delay: Верхняя граница паузы после первой попытки (сек)
+            max_delay: Максимальная пауза (сек)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """
+        Пауза после попытки attempt (считая с 0)
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def sleep(self, attempt: int):
+        """
+        Подождать перед следующей попыткой, не блокируя event loop
+        """
+        await asyncio.sleep(self.delay(attempt))
+
+
+class CircuitOpenError(Exception):
+    """
+    SMMBox недоступен: автомат разомкнут, запрос не отправлялся
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"SMMBox временно недоступен, повтор через {int(retry_after)} сек")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Автомат, который перестаёт слать запросы в SMMBox, пока тот лежит
+
+    - closed: запросы идут, считаются временные ошибки подряд
+    - open: после failure_threshold ошибок подряд запросы сразу отклоняются
+    - half_open: через reset_timeout секунд пропускается один пробный запрос;
+      успех замыкает автомат, ошибка снова размыкает его
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = SMMBOX_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = SMMBOX_BREAKER_RESET_TIMEOUT
+    ):
+        """
+        Args:
+            failure_threshold: Сколько временных ошибок подряд размыкают автомат
+            reset_timeout: Через сколько секунд пробовать снова (сек)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self):
+        """
+        Проверить, можно ли отправить запрос
+
+        Raises:
+            CircuitOpenError: если автомат разомкнут или пробный запрос уже идёт
+        """
+        if self.state == self.CLOSED:
+            return
+
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+            logger.info("SMMBox: автомат в полуоткрытом состоянии, отправляю пробный запрос")
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+
+        raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        """
+        Запрос дошёл до SMMBox (даже если тот отказал по существу)
+        """
+        if self.state != self.CLOSED:
+            logger.info("SMMBox снова доступен, автомат замкнут")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Пробный запрос отменён, не дойдя до результата - разрешить следующий
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """
+        Временная ошибка: 5xx, 429, таймаут или обрыв соединения
+        """
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"SMMBox недоступен ({self._failures} ошибок подряд), "
+                    f"запросы приостановлены на {int(self.reset_timeout)} сек"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
@@ -1,48 +1,498 @@
+import json
+import re
 import sqlite3
 import logging
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Set, Iterable
 from pathlib import Path
 
+from services.slot_plan import SlotPlanner
+
 logger = logging.getLogger(__name__)
 
+# Миграции схемы: номер версии = индекс + 1 (хранится в PRAGMA user_version)
+SCHEMA_MIGRATIONS = [
+    # 1: исходная таблица
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scheduled_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_url TEXT NOT NULL,
+            video_title TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            scheduled_date INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            status TEXT DEFAULT 'pending'
+        )
+        ''',
+    ],
+    # 2: индексы для поиска слотов и статистики
+    [
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_date ON scheduled_posts(status, scheduled_date)',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_posts_date ON scheduled_posts(scheduled_date)',
+    ],
+    # 3: один активный пост на timestamp (старые дубликаты снимаем с расписания)
+    [
+        '''
+        UPDATE scheduled_posts SET status = 'cancelled'
+        WHERE status IN ('pending', 'failed') AND id NOT IN (
+            SELECT MIN(id) FROM scheduled_posts
+            WHERE status IN ('pending', 'failed')
+            GROUP BY scheduled_date
+        )
+        ''',
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduled_posts_active_date
+        ON scheduled_posts(scheduled_date) WHERE status IN ('pending', 'failed')
+        ''',
+    ],
+    # 4: счётчики постов по дням и статусам, которые ведут триггеры (для /stats без сканирования таблицы)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS post_counters (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        )
+        ''',
+        '''
+        INSERT OR REPLACE INTO post_counters (day, status, count)
+        SELECT date(scheduled_date, 'unixepoch', 'localtime'), status, COUNT(*)
+        FROM scheduled_posts
+        GROUP BY 1, 2
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_post_counters_insert AFTER INSERT ON scheduled_posts
+        BEGIN
+            INSERT INTO post_counters (day, status, count)
+            VALUES (date(NEW.scheduled_date, 'unixepoch', 'localtime'), NEW.status, 1)
+            ON CONFLICT (day, status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_post_counters_update AFTER UPDATE OF status, scheduled_date ON scheduled_posts
+        WHEN OLD.status IS NOT NEW.status OR OLD.scheduled_date != NEW.scheduled_date
+        BEGIN
+            UPDATE post_counters SET count = count - 1
+            WHERE day = date(OLD.scheduled_date, 'unixepoch', 'localtime') AND status = OLD.status;
+            INSERT INTO post_counters (day, status, count)
+            VALUES (date(NEW.scheduled_date, 'unixepoch', 'localtime'), NEW.status, 1)
+            ON CONFLICT (day, status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_post_counters_delete AFTER DELETE ON scheduled_posts
+        BEGIN
+            UPDATE post_counters SET count = count - 1
+            WHERE day = date(OLD.scheduled_date, 'unixepoch', 'localtime') AND status = OLD.status;
+        END
+        ''',
+    ],
+    # 5: архив опубликованных постов (основная таблица хранит только свежие)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scheduled_posts_archive (
+            id INTEGER PRIMARY KEY,
+            video_url TEXT NOT NULL,
+            video_title TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            scheduled_date INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_created ON scheduled_posts(status, created_at)',
+    ],
+    # 6: публикация в несколько групп - у каждой группы свои слоты ('' - посты до появления групп)
+    [
+        "ALTER TABLE scheduled_posts ADD COLUMN group_key TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE scheduled_posts_archive ADD COLUMN group_key TEXT NOT NULL DEFAULT ''",
+        'DROP INDEX IF EXISTS uq_scheduled_posts_active_date',
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduled_posts_active_group_date
+        ON scheduled_posts(group_key, scheduled_date) WHERE status IN ('pending', 'failed')
+        ''',
+    ],
+    # 7: ID видео на платформе - отслеживание каналов пропускает уже известные видео
+    [
+        'ALTER TABLE scheduled_posts ADD COLUMN video_id TEXT',
+        'ALTER TABLE scheduled_posts_archive ADD COLUMN video_id TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_posts_video ON scheduled_posts(platform, video_id) WHERE video_id IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_posts_archive_video ON scheduled_posts_archive(platform, video_id) WHERE video_id IS NOT NULL',
+    ],
+    # 8: очередь публикаций (PublishQueue)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS publish_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER,
+            video_info TEXT NOT NULL,
+            title TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at INTEGER NOT NULL,
+            lease_owner TEXT,
+            lease_until INTEGER,
+            post_id INTEGER,
+            last_error TEXT,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_publish_jobs_status_available ON publish_jobs(status, available_at)',
+    ],
+    # 9: группа, пакетная загрузка и ID видео у задач публикации
+    # (раньше PublishQueue добавлял эти колонки сам, поэтому они уже могут быть)
+    [
+        'ALTER TABLE publish_jobs ADD COLUMN target TEXT',  # группа SMMBox (JSON) или NULL - первая VK группа
+        'ALTER TABLE publish_jobs ADD COLUMN batch_id TEXT',  # о задачах пакета сообщает общее сообщение пакета
+        'ALTER TABLE publish_jobs ADD COLUMN platform TEXT',
+        'ALTER TABLE publish_jobs ADD COLUMN video_id TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_publish_jobs_batch ON publish_jobs(batch_id) WHERE batch_id IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS idx_publish_jobs_video ON publish_jobs(platform, video_id) WHERE video_id IS NOT NULL',
+    ],
+    # 10: отслеживаемые источники (SourceStore) и видео, которые не удалось извлечь
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS tracked_sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_polled_at INTEGER,
+            UNIQUE (chat_id, url)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS source_failed_entries (
+            source_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            failed_at INTEGER NOT NULL,
+            PRIMARY KEY (source_id, platform, video_id)
+        )
+        ''',
+    ],
+]
+
+ADD_COLUMN_PATTERN = re.compile(r'\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)', re.IGNORECASE)
+
+# Настройки соединения: WAL позволяет читать во время записи
+CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -8000',
+    'PRAGMA busy_timeout = 5000',
+]
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Применить недостающие миграции SCHEMA_MIGRATIONS к базе
+
+    Каждая миграция вместе с новым user_version идёт одной транзакцией: после
+    сбоя посреди миграции база остаётся на прошлой версии, и при следующем
+    запуске миграция повторяется целиком. Добавление уже существующей колонки
+    пропускается. Базу делят PostScheduler, PublishQueue и SourceStore - каждый
+    вызывает migrate при открытии, BEGIN IMMEDIATE не даёт им мигрировать разом.
+
+    Returns:
+        Версия схемы после миграций
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, statements in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Пока ждали блокировку, миграцию мог применить другой объект
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= number:
+                conn.rollback()
+                continue
+            for statement in statements:
+                added = ADD_COLUMN_PATTERN.match(statement)
+                if added and _column_exists(conn, *added.groups()):
+                    continue
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Схема базы обновлена до версии {number}")
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# Статусы, при которых пост занимает слот
+ACTIVE_STATUSES = ('pending', 'failed')
+# Статусы, при которых будущий пост держит слот в карте занятости
+# (опубликованный в SMMBox пост остаётся в его очереди до своего времени)
+OCCUPYING_STATUSES = ('pending', 'failed', 'posted')
+# Статусы, которые считаются в дневной лимит
+SCHEDULED_STATUSES = ('pending', 'posted')
+
+# Частые запросы - одни и те же строки SQL, поэтому sqlite3 переиспользует подготовленные выражения
+SQL_IS_SLOT_TAKEN = '''
+    SELECT 1 FROM scheduled_posts
+    WHERE status IN ('pending', 'failed') AND group_key = ? AND scheduled_date = ?
+    LIMIT 1
+'''
+SQL_COUNT_SCHEDULED_BETWEEN = '''
+    SELECT COUNT(*) FROM scheduled_posts
+    WHERE status IN ('pending', 'posted') AND scheduled_date >= ? AND scheduled_date < ?
+'''
+SQL_INSERT_POST = '''
+    INSERT INTO scheduled_posts (video_url, video_title, platform, scheduled_date, created_at, group_key, video_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_LOAD_OCCUPANCY = '''
+    SELECT id, group_key, scheduled_date, status FROM scheduled_posts
+    WHERE status IN ('pending', 'failed', 'posted') AND scheduled_date >= ?
+'''
+SQL_COUNTERS_BY_DAY = '''
+    SELECT day, status, count FROM post_counters WHERE count > 0
+'''
+SQL_SET_STATUS = 'UPDATE scheduled_posts SET status = ? WHERE id = ?'
+SQL_DELETE_POST = 'DELETE FROM scheduled_posts WHERE id = ?'
+SQL_GET_POST = 'SELECT scheduled_date, status, group_key FROM scheduled_posts WHERE id = ?'
+SQL_ARCHIVE_POSTED = '''
+    INSERT OR REPLACE INTO scheduled_posts_archive
+        (id, video_url, video_title, platform, scheduled_date, created_at, archived_at, group_key, video_id)
+    SELECT id, video_url, video_title, platform, scheduled_date, created_at, ?, group_key, video_id
+    FROM scheduled_posts
+    WHERE status = 'posted' AND scheduled_date < ?
+'''
+# Известные видео из списка ID (JSON-массив): запланированные, опубликованные или уже в архиве
+SQL_KNOWN_VIDEO_IDS = '''
+    SELECT video_id FROM scheduled_posts
+    WHERE platform = ? AND video_id IN (SELECT value FROM json_each(?)) AND status IN ('pending', 'posted')
+    UNION
+    SELECT video_id FROM scheduled_posts_archive
+    WHERE platform = ? AND video_id IN (SELECT value FROM json_each(?))
+'''
+# Посты, запланированные до появления групп (миграция 6 оставила им пустой group_key)
+SQL_ADOPT_LEGACY_POSTS = "UPDATE OR IGNORE scheduled_posts SET group_key = ? WHERE group_key = ''"
+SQL_ADOPT_LEGACY_ARCHIVE = "UPDATE scheduled_posts_archive SET group_key = ? WHERE group_key = ''"
+SQL_DELETE_ARCHIVED = "DELETE FROM scheduled_posts WHERE status = 'posted' AND scheduled_date < ?"
+SQL_EXPIRE_FAILED = "UPDATE scheduled_posts SET status = 'expired' WHERE status = 'failed' AND created_at < ?"
+SQL_DELETE_EMPTY_COUNTERS = 'DELETE FROM post_counters WHERE count <= 0'
+
 
 class PostScheduler:
     """
     Планировщик постов с ограничением по количеству в день
+
+    Слоты и дневной лимит считаются отдельно для каждой группы (group_key),
+    поэтому одно видео можно поставить в несколько групп на одно и то же время.
     """
     
-    def __init__(self, db_path: str = "scheduler.db", posts_per_day: int = 7):
+    def __init__(
+        self,
+        db_path: str = "scheduler.db",
+        posts_per_day: int = 7,
+        slot_planner: Optional[SlotPlanner] = None
+    ):
+        """
+        Args:
+            db_path: Путь к файлу SQLite
+            posts_per_day: Максимум постов в день
+            slot_planner: Сетка слотов (по умолчанию 8:00-22:00 каждый день)
+        """
         self.db_path = db_path
         self.posts_per_day = posts_per_day
+        self.slot_planner = slot_planner or SlotPlanner(posts_per_day=posts_per_day)
+        
+        # Одно соединение на весь процесс (вызовы идут из пула потоков, поэтому под блокировкой)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=64)
+        
+        # Карта занятости будущих слотов в памяти (загружается одним запросом)
+        self._active_posts: Dict[int, Tuple[str, int, str]] = {}  # id поста -> (группа, timestamp, статус)
+        self._taken_slots: Counter = Counter()  # (группа, timestamp) -> сколько постов занимают слот
+        self._scheduled_per_day: Counter = Counter()  # (группа, начало дня) -> сколько постов в расписании
+        self._external_slots: Dict[str, Set[int]] = {}  # группа -> timestamp'ы из очереди SMMBox, которых нет в базе
+        
+        # Последняя статистика: пересчитывается только если в базе что-то изменилось
+        self._stats_cache: Optional[Tuple[Tuple[str, int], Dict]] = None
+        
         self.init_db()
+        self.reload_occupancy()
     
     def init_db(self):
         """
-        Инициализация базы данных
-        """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scheduled_posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                video_url TEXT NOT NULL,
-                video_title TEXT NOT NULL,
-                platform TEXT NOT NULL,
-                scheduled_date INTEGER NOT NULL,
-                created_at INTEGER NOT NULL,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        Инициализация базы данных: настройки соединения и миграции схемы
+        """
+        with self._lock:
+            for pragma in CONNECTION_PRAGMAS:
+                self._conn.execute(pragma)
+            
+            migrate(self._conn)
+        
         logger.info(f"База данных инициализирована: {self.db_path}")
     
-    def get_next_available_slot(self) -> int:
+    @staticmethod
+    def _day_start(timestamp: int) -> int:
+        """
+        Начало дня (00:00 по местному времени) для timestamp
+        """
+        date = datetime.fromtimestamp(timestamp)
+        return int(datetime(date.year, date.month, date.day).timestamp())
+    
+    def reload_occupancy(self):
+        """
+        Загрузить занятые слоты с сегодняшнего дня одним запросом
+        """
+        today_start = self._day_start(int(datetime.now().timestamp()))
+        
+        with self._lock:
+            rows = self._conn.execute(SQL_LOAD_OCCUPANCY, (today_start,)).fetchall()
+            
+            self._active_posts.clear()
+            self._taken_slots.clear()
+            self._scheduled_per_day.clear()
+            for post_id, group_key, timestamp, status in rows:
+                self._track(post_id, timestamp, status, group_key)
+            
+            # Слоты из очереди SMMBox в базе не хранятся - накладываем их заново
+            external = self._external_slots
+            self._external_slots = {}
+            for group_key, timestamps in external.items():
+                self._add_external_slots(timestamps, today_start, group_key)
+        
+        logger.info(f"Загружена карта занятости: {len(rows)} активных постов")
+    
+    def _occupy(self, group_key: str, timestamp: int, scheduled: bool):
+        """
+        Занять слот группы в карте (вызывается под блокировкой)
+        """
+        self._taken_slots[(group_key, timestamp)] += 1
+        if scheduled:
+            self._scheduled_per_day[(group_key, self._day_start(timestamp))] += 1
+    
+    def _release(self, group_key: str, timestamp: int, scheduled: bool):
+        """
+        Освободить слот группы в карте (вызывается под блокировкой)
+        """
+        slot = (group_key, timestamp)
+        self._taken_slots[slot] -= 1
+        if self._taken_slots[slot] <= 0:
+            del self._taken_slots[slot]
+        if scheduled:
+            day = (group_key, self._day_start(timestamp))
+            self._scheduled_per_day[day] -= 1
+            if self._scheduled_per_day[day] <= 0:
+                del self._scheduled_per_day[day]
+    
+    def _track(self, post_id: int, timestamp: int, status: str, group_key: str = ''):
+        """
+        Учесть пост в карте занятости (вызывается под блокировкой)
+        """
+        if status not in OCCUPYING_STATUSES:
+            return
+        self._active_posts[post_id] = (group_key, timestamp, status)
+        self._occupy(group_key, timestamp, status in SCHEDULED_STATUSES)
+    
+    def _untrack(self, post_id: int):
+        """
+        Убрать пост из карты занятости (вызывается под блокировкой)
+        """
+        entry = self._active_posts.pop(post_id, None)
+        if entry is None:
+            return
+        group_key, timestamp, status = entry
+        self._release(group_key, timestamp, status in SCHEDULED_STATUSES)
+    
+    def _add_external_slots(self, timestamps: Iterable[int], since: int, group_key: str = '') -> int:
+        """
+        Занять в карте слоты группы из очереди SMMBox (вызывается под блокировкой)
+        
+        Пропускает прошедшие дни и слоты, которые уже заняты нашими постами.
+        """
+        own = {timestamp for key, timestamp, _ in self._active_posts.values() if key == group_key}
+        external = self._external_slots.setdefault(group_key, set())
+        for timestamp in set(timestamps):
+            if timestamp < since or timestamp in own:
+                continue
+            external.add(timestamp)
+            self._occupy(group_key, timestamp, True)
+        return len(external)
+    
+    def _drop_external_slots(self, group_key: str = ''):
+        """
+        Убрать из карты слоты группы, добавленные прошлой сверкой (вызывается под блокировкой)
+        """
+        for timestamp in self._external_slots.pop(group_key, ()):
+            self._release(group_key, timestamp, True)
+    
+    def sync_external_slots(self, timestamps: Iterable[int], group_key: str = '') -> int:
+        """
+        Сверить карту занятости группы с реальной очередью отложенных постов SMMBox
+        
+        Посты, созданные в обход бота (вручную, другим сервисом), занимают слоты
+        так же, как наши, поэтому первый выбранный слот почти всегда свободен.
+        Каждая сверка полностью заменяет результат предыдущей для этой группы.
+        
+        Args:
+            timestamps: Время публикации всех отложенных постов группы
+            group_key: Группа, которой принадлежит очередь
+        
+        Returns:
+            Сколько слотов группы занято только в SMMBox
+        """
+        today_start = self._day_start(int(datetime.now().timestamp()))
+        
+        with self._lock:
+            self._drop_external_slots(group_key)
+            return self._add_external_slots(timestamps, today_start, group_key)
+    
+    def adopt_legacy_posts(self, group_key: str) -> int:
+        """
+        Перенести посты без группы в расписание группы по умолчанию
+    
+        До появления групп все посты уходили в первую VK группу, но миграция 6
+        оставила им group_key = '', и их слоты не мешали новым постам этой группы.
+        Пост, чьё время в группе уже занято, остаётся без группы.
+    
+        Args:
+            group_key: Ключ первой VK группы
+    
+        Returns:
+            Сколько постов перенесено
+        """
+        if not group_key:
+            return 0
+        with self._lock:
+            adopted = self._conn.execute(SQL_ADOPT_LEGACY_POSTS, (group_key,)).rowcount
+            self._conn.execute(SQL_ADOPT_LEGACY_ARCHIVE, (group_key,))
+            self._conn.commit()
+    
+        if adopted:
+            logger.info(f"Посты без группы перенесены в группу {group_key}: {adopted}")
+            self.reload_occupancy()
+        return adopted
+    
+    def close(self):
+        """
+        Закрыть соединение с базой
+        """
+        with self._lock:
+            self._conn.close()
+    
+    def get_next_available_slot(self, group_key: str = '') -> int:
         """
-        Получить следующий доступный временной слот для публикации
+        Получить следующий доступный временной слот для публикации в группу
+        
+        Считается по карте занятости в памяти, без запросов к базе.
+        
+        Args:
+            group_key: Группа, в которой ищем слот
         
         Returns:
             Unix timestamp следующего свободного слота
@@ -60,201 +510,270 @@ class PostScheduler:
         
         # Ищем первый день с свободными слотами
         while True:
-            # Начало и конец дня
-            day_start = int(current_date.timestamp())
-            day_end = int((current_date + timedelta(days=1)).timestamp())
-            
             # Считаем сколько постов уже запланировано на этот день
-            posts_count = self.count_posts_for_day(day_start, day_end)
+            with self._lock:
+                posts_count = self._scheduled_per_day.get((group_key, int(current_date.timestamp())), 0)
             
             if posts_count < self.posts_per_day:
                 # Есть свободные слоты в этот день
                 # Проверяем каждый слот пока не найдём свободный
-                for slot_number in range(self.posts_per_day):
-                    slot_time = self._calculate_slot_time(current_date, slot_number)
-                    slot_timestamp = int(slot_time.timestamp())
-                    
+                for slot_timestamp in self.slot_planner.get_day_plan(current_date):
                     # ВАЖНО: Пропускаем слоты в прошлом
                     if slot_timestamp < now_timestamp:
                         continue  # Идём к следующему слоту
                     
                     # Проверяем, не занят ли этот конкретный timestamp
-                    if not self._is_slot_taken(slot_timestamp):
+                    if not self._is_slot_taken(slot_timestamp, group_key):
                         return slot_timestamp
             
             # Переходим к следующему дню
             current_date += timedelta(days=1)
     
-    def _is_slot_taken(self, timestamp: int) -> bool:
+    def _is_slot_taken(self, timestamp: int, group_key: str = '') -> bool:
         """
-        Проверить, занят ли конкретный временной слот
+        Проверить, занят ли конкретный временной слот группы
         
         Args:
             timestamp: Unix timestamp для проверки
+            group_key: Группа
             
         Returns:
-            True если слот занят (pending или failed), False если свободен
+            True если слот занят (нашим постом или в очереди SMMBox), False если свободен
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            if timestamp >= self._day_start(int(datetime.now().timestamp())):
+                return self._taken_slots.get((group_key, timestamp), 0) > 0
+            
+            # Прошедшие дни в карте не хранятся - спрашиваем базу
+            row = self._conn.execute(SQL_IS_SLOT_TAKEN, (group_key, timestamp)).fetchone()
         
-        # Проверяем есть ли посты на это точное время (pending или failed)
-        cursor.execute('''
-            SELECT COUNT(*) FROM scheduled_posts 
-            WHERE scheduled_date = ?
-            AND status IN ('pending', 'failed')
-        ''', (timestamp,))
+        return row is not None
+    
+    def count_posts_for_day(self, day_start: int, day_end: int) -> int:
+        """
+        Подсчитать количество постов запланированных на определённый день
+        (как в дневном лимите: и ждущие отправки, и уже принятые SMMBox)
+        """
+        with self._lock:
+            return self._conn.execute(SQL_COUNT_SCHEDULED_BETWEEN, (day_start, day_end)).fetchone()[0]
+    
+    def add_post(
+        self,
+        video_url: str,
+        video_title: str,
+        platform: str,
+        group_key: str = '',
+        video_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Добавить пост в расписание группы
         
-        count = cursor.fetchone()[0]
-        conn.close()
+        Args:
+            video_id: ID видео на платформе (см. known_video_ids)
         
-        return count > 0
+        Returns:
+            Dict с информацией о запланированном посте
+        """
+        return self.reserve_slots(video_url, video_title, platform, count=1, group_key=group_key, video_id=video_id)[0]
     
-    def _calculate_slot_time(self, date: datetime, slot_number: int) -> datetime:
+    def reserve_slots(
+        self,
+        video_url: str,
+        video_title: str,
+        platform: str,
+        count: int = 1,
+        max_attempts: int = 3,
+        group_key: str = '',
+        video_id: Optional[str] = None
+    ) -> List[Dict]:
         """
-        Рассчитать время для слота в конкретный день
+        Атомарно найти и занять count ближайших свободных слотов в группе
         
         Args:
-            date: Дата (год, месяц, день)
-            slot_number: Номер слота (0-6 для 7 постов в день)
-        """
-        import random
+            count: Сколько идущих подряд свободных слотов занять (для пакетных задач)
+            max_attempts: Сколько раз повторить, если слот успели занять
+            group_key: Группа, в расписание которой ставим посты
         
-        # Фиксированные минуты для каждого слота (избегаем :00 и :30)
-        # Это гарантирует что один и тот же слот всегда даст одно и то же время
-        slot_minutes = [17, 42, 13, 51, 24, 38, 56]  # Разные минуты для каждого слота
+        Returns:
+            Список Dict с информацией о запланированных постах (по времени)
+        """
+        return self._reserve(video_url, video_title, platform, [group_key] * count, max_attempts, video_id)
+    
+    def reserve_for_groups(
+        self,
+        video_url: str,
+        video_title: str,
+        platform: str,
+        group_keys: List[str],
+        max_attempts: int = 3,
+        video_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Атомарно занять для одного видео ближайший свободный слот в каждой группе
         
-        # Распределяем посты с 8:00 до 22:00 (14 часов)
-        # Минимальный интервал: 2 часа между постами
-        start_hour = 8
-        base_interval_hours = 2.0  # 2 часа минимум
+        Returns:
+            Список Dict с информацией о запланированных постах в порядке group_keys
+        """
+        return self._reserve(video_url, video_title, platform, list(group_keys), max_attempts, video_id)
+    
+    def _reserve(
+        self,
+        video_url: str,
+        video_title: str,
+        platform: str,
+        group_keys: List[str],
+        max_attempts: int,
+        video_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Занять по слоту на каждый элемент group_keys одной транзакцией
         
-        # Добавляем случайное смещение от 0 до +30 минут (в часах)
-        # ВАЖНО: используем slot_number как seed для random, чтобы один слот всегда давал одно смещение
-        random.seed(f"{date.year}{date.month}{date.day}{slot_number}")
-        random_offset = random.uniform(0, 0.5)  # 0-30 минут дополнительно
-        random.seed()  # Сбрасываем seed
+        Поиск и вставка идут в одной транзакции BEGIN IMMEDIATE, а уникальный
+        индекс по активным (группа, timestamp) не даёт двум постам занять один слот,
+        даже если базу использует другой процесс.
+        """
+        for attempt in range(max_attempts):
+            with self._lock:
+                reserved = []
+                try:
+                    self._conn.execute('BEGIN IMMEDIATE')
+                    created_at = int(datetime.now().timestamp())
+                    
+                    for group_key in group_keys:
+                        scheduled_timestamp = self.get_next_available_slot(group_key)
+                        cursor = self._conn.execute(
+                            SQL_INSERT_POST,
+                            (video_url, video_title, platform, scheduled_timestamp, created_at, group_key, video_id)
+                        )
+                        self._track(cursor.lastrowid, scheduled_timestamp, 'pending', group_key)
+                        reserved.append((cursor.lastrowid, scheduled_timestamp, group_key))
+                    
+                    self._conn.commit()
+                    
+                except sqlite3.IntegrityError:
+                    # Слот занят в обход карты (другой процесс) - перечитываем карту и пробуем снова
+                    self._conn.rollback()
+                    self.reload_occupancy()
+                    logger.warning(f"Слот уже занят, повторяю резервирование (попытка {attempt + 1}/{max_attempts})")
+                    continue
+                
+                except Exception:
+                    self._conn.rollback()
+                    for post_id, _, _ in reserved:
+                        self._untrack(post_id)
+                    raise
+            
+            posts = []
+            for post_id, scheduled_timestamp, group_key in reserved:
+                scheduled_datetime = datetime.fromtimestamp(scheduled_timestamp)
+                logger.info(f"Пост добавлен в расписание: ID={post_id}, дата={scheduled_datetime}, группа={group_key or '-'}")
+                posts.append({
+                    'id': post_id,
+                    'scheduled_timestamp': scheduled_timestamp,
+                    'scheduled_datetime': scheduled_datetime,
+                    'video_title': video_title,
+                    'platform': platform,
+                    'group_key': group_key
+                })
+            return posts
+        
+        raise RuntimeError("Не удалось зарезервировать слот: все попытки заняты конкурентами")
+    
+    def get_stats(self, histogram_days: int = 7) -> Dict:
+        """
+        Получить статистику по запланированным постам
         
-        post_hour = start_hour + (slot_number * base_interval_hours) + random_offset
+        Берётся одним запросом из счётчиков post_counters (их ведут триггеры),
+        а если с прошлого вызова база не менялась - из памяти.
         
-        # Ограничиваем диапазон 8:00 - 22:00
-        post_hour = max(8.0, min(21.9, post_hour))
+        Args:
+            histogram_days: На сколько дней вперёд вернуть число постов по дням
+        """
+        today = datetime.now().date()
         
-        hour = int(post_hour)
-        minute = slot_minutes[slot_number % len(slot_minutes)]
+        with self._lock:
+            cache_key = (today.isoformat(), self._conn.total_changes)
+            if self._stats_cache and self._stats_cache[0] == cache_key:
+                return self._stats_cache[1]
+            
+            rows = self._conn.execute(SQL_COUNTERS_BY_DAY).fetchall()
+        
+        # По дням считаем как дневной лимит: пост, принятый SMMBox ('posted'), всё ещё занимает день
+        scheduled_by_day: Counter = Counter()
+        totals: Counter = Counter()
+        for day, status, count in rows:
+            totals[status] += count
+            if status in SCHEDULED_STATUSES:
+                scheduled_by_day[day] += count
+        
+        week = [
+            (today + timedelta(days=offset), scheduled_by_day.get((today + timedelta(days=offset)).isoformat(), 0))
+            for offset in range(histogram_days)
+        ]
+        
+        stats = {
+            'total_pending': totals['pending'],
+            'total_posted': totals['posted'],
+            'total_failed': totals['failed'],
+            'total_scheduled': sum(count for day, count in scheduled_by_day.items() if day >= today.isoformat()),
+            'today': scheduled_by_day.get(today.isoformat(), 0),
+            'tomorrow': scheduled_by_day.get((today + timedelta(days=1)).isoformat(), 0),
+            'week': week,
+            'posts_per_day_limit': self.posts_per_day
+        }
         
-        return datetime(date.year, date.month, date.day, hour, minute)
+        with self._lock:
+            self._stats_cache = (cache_key, stats)
+        return stats
     
-    def count_posts_for_day(self, day_start: int, day_end: int) -> int:
+    def _set_status(self, post_id: int, status: str):
         """
-        Подсчитать количество постов запланированных на определённый день
+        Сменить статус поста
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM scheduled_posts 
-            WHERE scheduled_date >= ? AND scheduled_date < ?
-            AND status = 'pending'
-        ''', (day_start, day_end))
-        
-        count = cursor.fetchone()[0]
-        conn.close()
-        
-        return count
+        with self._lock:
+            self._conn.execute(SQL_SET_STATUS, (status, post_id))
+            self._conn.commit()
+            
+            entry = self._active_posts.get(post_id)
+            if entry:
+                group_key, timestamp, _ = entry
+                self._untrack(post_id)
+                self._track(post_id, timestamp, status, group_key)
     
-    def add_post(self, video_url: str, video_title: str, platform: str) -> Dict:
+    def get_post(self, post_id: int) -> Optional[Dict]:
         """
-        Добавить пост в расписание
+        Получить слот и статус поста
         
         Returns:
-            Dict с информацией о запланированном посте
+            Dict с scheduled_timestamp, scheduled_datetime, status и group_key или None, если поста нет
         """
-        # Получаем следующий свободный слот
-        scheduled_timestamp = self.get_next_available_slot()
-        scheduled_datetime = datetime.fromtimestamp(scheduled_timestamp)
-        
-        # Сохраняем в базу
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO scheduled_posts (video_url, video_title, platform, scheduled_date, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (video_url, video_title, platform, scheduled_timestamp, int(datetime.now().timestamp())))
-        
-        post_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Пост добавлен в расписание: ID={post_id}, дата={scheduled_datetime}")
+        with self._lock:
+            row = self._conn.execute(SQL_GET_POST, (post_id,)).fetchone()
         
+        if not row:
+            return None
         return {
             'id': post_id,
-            'scheduled_timestamp': scheduled_timestamp,
-            'scheduled_datetime': scheduled_datetime,
-            'video_title': video_title,
-            'platform': platform
+            'scheduled_timestamp': row[0],
+            'scheduled_datetime': datetime.fromtimestamp(row[0]),
+            'status': row[1],
+            'group_key': row[2]
         }
     
-    def get_stats(self) -> Dict:
+    def known_video_ids(self, platform: str, video_ids: Iterable[str]) -> Set[str]:
         """
-        Получить статистику по запланированным постам
+        Выбрать из video_ids видео, которые уже запланированы или опубликованы (в любой группе)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Всего постов в очереди
-        cursor.execute('SELECT COUNT(*) FROM scheduled_posts WHERE status = "pending"')
-        total_pending = cursor.fetchone()[0]
-        
-        # Посты на сегодня
-        now = datetime.now()
-        today_start = datetime(now.year, now.month, now.day)
-        today_end = today_start + timedelta(days=1)
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM scheduled_posts 
-            WHERE scheduled_date >= ? AND scheduled_date < ?
-            AND status = 'pending'
-        ''', (int(today_start.timestamp()), int(today_end.timestamp())))
-        today_count = cursor.fetchone()[0]
-        
-        # Посты на завтра
-        tomorrow_start = today_end
-        tomorrow_end = tomorrow_start + timedelta(days=1)
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM scheduled_posts 
-            WHERE scheduled_date >= ? AND scheduled_date < ?
-            AND status = 'pending'
-        ''', (int(tomorrow_start.timestamp()), int(tomorrow_end.timestamp())))
-        tomorrow_count = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            'total_pending': total_pending,
-            'today': today_count,
-            'tomorrow': tomorrow_count,
-            'posts_per_day_limit': self.posts_per_day
-        }
+        ids = json.dumps(list(video_ids))
+        with self._lock:
+            rows = self._conn.execute(SQL_KNOWN_VIDEO_IDS, (platform, ids, platform, ids)).fetchall()
+        return {row[0] for row in rows}
     
     def mark_as_posted(self, post_id: int):
         """
         Отметить пост как опубликованный
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE scheduled_posts 
-            SET status = 'posted' 
-            WHERE id = ?
-        ''', (post_id,))
-        
-        conn.commit()
-        conn.close()
+        self._set_status(post_id, 'posted')
         
         logger.info(f"Пост ID={post_id} отмечен как опубликованный")
     
@@ -262,17 +781,7 @@ class PostScheduler:
         """
         Отметить пост как неудачный (слот занят в SMMBox)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE scheduled_posts 
-            SET status = 'failed' 
-            WHERE id = ?
-        ''', (post_id,))
-        
-        conn.commit()
-        conn.close()
+        self._set_status(post_id, 'failed')
         
         logger.info(f"Пост ID={post_id} отмечен как неудачный (слот занят)")
     
@@ -280,15 +789,55 @@ class PostScheduler:
         """
         Удалить пост из расписания (используется при ошибке публикации)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            self._conn.execute(SQL_DELETE_POST, (post_id,))
+            self._conn.commit()
+            self._untrack(post_id)
         
-        cursor.execute('''
-            DELETE FROM scheduled_posts 
-            WHERE id = ?
-        ''', (post_id,))
+        logger.info(f"Пост ID={post_id} удалён из расписания")
+    
+    def compact(
+        self,
+        posted_retention_days: int = 30,
+        failed_expiry_hours: int = 24,
+        vacuum: bool = False
+    ) -> Dict:
+        """
+        Обслуживание базы: архивировать старые посты и освободить зависшие слоты
         
-        conn.commit()
-        conn.close()
+        - опубликованные посты старше posted_retention_days переносятся в scheduled_posts_archive
+        - failed-слоты старше failed_expiry_hours получают статус expired и перестают занимать слот
+        - обновляется статистика планировщика SQLite (ANALYZE), при vacuum=True база сжимается
         
-        logger.info(f"Пост ID={post_id} удалён из расписания")
+        Returns:
+            Dict с количеством архивированных и освобождённых постов
+        """
+        now = int(datetime.now().timestamp())
+        posted_cutoff = now - posted_retention_days * 24 * 3600
+        failed_cutoff = now - failed_expiry_hours * 3600
+        
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._conn.execute(SQL_ARCHIVE_POSTED, (now, posted_cutoff))
+                archived = self._conn.execute(SQL_DELETE_ARCHIVED, (posted_cutoff,)).rowcount
+                expired = self._conn.execute(SQL_EXPIRE_FAILED, (failed_cutoff,)).rowcount
+                self._conn.execute(SQL_DELETE_EMPTY_COUNTERS)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            
+            self._conn.execute('ANALYZE')
+            if vacuum:
+                self._conn.execute('VACUUM')
+                self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        
+        if expired:
+            self.reload_occupancy()
+        
+        logger.info(
+            f"Обслуживание базы: архивировано {archived}, освобождено failed-слотов {expired}"
+            f"{', выполнен VACUUM' if vacuum else ''}"
+        )
+        return {'archived': archived, 'expired': expired}
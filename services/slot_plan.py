@@ -0,0 +1,153 @@
+import random
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Окно публикаций по умолчанию: с 8:00 до 22:00 каждый день
+DEFAULT_WINDOW = (8.0, 22.0)
+
+# Фиксированные минуты для каждого слота (избегаем :00 и :30)
+SLOT_MINUTES = [17, 42, 13, 51, 24, 38, 56]
+
+
+def _parse_hour(value: str) -> float:
+    """
+    "8" -> 8.0, "8:30" -> 8.5
+    """
+    hours, _, minutes = value.strip().partition(':')
+    return int(hours) + int(minutes or 0) / 60
+
+
+def _parse_days(value: str) -> List[int]:
+    """
+    "mon-fri" -> [0..4], "sat,sun" -> [5, 6]
+    """
+    days = []
+    for part in value.split(','):
+        first, _, last = part.strip().lower().partition('-')
+        start = WEEKDAYS.index(first)
+        end = WEEKDAYS.index(last) if last else start
+        days.extend(range(start, end + 1))
+    return days
+
+
+def parse_posting_windows(spec: str) -> Dict[int, Tuple[float, float]]:
+    """
+    Разобрать окна публикаций по дням недели
+
+    Формат: "8-22" (все дни) или "mon-fri=8-22;sat,sun=10:30-23".
+    Дни без явного окна получают окно по умолчанию (или общее окно без дней).
+
+    Returns:
+        Dict: день недели (0 - понедельник) -> (час начала, час конца)
+    """
+    windows = {}
+    default = DEFAULT_WINDOW
+
+    for item in filter(None, (part.strip() for part in spec.split(';'))):
+        days, _, hours = item.rpartition('=')
+        start, _, end = hours.partition('-')
+        window = (_parse_hour(start), _parse_hour(end))
+        if not 0 <= window[0] < window[1] <= 24:
+            raise ValueError(f"Некорректное окно публикаций: {item}")
+
+        if days:
+            for day in _parse_days(days):
+                windows[day] = window
+        else:
+            default = window
+
+    return {day: windows.get(day, default) for day in range(7)}
+
+
+class SlotPlanner:
+    """
+    Сетка слотов публикаций на каждый день
+
+    Сетка дня считается один раз (детерминированно от даты) и хранится в LRU
+    на горизонт в horizon_days дней. Случайное смещение берётся из собственного
+    random.Random, поэтому глобальный генератор не трогается и расчёт
+    безопасен из разных потоков.
+    """
+
+    def __init__(
+        self,
+        posts_per_day: int = 7,
+        windows: Optional[Dict[int, Tuple[float, float]]] = None,
+        interval_hours: float = 2.0,
+        horizon_days: int = 60
+    ):
+        """
+        Args:
+            posts_per_day: Сколько слотов в дне
+            windows: Окна публикаций по дням недели (см. parse_posting_windows)
+            interval_hours: Желаемый интервал между постами (сжимается, если слоты не влезают в окно)
+            horizon_days: Сколько дней сеток держать в кеше
+        """
+        self.posts_per_day = posts_per_day
+        self.windows = windows or {day: DEFAULT_WINDOW for day in range(7)}
+        self.interval_hours = interval_hours
+        self.horizon_days = horizon_days
+        self._plans: 'OrderedDict[Date, List[int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_day_plan(self, day: datetime) -> List[int]:
+        """
+        Слоты дня в виде отсортированного списка Unix timestamp
+        """
+        key = Date(day.year, day.month, day.day)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+
+            plan = self._build_day_plan(key)
+            self._plans[key] = plan
+            while len(self._plans) > self.horizon_days:
+                self._plans.popitem(last=False)
+            return plan
+
+    def _build_day_plan(self, day: Date) -> List[int]:
+        """
+        Рассчитать сетку слотов для дня
+        """
+        start_hour, end_hour = self.windows[day.weekday()]
+
+        # Интервал по умолчанию 2 часа, но все слоты должны поместиться в окно
+        interval = min(self.interval_hours, (end_hour - start_hour) / self.posts_per_day)
+        max_offset = min(0.5, interval / 4)  # До 30 минут случайного смещения
+        rng = random.Random()
+
+        slots = set()
+        for slot_number in range(self.posts_per_day):
+            # Сид зависит от даты и номера слота - время слота не меняется между перезапусками
+            rng.seed(f"{day.year}{day.month}{day.day}{slot_number}")
+            post_hour = start_hour + slot_number * interval + rng.uniform(0, max_offset)
+            post_hour = max(start_hour, min(end_hour - 0.1, post_hour))
+
+            hour = int(post_hour)
+            minute = SLOT_MINUTES[slot_number % len(SLOT_MINUTES)]
+            # Несколько слотов в час - берём точные минуты, чтобы не перепутать порядок;
+            # так же, если фиксированные минуты выводят слот за окно (окно с 10:30)
+            if interval < 1 or not start_hour <= hour + minute / 60 < end_hour:
+                minute = int((post_hour - hour) * 60)
+
+            slots.add(int(datetime(day.year, day.month, day.day, hour, minute).timestamp()))
+
+        return sorted(slots)
+
+    def warm_up(self, start: Optional[datetime] = None):
+        """
+        Заранее рассчитать сетки на весь горизонт
+        """
+        start = start or datetime.now()
+        for offset in range(self.horizon_days):
+            self.get_day_plan(start + timedelta(days=offset))
+        logger.info(f"Рассчитаны сетки слотов на {self.horizon_days} дней")
@@ -1,106 +1,448 @@
-import requests
+import asyncio
+import aiohttp
 import logging
 import time
 from datetime import datetime
-from typing import Optional, Dict, List
-from config import SMMBOX_API_TOKEN, SMMBOX_API_URL
+from typing import Optional, Dict, List, Tuple
+from config import (
+    SMMBOX_API_TOKEN,
+    SMMBOX_API_URL,
+    SMMBOX_POOL_SIZE,
+    SMMBOX_KEEPALIVE_TIMEOUT,
+    SMMBOX_CONNECT_TIMEOUT,
+    SMMBOX_REQUEST_TIMEOUT,
+    SMMBOX_GROUPS_CACHE_TTL,
+    SMMBOX_POSTPONED_PATH,
+    SMMBOX_BATCH_SIZE,
+    SMMBOX_TARGET_GROUPS,
+)
+from services.rate_limiter import RateLimiter, parse_retry_after
+from services.retry_policy import (
+    CONFLICT,
+    FATAL,
+    RETRYABLE,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    classify_error,
+    is_slot_conflict,
+)
 
 logger = logging.getLogger(__name__)
 
+# HTTP статусы, после которых кеш группы считаем недействительным
+AUTH_ERROR_STATUSES = (401, 403, 404)
 
-class SMMBoxAPI:
-    def __init__(self):
+# Фрагменты сообщений SMMBox об ошибках авторизации или группы
+GROUP_ERROR_MARKERS = ('групп', 'group', 'токен', 'token', 'авториз', 'auth', 'доступ', 'access')
+
+
+def is_group_error(message: Optional[str]) -> bool:
+    """
+    Проверить, говорит ли ошибка SMMBox о проблеме с авторизацией или группой
+    """
+    # Конфликт времени ("на это время уже запланирован пост") к группе не относится
+    if is_slot_conflict(message):
+        return False
+    message = (message or '').lower()
+    return any(marker in message for marker in GROUP_ERROR_MARKERS)
+
+
+def normalize_group(group: Dict) -> Dict:
+    """
+    Оставить от группы SMMBox только поля, нужные для публикации
+    """
+    return {
+        'id': group['id'],
+        'social': group['social'],
+        'type': group['type'],
+        'name': group.get('name', 'Неизвестно')
+    }
+
+
+def group_key(group: Optional[Dict]) -> str:
+    """
+    Ключ группы для расписания: "соцсеть:id" (пустая строка - группа не указана)
+    """
+    if not group:
+        return ''
+    return f"{group['social']}:{group['id']}"
+
+
+def select_vk_group(groups: Optional[List[Dict]]) -> Optional[Dict]:
+    """
+    Выбрать первую VK группу из списка групп SMMBox
+    """
+    if not groups:
+        return None
+
+    for group in groups:
+        if group.get('social') == 'vk':
+            return normalize_group(group)
+
+    logger.error("VK группа не найдена в списке подключенных групп")
+    return None
+
+
+def select_target_groups(groups: Optional[List[Dict]], spec: Optional[str]) -> List[Dict]:
+    """
+    Выбрать группы, в которые публикуется каждое видео
+
+    Args:
+        groups: Список групп SMMBox
+        spec: Через запятую: "all" - все группы, "vk" / "ok" / "telegram" - все группы
+            соцсети, "vk:123" - конкретная группа, иначе название группы.
+            Пусто - первая VK группа (как раньше)
+
+    Returns:
+        Список групп без повторов в порядке spec
+    """
+    if not groups:
+        return []
+
+    tokens = [token.strip() for token in (spec or '').split(',') if token.strip()]
+    if not tokens:
+        vk_group = select_vk_group(groups)
+        return [vk_group] if vk_group else []
+
+    selected = {}
+    for token in tokens:
+        lowered = token.lower()
+        matched = [
+            group for group in groups
+            if lowered == 'all'
+            or lowered == str(group.get('social', '')).lower()
+            or lowered == f"{group.get('social')}:{group.get('id')}".lower()
+            or lowered == str(group.get('name', '')).lower()
+        ]
+        if not matched:
+            logger.warning(f"Группа '{token}' не найдена среди подключенных к SMMBox")
+        for group in matched:
+            normalized = normalize_group(group)
+            selected.setdefault(group_key(normalized), normalized)
+
+    return list(selected.values())
+
+
+class GroupCache:
+    """
+    Кеш выбранной VK группы (или списка групп) с ограниченным временем жизни
+    """
+
+    def __init__(self, ttl: int = SMMBOX_GROUPS_CACHE_TTL):
+        self.ttl = ttl
+        self._group = None
+        self._expires_at = 0.0
+
+    def get(self):
+        """
+        Вернуть группу из кеша или None, если кеш пуст или устарел
+        """
+        if self._group is not None and time.monotonic() < self._expires_at:
+            return self._group
+        return None
+
+    def set(self, group):
+        self._group = group
+        self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self):
+        if self._group is not None:
+            logger.info("Кеш VK группы сброшен")
+        self._group = None
+        self._expires_at = 0.0
+
+
+class AsyncSMMBoxAPI:
+    """
+    Асинхронный клиент SMMBox API
+
+    Все запросы идут через одну долгоживущую aiohttp-сессию с keep-alive
+    и ограниченным пулом соединений, поэтому медленный ответ SMMBox
+    не блокирует event loop и другие загрузки.
+
+    Временные ошибки повторяются с растущей паузой, а если SMMBox лежит,
+    автомат (CircuitBreaker) перестаёт слать запросы: методы получения групп
+    и публикации бросают CircuitOpenError, не дожидаясь таймаута.
+    Частоту запросов ограничивает RateLimiter (общий лимит и лимиты методов).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = SMMBOX_POOL_SIZE,
+        keepalive_timeout: int = SMMBOX_KEEPALIVE_TIMEOUT,
+        connect_timeout: int = SMMBOX_CONNECT_TIMEOUT,
+        request_timeout: int = SMMBOX_REQUEST_TIMEOUT,
+        groups_cache_ttl: int = SMMBOX_GROUPS_CACHE_TTL,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        batch_size: int = SMMBOX_BATCH_SIZE,
+        target_groups: str = SMMBOX_TARGET_GROUPS
+    ):
         self.api_url = SMMBOX_API_URL
         self.headers = {
             'Authorization': f'Bearer {SMMBOX_API_TOKEN}',
             'Content-Type': 'application/json'
         }
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self.group_cache = GroupCache(ttl=groups_cache_ttl)
+        self.target_groups = target_groups
+        self.targets_cache = GroupCache(ttl=groups_cache_ttl)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.batch_size = max(1, batch_size)
+        self._group_lock: Optional[asyncio.Lock] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Получить общую сессию (создаётся лениво внутри работающего event loop)
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.request_timeout,
+                    connect=self.connect_timeout
+                )
+            )
+        return self._session
+
+    def invalidate_group_cache(self):
+        """
+        Сбросить кеш VK группы и групп публикации (следующий пост заново запросит /groups)
+        """
+        self.group_cache.invalidate()
+        self.targets_cache.invalidate()
+
+    def _check_error(self, message: Optional[str] = None, exc: Optional[Exception] = None):
+        """
+        Сбросить кеш группы, если ошибка связана с авторизацией или группой
+        """
+        if isinstance(exc, aiohttp.ClientResponseError) and exc.status in AUTH_ERROR_STATUSES:
+            self.invalidate_group_cache()
+        elif is_group_error(message):
+            self.invalidate_group_cache()
+
+    async def warm_up(self) -> Optional[Dict]:
+        """
+        Заранее загрузить VK группу и группы публикации в кеш (вызывается при старте бота)
+        """
+        try:
+            vk_group = await self.get_vk_group()
+            targets = await self.get_target_groups()
+        except CircuitOpenError:
+            vk_group, targets = None, []
+        if vk_group:
+            logger.info(f"VK группа загружена в кеш: {vk_group['name']}")
+        else:
+            logger.warning("Не удалось заранее загрузить VK группу, попробую при первом посте")
+        if targets:
+            logger.info(f"Группы публикации: {', '.join(group['name'] for group in targets)}")
+        return vk_group
+
+    async def close(self):
+        """
+        Закрыть сессию и все соединения пула
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        params: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Выполнить запрос к API и вернуть распарсенный JSON
+
+        Args:
+            method: HTTP метод
+            path: Путь относительно api_url
+            payload: Тело запроса (JSON)
+            timeout: Таймаут на этот вызов в секундах (по умолчанию request_timeout)
+            params: Параметры строки запроса
+
+        Raises:
+            CircuitOpenError: SMMBox недоступен, запрос не отправлялся
+        """
+        self.circuit_breaker.before_request()
+        try:
+            await self.rate_limiter.acquire(path)
+        except asyncio.CancelledError:
+            self.circuit_breaker.release_probe()
+            raise
+
+        session = self._get_session()
+        request_timeout = aiohttp.ClientTimeout(
+            total=timeout or self.request_timeout,
+            connect=self.connect_timeout
+        )
+
+        try:
+            async with session.request(
+                method,
+                f'{self.api_url}{path}',
+                json=payload,
+                params=params,
+                timeout=request_timeout
+            ) as response:
+                if response.status == 429:
+                    self.rate_limiter.penalize(path, parse_retry_after(response.headers.get('Retry-After')))
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            self.circuit_breaker.release_probe()
+            raise
+        except Exception as e:
+            # Автомат считает только недоступность SMMBox, а не отказы по существу (4xx)
+            # и не ограничение частоты (429 - сервер отвечает, запросы ждут в RateLimiter)
+            if classify_error(exc=e) == RETRYABLE and getattr(e, 'status', None) != 429:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+            raise
+
+        self.circuit_breaker.record_success()
+        return data
 
-    def get_groups(self) -> Optional[List[Dict]]:
+    async def get_groups(self, timeout: Optional[float] = None) -> Optional[List[Dict]]:
         """
         Получить список всех подключенных групп
         """
         try:
-            response = requests.get(
-                f'{self.api_url}/groups',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            data = response.json()
-            
+            data = await self._request('GET', '/groups', timeout=timeout)
+
             if data.get('success'):
                 return data.get('response', [])
             else:
                 logger.error(f"Ошибка получения групп: {data.get('error')}")
                 return None
-                
+
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при запросе к SMMBox API: {e}")
             return None
 
-    def get_vk_group(self) -> Optional[Dict]:
+    async def get_vk_group(self, timeout: Optional[float] = None) -> Optional[Dict]:
         """
-        Получить первую VK группу из списка
+        Получить первую VK группу из списка (с кешированием на groups_cache_ttl)
         """
-        groups = self.get_groups()
-        if not groups:
-            return None
-        
-        # Ищем VK группу
-        for group in groups:
-            if group.get('social') == 'vk':
-                return {
-                    'id': group['id'],
-                    'social': group['social'],
-                    'type': group['type'],
-                    'name': group.get('name', 'Неизвестно')
-                }
-        
-        logger.error("VK группа не найдена в списке подключенных групп")
-        return None
+        vk_group = self.group_cache.get()
+        if vk_group:
+            return vk_group
+
+        # Одновременные посты при холодном кеше ждут один общий запрос /groups
+        if self._group_lock is None:
+            self._group_lock = asyncio.Lock()
+
+        async with self._group_lock:
+            vk_group = self.group_cache.get()
+            if vk_group:
+                return vk_group
+
+            vk_group = select_vk_group(await self.get_groups(timeout=timeout))
+            if vk_group:
+                self.group_cache.set(vk_group)
+            return vk_group
+
+    async def get_target_groups(self, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Получить группы, в которые публикуется каждое видео (SMMBOX_TARGET_GROUPS),
+        с кешированием на groups_cache_ttl
+
+        Returns:
+            Список групп (пустой, если ни одна не найдена)
+        """
+        targets = self.targets_cache.get()
+        if targets:
+            return targets
+
+        if self._group_lock is None:
+            self._group_lock = asyncio.Lock()
+
+        async with self._group_lock:
+            targets = self.targets_cache.get()
+            if targets:
+                return targets
+
+            targets = select_target_groups(await self.get_groups(timeout=timeout), self.target_groups)
+            if targets:
+                self.targets_cache.set(targets)
+            return targets
 
-    def post_video_clip_to_wall(
+    async def get_postponed_posts(
         self,
-        video_url: str,
-        title: str,
-        scheduled_timestamp: int,
-        preview_url: Optional[str] = None
-    ) -> Optional[Dict]:
+        group: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[List[Dict]]:
         """
-        Запостить видео с текстом на стену ПО РАСПИСАНИЮ
-        
+        Получить все отложенные посты группы одним запросом
+
         Args:
-            video_url: Прямая ссылка на видео-файл
-            title: Название видео и текст поста
-            scheduled_timestamp: Unix timestamp когда опубликовать
-            preview_url: Ссылка на обложку (опционально)
+            group: Группа (по умолчанию первая VK группа)
+
+        Returns:
+            Список постов SMMBox (у каждого есть поле date - Unix timestamp) или None при ошибке
         """
-        # Получаем данные VK группы
-        vk_group = self.get_vk_group()
+        try:
+            vk_group = group or await self.get_vk_group()
+        except CircuitOpenError as e:
+            logger.warning(f"Очередь SMMBox не загружена: {e}")
+            return None
         if not vk_group:
             logger.error("Не удалось получить данные VK группы")
             return None
 
-        # Формируем текстовое вложение
-        text_attach = {
-            'type': 'text',
-            'text': title
+        params = {
+            'group[id]': vk_group['id'],
+            'group[social]': vk_group['social'],
+            'group[type]': vk_group['type']
         }
 
-        # Формируем вложение с видео (БЕЗ опции reels - обычное видео)
-        video_attach = {
-            'type': 'video',
-            'url': video_url,
-            'title': title
-        }
-        
-        # Добавляем превью если есть
-        if preview_url:
-            video_attach['preview'] = preview_url
-            video_attach['custom_preview'] = True
+        try:
+            data = await self._request('GET', SMMBOX_POSTPONED_PATH, timeout=timeout, params=params)
 
-        # Формируем пост с текстом И видео (БЕЗ опции reels)
-        post_data = {
+            if data.get('success'):
+                response = data.get('response') or []
+                # Ответ бывает как списком постов, так и объектом {'posts': [...]}
+                return response.get('posts', []) if isinstance(response, dict) else response
+            else:
+                error = data.get('error', {})
+                logger.error(f"Ошибка получения отложенных постов: {error.get('message')}")
+                self._check_error(message=error.get('message'))
+                return None
+
+        except CircuitOpenError as e:
+            logger.warning(f"Очередь SMMBox не загружена: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка при получении отложенных постов: {e}")
+            self._check_error(exc=e)
+            return None
+
+    @staticmethod
+    def _build_post(vk_group: Dict, scheduled_timestamp: int, attachments: List[Dict]) -> Dict:
+        """
+        Сформировать тело запроса /posts/postpone для одного поста
+        """
+        return {
             'posts': [
                 {
                     'group': {
@@ -109,159 +451,138 @@ class SMMBoxAPI:
                         'type': vk_group['type']
                     },
                     'date': scheduled_timestamp,
-                    'attachments': [text_attach, video_attach]
-                    # БЕЗ options: ['reels'] - публикуем как обычное видео
+                    'attachments': attachments
                 }
             ]
         }
 
-        try:
-            logger.info(f"Отправка поста (текст + видео) на стену: {vk_group['name']}")
-            logger.info(f"Запланировано на: {datetime.fromtimestamp(scheduled_timestamp).strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            response = requests.post(
-                f'{self.api_url}/posts/postpone',
-                headers=self.headers,
-                json=post_data,
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('success'):
-                logger.info("Пост с видео успешно добавлен в отложенные")
-                return data.get('response')
-            else:
-                error = data.get('error', {})
-                logger.error(f"Ошибка публикации поста с видео: {error.get('message')}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при публикации поста с видео: {e}")
-            return None
-    
-    def post_video_as_clip(
+    @staticmethod
+    def _video_attachments(video_url: str, title: str, preview_url: Optional[str] = None) -> List[Dict]:
+        """
+        Вложения поста с клипом: текст (название) и видео по прямой ссылке
+        """
+        video_attach = {
+            'type': 'video',
+            'url': video_url,
+            'title': title
+        }
+        if preview_url:
+            video_attach['preview'] = preview_url
+            video_attach['custom_preview'] = True
+        return [{'type': 'text', 'text': title}, video_attach]
+
+    async def post_video_clip_to_wall(
         self,
         video_url: str,
         title: str,
-        preview_url: Optional[str] = None
+        scheduled_timestamp: int,
+        preview_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
     ) -> Optional[Dict]:
         """
-        Запостить видео как клип в VK группу СРАЗУ (не отложенно)
-        
+        Запостить видео с текстом на стену ПО РАСПИСАНИЮ
+
         Args:
             video_url: Прямая ссылка на видео-файл
-            title: Название клипа
+            title: Название видео и текст поста
+            scheduled_timestamp: Unix timestamp когда опубликовать
             preview_url: Ссылка на обложку (опционально)
-            
+            timeout: Таймаут запроса в секундах (опционально)
+            max_retries: Максимум попыток при временных ошибках (по умолчанию из retry_policy)
+
+        Returns:
+            Ответ SMMBox или None (время занято или запрос отклонён)
+
+        Raises:
+            CircuitOpenError: SMMBox недоступен, пост не отправлялся
+        """
+        vk_group = await self.get_vk_group()
+        if not vk_group:
+            logger.error("Не удалось получить данные VK группы")
+            return None
+
+        post_data = self._build_post(
+            vk_group,
+            scheduled_timestamp,
+            self._video_attachments(video_url, title, preview_url)
+        )
+
+        logger.info(f"Запланировано на: {datetime.fromtimestamp(scheduled_timestamp).strftime('%Y-%m-%d %H:%M:%S')}")
+        return await self._postpone_with_retry(
+            post_data, vk_group, 'поста с видео', max_retries, timeout
+        )
+
+    async def post_video_as_clip(
+        self,
+        video_url: str,
+        title: str,
+        preview_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Запостить видео как клип в VK группу СРАЗУ (не отложенно)
+
         Returns:
             Dict с информацией о созданном клипе (включая его ID для прикрепления к посту)
         """
-        # Получаем данные VK группы
-        vk_group = self.get_vk_group()
+        vk_group = await self.get_vk_group()
         if not vk_group:
             logger.error("Не удалось получить данные VK группы")
             return None
 
-        # Формируем вложение с видео
         video_attach = {
             'type': 'video',
             'url': video_url,
             'title': title
         }
-        
-        # Добавляем превью если есть
         if preview_url:
             video_attach['preview'] = preview_url
             video_attach['custom_preview'] = True
 
-        # Формируем пост с минимальной задержкой (текущее время + 10 секунд)
         # VK требует параметр date, даже для быстрой публикации
-        current_timestamp = int(time.time()) + 10
-        
-        post_data = {
-            'posts': [
-                {
-                    'group': {
-                        'id': vk_group['id'],
-                        'social': vk_group['social'],
-                        'type': vk_group['type']
-                    },
-                    'date': current_timestamp,  # Текущее время + 10 секунд
-                    'attachments': [video_attach],
-                    'options': ['reels']  # Важно! Публикуем как клип
-                }
-            ]
-        }
+        post_data = self._build_post(vk_group, int(time.time()) + 10, [video_attach])
+        post_data['posts'][0]['options'] = ['reels']  # Важно! Публикуем как клип
 
-        try:
-            logger.info(f"Отправка клипа в VK группу (сразу): {vk_group['name']}")
-            
-            response = requests.post(
-                f'{self.api_url}/posts/postpone',
-                headers=self.headers,
-                json=post_data,
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('success'):
-                logger.info("Клип успешно опубликован")
-                return data.get('response')
-            else:
-                error = data.get('error', {})
-                logger.error(f"Ошибка публикации клипа: {error.get('message')}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка при публикации клипа: {e}")
-            return None
-    
-    def post_clip_to_wall(
+        return await self._postpone_with_retry(
+            post_data, vk_group, 'клипа', max_retries, timeout
+        )
+
+    async def post_clip_to_wall(
         self,
         text: str,
         clip_response: Dict,
         scheduled_timestamp: int,
-        max_retries: int = 3
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None
     ) -> Optional[Dict]:
         """
         Запостить пост на стену с прикрепленным клипом
-        
+
         Args:
             text: Текст поста
             clip_response: Ответ от post_video_as_clip (содержит информацию о клипе)
             scheduled_timestamp: Unix timestamp когда опубликовать
-            max_retries: Максимум попыток при ошибках
+            max_retries: Максимум попыток при временных ошибках (по умолчанию из retry_policy)
+            timeout: Таймаут одного запроса в секундах (опционально)
         """
-        # Получаем данные VK группы
-        vk_group = self.get_vk_group()
+        vk_group = await self.get_vk_group()
         if not vk_group:
             logger.error("Не удалось получить данные VK группы")
             return None
 
-        # Извлекаем ID клипа из ответа
-        # Структура ответа: {'posts': [...], 'links': [...]}
+        video_attachment = None
         try:
-            if not clip_response or 'posts' not in clip_response:
+            clip_posts = (clip_response or {}).get('posts') or []
+            if not clip_posts:
                 logger.error("Некорректный ответ от API при создании клипа")
                 return None
-            
-            # Берём первый пост из ответа
-            clip_post = clip_response['posts'][0] if clip_response['posts'] else None
-            if not clip_post:
-                logger.error("Не найден пост клипа в ответе API")
-                return None
-            
-            # Ищем video вложение и извлекаем его VK ID
-            video_attachment = None
-            video_id = None
-            for attach in clip_post.get('attachments', []):
+
+            for attach in clip_posts[0].get('attachments', []):
                 if attach.get('type') == 'video':
-                    # Получаем ID видео из VK (если оно уже загружено)
                     video_id = attach.get('id')
                     if video_id:
-                        # Создаём вложение типа AttachSocialVideo (только ID, без файла)
                         video_attachment = {
                             'type': 'video',
                             'id': video_id,
@@ -269,166 +590,247 @@ class SMMBoxAPI:
                         }
                         logger.info(f"Найден VK video ID для прикрепления: {video_id}")
                     break
-            
-            if not video_attachment:
-                logger.warning("Не найден VK ID видео в ответе, публикую только текст")
-                # Публикуем просто текст без клипа
-                return self.post_text_to_wall(text, scheduled_timestamp, max_retries)
-            
-            logger.info(f"Создаю пост на стену с прикреплённым VK видео")
-            
+
         except Exception as e:
             logger.error(f"Ошибка при извлечении данных клипа: {e}")
-            # Публикуем просто текст без клипа
-            return self.post_text_to_wall(text, scheduled_timestamp, max_retries)
 
-        # Формируем текстовое вложение
-        text_attach = {
-            'type': 'text',
-            'text': text
-        }
+        if not video_attachment:
+            logger.warning("Не найден VK ID видео в ответе, публикую только текст")
+            return await self.post_text_to_wall(text, scheduled_timestamp, max_retries, timeout=timeout)
 
-        # Формируем пост с текстом И клипом
-        post_data = {
-            'posts': [
-                {
-                    'group': {
-                        'id': vk_group['id'],
-                        'social': vk_group['social'],
-                        'type': vk_group['type']
-                    },
-                    'date': scheduled_timestamp,
-                    'attachments': [
-                        text_attach,
-                        video_attachment  # Прикрепляем клип
-                    ]
-                }
-            ]
-        }
+        post_data = self._build_post(
+            vk_group,
+            scheduled_timestamp,
+            [{'type': 'text', 'text': text}, video_attachment]
+        )
+        return await self._postpone_with_retry(
+            post_data, vk_group, 'поста с клипом', max_retries, timeout
+        )
 
-        # Пробуем с retry
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Отправка поста (текст + клип) на стену: {vk_group['name']} (попытка {attempt + 1}/{max_retries})")
-                response = requests.post(
-                    f'{self.api_url}/posts/postpone',
-                    headers=self.headers,
-                    json=post_data,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('success'):
-                    logger.info("Пост с клипом успешно добавлен в отложенные")
-                    return data.get('response')
-                else:
-                    error = data.get('error', {})
-                    logger.error(f"Ошибка публикации поста с клипом: {error.get('message')}")
-                    
-                    # Если ошибка "на это время уже есть пост" - не ретраим
-                    if 'время запланирован' in error.get('message', '').lower():
-                        return None
-                    
-                    # Для других ошибок - ждём и пробуем еще раз
-                    if attempt < max_retries - 1:
-                        time.sleep(2)
-                        continue
-                    return None
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка при публикации поста с клипом (попытка {attempt + 1}): {e}")
-                
-                # Если это последняя попытка - возвращаем None
-                if attempt == max_retries - 1:
-                    return None
-                
-                # Иначе ждём и пробуем снова
-                time.sleep(2)
-        
-        return None
-    
-    def post_text_to_wall(
+    async def post_text_to_wall(
         self,
         text: str,
         scheduled_timestamp: int,
-        max_retries: int = 3
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None
     ) -> Optional[Dict]:
         """
         Запостить текст на стену сообщества
-        
+
         Args:
             text: Текст поста
             scheduled_timestamp: Unix timestamp когда опубликовать
-            max_retries: Максимум попыток при ошибках (по умолчанию 3)
+            max_retries: Максимум попыток при временных ошибках (по умолчанию из retry_policy)
+            timeout: Таймаут одного запроса в секундах (опционально)
         """
-        import time
-        
-        # Получаем данные VK группы
-        vk_group = self.get_vk_group()
+        vk_group = await self.get_vk_group()
         if not vk_group:
             logger.error("Не удалось получить данные VK группы")
             return None
 
-        # Формируем текстовое вложение
-        text_attach = {
-            'type': 'text',
-            'text': text
-        }
+        post_data = self._build_post(vk_group, scheduled_timestamp, [{'type': 'text', 'text': text}])
+        return await self._postpone_with_retry(
+            post_data, vk_group, 'текста', max_retries, timeout
+        )
 
-        # Формируем пост
-        post_data = {
-            'posts': [
-                {
-                    'group': {
-                        'id': vk_group['id'],
-                        'social': vk_group['social'],
-                        'type': vk_group['type']
-                    },
-                    'date': scheduled_timestamp,
-                    'attachments': [text_attach]
-                }
-            ]
-        }
+    async def _postpone_with_retry(
+        self,
+        post_data: Dict,
+        vk_group: Dict,
+        what: str,
+        max_retries: Optional[int],
+        timeout: Optional[float]
+    ) -> Optional[Dict]:
+        """
+        Отправить /posts/postpone с повторами (без блокировки event loop)
+
+        Повторяются только временные ошибки (5xx, 429, таймауты) с экспоненциальной
+        паузой. Конфликт времени и прочие отказы SMMBox возвращают None сразу.
+        """
+        response, _, kind = await self._send_postpone(post_data, vk_group['name'], what, max_retries, timeout)
+        return response if kind is None else None
+
+    async def _send_postpone(
+        self,
+        post_data: Dict,
+        target: str,
+        what: str,
+        max_retries: Optional[int],
+        timeout: Optional[float]
+    ) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """
+        Отправить /posts/postpone, повторяя временные ошибки
+
+        Returns:
+            (ответ, текст ошибки, класс ошибки): класс None при успехе,
+            иначе CONFLICT, FATAL или RETRYABLE (попытки кончились)
+        """
+        max_retries = max_retries or self.retry_policy.max_attempts
+        error_message = None
 
-        # Пробуем с retry
         for attempt in range(max_retries):
             try:
-                logger.info(f"Отправка текстового поста на стену: {vk_group['name']} (попытка {attempt + 1}/{max_retries})")
-                response = requests.post(
-                    f'{self.api_url}/posts/postpone',
-                    headers=self.headers,
-                    json=post_data,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-                
+                logger.info(f"Отправка {what} на стену: {target} (попытка {attempt + 1}/{max_retries})")
+                data = await self._request('POST', '/posts/postpone', post_data, timeout=timeout)
+
                 if data.get('success'):
-                    logger.info("Текст успешно опубликован на стену")
-                    return data.get('response')
-                else:
-                    error = data.get('error', {})
-                    logger.error(f"Ошибка публикации текста: {error.get('message')}")
-                    
-                    # Если ошибка "на это время уже есть пост" - не ретраим
-                    if 'время запланирован' in error.get('message', '').lower():
-                        return None
-                    
-                    # Для других ошибок - ждём и пробуем еще раз
-                    if attempt < max_retries - 1:
-                        time.sleep(2)
-                        continue
-                    return None
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка при публикации текста (попытка {attempt + 1}): {e}")
-                
-                # Если это последняя попытка - возвращаем None
-                if attempt == max_retries - 1:
-                    return None
-                
-                # Иначе ждём и пробуем снова
-                time.sleep(2)
-        
-        return None
+                    logger.info(f"Публикация {what} добавлена в отложенные")
+                    return data.get('response'), None, None
+
+                error_message = (data.get('error') or {}).get('message')
+                logger.error(f"Ошибка публикации {what}: {error_message}")
+                self._check_error(message=error_message)
+
+                # "На это время уже есть пост" - нужен другой слот; остальные отказы повтор не исправит
+                kind = classify_error(message=error_message)
+                if kind == CONFLICT:
+                    logger.info("Время уже занято в SMMBox")
+                return None, error_message, kind
+
+            except CircuitOpenError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.error(f"Ошибка при публикации {what} (попытка {attempt + 1}): {e}")
+                self._check_error(exc=e)
+                error_message = str(e) or e.__class__.__name__
+                if classify_error(exc=e) != RETRYABLE:
+                    return None, error_message, FATAL
+
+            if attempt < max_retries - 1:
+                await self.retry_policy.sleep(attempt)
+
+        return None, error_message, RETRYABLE
+
+    async def post_video_clips_to_wall(
+        self,
+        clips: List[Dict],
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Запостить несколько видео с текстом на стену ПО РАСПИСАНИЮ пачками
+
+        Args:
+            clips: Список {'video_url', 'title', 'scheduled_timestamp', 'preview_url', 'group'}
+                (без group пост уходит в первую VK группу)
+            timeout: Таймаут одного запроса в секундах (опционально)
+            max_retries: Максимум попыток при временных ошибках (по умолчанию из retry_policy)
+            batch_size: Сколько постов отправлять одним запросом (по умолчанию batch_size клиента)
+
+        Returns:
+            Результаты в порядке clips (см. postpone_posts)
+
+        Raises:
+            CircuitOpenError: SMMBox недоступен ещё до отправки (не получить VK группу)
+        """
+        vk_group = None
+        if not all(clip.get('group') for clip in clips):
+            vk_group = await self.get_vk_group()
+            if not vk_group:
+                logger.error("Не удалось получить данные VK группы")
+                return [self._failed_item("Не удалось получить данные VK группы", sent=False) for _ in clips]
+
+        entries = [
+            self._build_post(
+                clip.get('group') or vk_group,
+                clip['scheduled_timestamp'],
+                self._video_attachments(clip['video_url'], clip['title'], clip.get('preview_url'))
+            )['posts'][0]
+            for clip in clips
+        ]
+        return await self.postpone_posts(entries, timeout=timeout, max_retries=max_retries, batch_size=batch_size)
+
+    async def postpone_posts(
+        self,
+        entries: List[Dict],
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Отправить готовые посты (элементы списка posts, группы могут различаться)
+        пачками по batch_size в одном запросе /posts/postpone
+
+        SMMBox отклоняет запрос целиком, если не прошёл хотя бы один пост, поэтому
+        отклонённая пачка делится пополам, пока не останутся отдельные посты
+        с их собственной ошибкой. Пачку, которая не дошла из-за недоступности
+        SMMBox, не делим - это только умножит запросы.
+
+        Если автомат разомкнулся посреди отправки, уже принятые пачки остаются
+        успешными, а неотправленные посты помечаются sent = False.
+
+        Returns:
+            Для каждого поста в том же порядке:
+            {'ok': bool, 'response': ответ как у одиночного поста, 'error': текст, 'conflict': bool,
+             'sent': False если запрос не дошёл до SMMBox, 'retry_after': через сколько повторять (сек)}
+        """
+        batch_size = batch_size or self.batch_size
+        results = []
+        for start in range(0, len(entries), batch_size):
+            results.extend(await self._postpone_split(entries[start:start + batch_size], timeout, max_retries))
+        return results
+
+    async def _postpone_split(
+        self,
+        entries: List[Dict],
+        timeout: Optional[float],
+        max_retries: Optional[int]
+    ) -> List[Dict]:
+        try:
+            response, error, kind = await self._send_postpone(
+                {'posts': entries}, f'{len(entries)} пост(ов)', 'пачки постов', max_retries, timeout
+            )
+        except CircuitOpenError as e:
+            return [self._failed_item(str(e), sent=False, retry_after=e.retry_after) for _ in entries]
+
+        if kind is None:
+            return self._map_batch_response(entries, response)
+
+        if kind == RETRYABLE:
+            # SMMBox не ответил по существу - посты не созданы, слоты можно освободить
+            return [self._failed_item(error, sent=False) for _ in entries]
+
+        if len(entries) == 1:
+            return [self._failed_item(error, conflict=kind == CONFLICT)]
+
+        middle = len(entries) // 2
+        logger.info(f"Пачка из {len(entries)} постов отклонена, делю на {middle} и {len(entries) - middle}")
+        return (
+            await self._postpone_split(entries[:middle], timeout, max_retries)
+            + await self._postpone_split(entries[middle:], timeout, max_retries)
+        )
+
+    @staticmethod
+    def _map_batch_response(entries: List[Dict], response) -> List[Dict]:
+        """
+        Разложить ответ на пачку по исходным постам
+
+        Ответ каждого поста приводится к виду ответа на одиночный пост ({'posts': [...]}).
+        """
+        posts = response.get('posts') if isinstance(response, dict) else response
+        if isinstance(posts, list) and len(posts) == len(entries):
+            return [
+                {'ok': True, 'response': {'posts': [post]}, 'error': None, 'conflict': False, 'sent': True}
+                for post in posts
+            ]
+
+        # Не понять, какие посты созданы - не считаем их успешными (слоты останутся занятыми)
+        logger.error(f"Неожиданный ответ SMMBox на пачку из {len(entries)} постов: {response}")
+        return [AsyncSMMBoxAPI._failed_item("неожиданный ответ SMMBox") for _ in entries]
+
+    @staticmethod
+    def _failed_item(
+        error: Optional[str],
+        conflict: bool = False,
+        sent: bool = True,
+        retry_after: Optional[float] = None
+    ) -> Dict:
+        return {
+            'ok': False,
+            'response': None,
+            'error': error or 'неизвестная ошибка',
+            'conflict': conflict,
+            'sent': sent,
+            'retry_after': retry_after
+        }
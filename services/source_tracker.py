@@ -0,0 +1,349 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import (
+    SOURCE_POLL_INTERVAL,
+    SOURCE_SCAN_LIMIT,
+    SOURCE_INITIAL_LIMIT,
+    SOURCE_STOP_AFTER_KNOWN,
+    SOURCE_FAILED_RETRY_INTERVAL,
+)
+from services.batch_ingest import Reporter
+from services.maintenance import run_periodically
+from services.scheduler import CONNECTION_PRAGMAS, migrate
+
+logger = logging.getLogger(__name__)
+
+# Новое сообщение прогресса: (чат, текст) -> (ID сообщения, обновление сообщения)
+ProgressOpener = Callable[[int, str], Awaitable[Tuple[int, Reporter]]]
+
+# Как часто проверять, не пора ли опросить источники (сек)
+DUE_CHECK_INTERVAL = 60
+
+# Таблицы tracked_sources и source_failed_entries создаются миграциями планировщика (SCHEMA_MIGRATIONS 10)
+
+SQL_INSERT_SOURCE = '''
+    INSERT OR IGNORE INTO tracked_sources (chat_id, url, platform, created_at)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_SELECT_SOURCES = 'SELECT id, chat_id, url, platform, created_at, last_polled_at FROM tracked_sources'
+SQL_GET_SOURCE = SQL_SELECT_SOURCES + ' WHERE chat_id = ? AND url = ?'
+SQL_CHAT_SOURCES = SQL_SELECT_SOURCES + ' WHERE chat_id = ? ORDER BY id'
+SQL_DUE_SOURCES = SQL_SELECT_SOURCES + ' WHERE last_polled_at IS NULL OR last_polled_at <= ? ORDER BY last_polled_at'
+SQL_MARK_POLLED = 'UPDATE tracked_sources SET last_polled_at = ? WHERE id = ?'
+SQL_DELETE_SOURCE = 'DELETE FROM tracked_sources WHERE id = ? AND chat_id = ?'
+SQL_DELETE_SOURCE_FAILURES = 'DELETE FROM source_failed_entries WHERE source_id = ?'
+SQL_RECORD_FAILURE = '''
+    INSERT OR REPLACE INTO source_failed_entries (source_id, platform, video_id, failed_at)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_RECENT_FAILURES = '''
+    SELECT video_id FROM source_failed_entries
+    WHERE source_id = ? AND platform = ? AND failed_at > ? AND video_id IN (SELECT value FROM json_each(?))
+'''
+SQL_DELETE_OLD_FAILURES = 'DELETE FROM source_failed_entries WHERE failed_at <= ?'
+
+
+class SourceStore:
+    """
+    Отслеживаемые каналы, профили и плейлисты (таблица в базе планировщика)
+    """
+
+    def __init__(self, db_path: str = "scheduler.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            for pragma in CONNECTION_PRAGMAS:
+                self._conn.execute(pragma)
+            migrate(self._conn)
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        source_id, chat_id, url, platform, created_at, last_polled_at = row
+        return {
+            'id': source_id,
+            'chat_id': chat_id,
+            'url': url,
+            'platform': platform,
+            'created_at': created_at,
+            'last_polled_at': last_polled_at
+        }
+
+    def add(self, chat_id: int, url: str, platform: str) -> Tuple[Dict, bool]:
+        """
+        Начать отслеживать источник
+
+        Returns:
+            (источник, True если он добавлен сейчас, а не раньше)
+        """
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            created = self._conn.execute(SQL_INSERT_SOURCE, (chat_id, url, platform, now)).rowcount > 0
+            self._conn.commit()
+            row = self._conn.execute(SQL_GET_SOURCE, (chat_id, url)).fetchone()
+        return self._to_dict(row), created
+
+    def remove(self, chat_id: int, source_id: int) -> bool:
+        """
+        Перестать отслеживать источник чата
+        """
+        with self._lock:
+            deleted = self._conn.execute(SQL_DELETE_SOURCE, (source_id, chat_id)).rowcount
+            if deleted:
+                self._conn.execute(SQL_DELETE_SOURCE_FAILURES, (source_id,))
+            self._conn.commit()
+        return deleted > 0
+
+    def list_for_chat(self, chat_id: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(SQL_CHAT_SOURCES, (chat_id,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def due(self, interval: float) -> List[Dict]:
+        """
+        Источники, которые не опрашивались interval секунд
+        """
+        cutoff = int(datetime.now().timestamp() - interval)
+        with self._lock:
+            rows = self._conn.execute(SQL_DUE_SOURCES, (cutoff,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def mark_polled(self, source_id: int):
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._conn.execute(SQL_MARK_POLLED, (now, source_id))
+            self._conn.commit()
+
+    def record_failures(self, source_id: int, entries: List[Dict], retry_interval: float):
+        """
+        Запомнить видео источника, которые не удалось извлечь (и забыть устаревшие)
+        """
+        now = int(datetime.now().timestamp())
+        with self._lock:
+            self._conn.execute(SQL_DELETE_OLD_FAILURES, (now - retry_interval,))
+            self._conn.executemany(
+                SQL_RECORD_FAILURE,
+                [(source_id, entry['platform'], entry['id'], now) for entry in entries]
+            )
+            self._conn.commit()
+
+    def recent_failures(self, source_id: int, platform: str, video_ids: Iterable[str], retry_interval: float) -> Set[str]:
+        """
+        Выбрать из video_ids видео, которые не удалось извлечь за последние retry_interval секунд
+        """
+        since = int(datetime.now().timestamp() - retry_interval)
+        with self._lock:
+            rows = self._conn.execute(
+                SQL_RECENT_FAILURES, (source_id, platform, since, json.dumps(list(video_ids)))
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SourceTracker:
+    """
+    Отслеживание авторов: новые видео канала/профиля уходят в пакетную загрузку
+
+    Опрос источника - один дешёвый вызов плоского списка (не больше scan_limit
+    записей, сначала новые). Все ID списка проверяются одним запросом к базе:
+    уже известные планировщику или очереди публикаций видео пропускаются,
+    как и недавно не извлечённые, а просмотр останавливается после нескольких
+    известных подряд. Полностью извлекаются только новые видео - через BatchIngestor.
+    """
+
+    def __init__(
+        self,
+        store: SourceStore,
+        video_downloader,
+        scheduler,
+        publish_queue,
+        batch_ingestor,
+        executor,
+        poll_interval: float = SOURCE_POLL_INTERVAL,
+        scan_limit: int = SOURCE_SCAN_LIMIT,
+        initial_limit: int = SOURCE_INITIAL_LIMIT,
+        stop_after_known: int = SOURCE_STOP_AFTER_KNOWN,
+        failed_retry_interval: float = SOURCE_FAILED_RETRY_INTERVAL
+    ):
+        """
+        Args:
+            store: SourceStore
+            video_downloader: VideoDownloader (плоский список источника)
+            scheduler: PostScheduler (уже запланированные видео)
+            publish_queue: PublishQueue (видео, ждущие публикации)
+            batch_ingestor: BatchIngestor (полное извлечение и постановка новых видео)
+            executor: BlockingExecutor
+            poll_interval: Как часто опрашивать каждый источник (сек)
+            scan_limit: Сколько записей списка читать за опрос
+            initial_limit: Сколько последних видео взять при первом опросе
+            stop_after_known: После скольких известных видео подряд прекращать чтение
+            failed_retry_interval: Через сколько снова пробовать видео, которое не удалось извлечь (сек)
+        """
+        self.store = store
+        self.video_downloader = video_downloader
+        self.scheduler = scheduler
+        self.publish_queue = publish_queue
+        self.batch_ingestor = batch_ingestor
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self.scan_limit = scan_limit
+        self.initial_limit = initial_limit
+        self.stop_after_known = max(1, stop_after_known)
+        self.failed_retry_interval = failed_retry_interval
+        self._open_progress: Optional[ProgressOpener] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchers: Set[asyncio.Task] = set()
+
+    def start(self, open_progress: ProgressOpener):
+        """
+        Запустить периодический опрос источников
+
+        Args:
+            open_progress: Отправка нового сообщения прогресса в чат
+        """
+        self._open_progress = open_progress
+        self._task = asyncio.create_task(
+            run_periodically('source polling', DUE_CHECK_INTERVAL, self.poll_due, initial_delay=DUE_CHECK_INTERVAL)
+        )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        watchers = list(self._watchers)
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+    async def poll_due(self):
+        """
+        Опросить источники, у которых подошло время
+        """
+        for source in await self.executor.run('db', self.store.due, self.poll_interval):
+            # Пока в чате идёт пакетная загрузка, новые видео могут быть ещё не в очереди
+            if self.batch_ingestor.is_running(source['chat_id']):
+                continue
+            try:
+                await self.poll(source)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка опроса источника {source['url']}: {e}")
+
+    async def poll(self, source: Dict) -> int:
+        """
+        Найти новые видео источника и отправить их в пакетную загрузку
+
+        Returns:
+            Сколько новых видео найдено
+        """
+        entries = await self.executor.run('extract', self.list_entries, source)
+        known = await self.executor.run('db', self.known_ids, source, entries)
+        await self.executor.run('db', self.store.mark_polled, source['id'])
+        entries = self.select_new_entries(source, entries, known)
+
+        if not entries:
+            logger.info(f"Источник {source['url']}: новых видео нет")
+            return 0
+
+        logger.info(f"Источник {source['url']}: новых видео {len(entries)}")
+        # Публикуем в порядке выхода видео: список идёт от новых к старым
+        urls = [entry['url'] for entry in reversed(entries)]
+        message_id, report = await self._open_progress(
+            source['chat_id'],
+            f"📡 {source['url']}\nНовых видео: {len(urls)}. Начинаю обработку..."
+        )
+        batch = self.batch_ingestor.start(source['chat_id'], message_id, urls, report)
+        watcher = asyncio.create_task(self._record_failures(source, entries, batch))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+        return len(entries)
+
+    async def _record_failures(self, source: Dict, entries: List[Dict], batch: asyncio.Task):
+        """
+        Дождаться пакетной загрузки и запомнить видео, которые она не смогла извлечь
+        """
+        await asyncio.wait([batch])
+        if batch.cancelled() or batch.exception() is not None:
+            return
+
+        failed_urls = {url for url, _ in batch.result()['errors']}
+        failed = [entry for entry in entries if entry['url'] in failed_urls]
+        if not failed:
+            return
+        await self.executor.run('db', self.store.record_failures, source['id'], failed, self.failed_retry_interval)
+        logger.info(
+            f"Источник {source['url']}: {len(failed)} видео не извлечено, "
+            f"повторю не раньше чем через {self.failed_retry_interval} сек"
+        )
+
+    def list_entries(self, source: Dict) -> List[Dict]:
+        """
+        Прочитать первые scan_limit записей списка источника (блокирующий вызов)
+        """
+        entries = self.video_downloader.iter_source_entries(source['url'])
+        listed = []
+        try:
+            for entry in entries:
+                listed.append(entry)
+                if len(listed) >= self.scan_limit:
+                    break
+        finally:
+            # Закрываем генератор: yt-dlp не будет запрашивать следующие страницы
+            entries.close()
+        return listed
+
+    def known_ids(self, source: Dict, entries: List[Dict]) -> Set[Tuple[str, str]]:
+        """
+        Какие записи уже известны или недавно не извлеклись (блокирующий вызов, по запросу на хранилище)
+
+        Returns:
+            Множество (платформа, ID видео)
+        """
+        ids_by_platform: Dict[str, List[str]] = {}
+        for entry in entries:
+            ids_by_platform.setdefault(entry['platform'], []).append(entry['id'])
+
+        known = set()
+        for platform, video_ids in ids_by_platform.items():
+            found = (
+                self.scheduler.known_video_ids(platform, video_ids)
+                | self.publish_queue.known_video_ids(platform, video_ids)
+                | self.store.recent_failures(source['id'], platform, video_ids, self.failed_retry_interval)
+            )
+            known.update((platform, video_id) for video_id in found)
+        return known
+
+    def select_new_entries(self, source: Dict, entries: List[Dict], known: Set[Tuple[str, str]]) -> List[Dict]:
+        """
+        Выбрать новые записи списка до первых известных видео
+
+        При первом опросе берутся только initial_limit последних видео,
+        чтобы подписка на автора не ставила в очередь весь его архив.
+        """
+        limit = self.initial_limit if source['last_polled_at'] is None else self.scan_limit
+        new_entries = []
+        known_in_row = 0
+
+        for entry in entries:
+            if (entry['platform'], entry['id']) in known:
+                known_in_row += 1
+                if known_in_row >= self.stop_after_known:
+                    break
+            else:
+                known_in_row = 0
+                new_entries.append(entry)
+                if len(new_entries) >= limit:
+                    break
+
+        return new_entries
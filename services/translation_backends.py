@@ -0,0 +1,317 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from deep_translator import GoogleTranslator, MyMemoryTranslator, LibreTranslator
+from deep_translator.exceptions import NotValidLength, NotValidPayload
+
+from config import (
+    TRANSLATION_BACKENDS,
+    TRANSLATION_HEDGE_DELAY,
+    TRANSLATION_HEDGE_MIN_DELAY,
+    TRANSLATION_TIMEOUT,
+    TRANSLATION_BACKEND_MAX_FAILURES,
+    TRANSLATION_BACKEND_COOLDOWN,
+    LIBRE_TRANSLATE_URL,
+    LIBRE_TRANSLATE_API_KEY,
+)
+
+logger = logging.getLogger(__name__)
+
+# MyMemory принимает коды вида "ru-RU"
+MYMEMORY_CODES = {
+    'ru': 'ru-RU', 'en': 'en-GB', 'uk': 'uk-UA', 'be': 'be-BY', 'es': 'es-ES', 'pt': 'pt-PT',
+    'fr': 'fr-FR', 'de': 'de-DE', 'it': 'it-IT', 'tr': 'tr-TR', 'pl': 'pl-PL', 'id': 'id-ID',
+    'ja': 'ja-JP', 'ko': 'ko-KR', 'zh-CN': 'zh-CN', 'ar': 'ar-SA', 'hi': 'hi-IN', 'th': 'th-TH',
+    'el': 'el-GR', 'iw': 'he-IL', 'sr': 'sr-Latn-RS', 'hy': 'hy-AM', 'ka': 'ka-GE',
+}
+
+# LibreTranslate использует ISO 639-1 без регионов
+LIBRE_CODES = {'zh-CN': 'zh', 'iw': 'he'}
+
+# Сколько символов переводчик принимает за запрос (как проверяет deep-translator: длина < лимита)
+BACKEND_MAX_CHARS = {
+    'google': 5000,
+    'mymemory': 500,
+}
+
+
+class TranslationError(Exception):
+    """Ни один переводчик не смог перевести текст"""
+
+
+class TranslationBackend:
+    """
+    Один переводчик из цепочки со статистикой задержек и здоровьем
+
+    После max_failures ошибок подряд переводчик понижается: он уходит в конец
+    очереди на cooldown секунд (при повторных сбоях - дольше).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[str, str], object],
+        max_failures: int = TRANSLATION_BACKEND_MAX_FAILURES,
+        cooldown: int = TRANSLATION_BACKEND_COOLDOWN,
+        window: int = 100,
+        max_chars: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Имя переводчика для логов
+            factory: Функция (source, target) -> объект с методом translate(text)
+            max_failures: Сколько ошибок подряд до понижения
+            cooldown: На сколько секунд понижать
+            window: Сколько последних задержек учитывать в p95
+            max_chars: Лимит длины текста за запрос (None - без лимита)
+        """
+        self.name = name
+        self._factory = factory
+        self.max_chars = max_chars
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+        # Клиенты deep-translator хранят текст запроса в самом объекте (_url_params),
+        # поэтому общий клиент нельзя звать из разных потоков - у каждого потока свои
+        self._local = threading.local()
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        self.consecutive_failures = 0
+        self.demotions = 0
+        self.demoted_until = 0.0
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        """
+        Перевести текст, записав задержку или ошибку
+
+        Raises:
+            Исключение переводчика или TranslationError при пустом ответе
+        """
+        started = time.monotonic()
+        try:
+            client = self._get_client(source, target)
+            translated = client.translate(text)
+            if not translated:
+                raise TranslationError(f"{self.name} вернул пустой перевод")
+        except (NotValidLength, NotValidPayload):
+            # Текст не прошёл проверку до запроса - переводчик тут ни при чём
+            raise
+        except Exception:
+            self._record_failure()
+            raise
+
+        self._record_success(time.monotonic() - started)
+        return translated
+
+    def accepts(self, text: str) -> bool:
+        """
+        Поместится ли текст в один запрос к переводчику
+        """
+        return self.max_chars is None or len(text) < self.max_chars
+
+    def _get_client(self, source: str, target: str):
+        """
+        Клиент для пары языков, принадлежащий текущему потоку
+        """
+        clients: Optional[Dict[Tuple[str, str], object]] = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        key = (source, target)
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = self._factory(source, target)
+        return client
+
+    def _record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self.consecutive_failures = 0
+            if self.demotions:
+                logger.info(f"Переводчик {self.name} снова работает")
+            self.demotions = 0
+            self.demoted_until = 0.0
+
+    def _record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.max_failures:
+                # Каждое следующее понижение вдвое дольше (но не больше 16 cooldown)
+                self.demoted_until = time.monotonic() + self.cooldown * 2 ** min(self.demotions, 4)
+                self.demotions += 1
+                self.consecutive_failures = 0
+                logger.warning(f"Переводчик {self.name} понижен после серии ошибок")
+
+    def is_demoted(self) -> bool:
+        return time.monotonic() < self.demoted_until
+
+    def p95(self) -> Optional[float]:
+        """
+        95-й перцентиль задержки в секундах (None, пока нет замеров)
+        """
+        with self._lock:
+            if len(self._latencies) < 5:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def get_stats(self) -> Dict:
+        p95 = self.p95()
+        return {
+            'name': self.name,
+            'p95_ms': int(p95 * 1000) if p95 is not None else None,
+            'samples': len(self._latencies),
+            'demoted': self.is_demoted()
+        }
+
+
+class TranslatorChain:
+    """
+    Цепочка переводчиков с хеджированием
+
+    Запрос уходит в лучший доступный переводчик. Если он не ответил за своё
+    p95 время, параллельно отправляется запрос в следующий, и берётся первый
+    успешный ответ. При ошибке следующий переводчик вызывается сразу.
+    Общее ожидание ограничено timeout.
+    """
+
+    def __init__(
+        self,
+        backends: List[TranslationBackend],
+        hedge_delay: float = TRANSLATION_HEDGE_DELAY,
+        hedge_min_delay: float = TRANSLATION_HEDGE_MIN_DELAY,
+        timeout: float = TRANSLATION_TIMEOUT
+    ):
+        """
+        Args:
+            backends: Переводчики в порядке предпочтения
+            hedge_delay: Задержка перед хеджированием, пока нет статистики, и её верхняя граница
+            hedge_min_delay: Нижняя граница задержки перед хеджированием
+            timeout: Максимальное общее время перевода в секундах
+        """
+        if not backends:
+            raise ValueError("Нужен хотя бы один переводчик")
+        self.backends = backends
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(backends), thread_name_prefix='translate')
+
+    def _ordered_backends(self) -> List[TranslationBackend]:
+        """
+        Здоровые переводчики в порядке настройки, понижённые - в конце
+        """
+        return sorted(self.backends, key=lambda backend: backend.is_demoted())
+
+    def _hedge_after(self, backend: TranslationBackend) -> float:
+        p95 = backend.p95()
+        if p95 is None:
+            return self.hedge_delay
+        return max(self.hedge_min_delay, min(self.hedge_delay, p95))
+
+    def translate(self, text: str, source: Optional[str], target: str) -> str:
+        """
+        Перевести текст первым успешно ответившим переводчиком
+
+        Переводчики, которым текст слишком длинный (MyMemory - 500 символов),
+        пропускаются: их отказ ничего не говорит о здоровье переводчика.
+
+        Raises:
+            TranslationError: если все переводчики упали или не уложились в timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        queue = [backend for backend in self._ordered_backends() if backend.accepts(text)]
+        if not queue:
+            raise TranslationError(f"Текст из {len(text)} символов не принимает ни один переводчик")
+        in_flight = {}
+        last_error: Optional[Exception] = None
+        launch_next = True
+        hedge_at = deadline
+
+        while True:
+            if launch_next and queue:
+                backend = queue.pop(0)
+                if in_flight:
+                    logger.info(f"Переводчик не ответил вовремя, дублирую запрос в {backend.name}")
+                in_flight[self._pool.submit(backend.translate, text, source or 'auto', target)] = backend
+                hedge_at = time.monotonic() + self._hedge_after(backend)
+                launch_next = False
+
+            remaining = deadline - time.monotonic()
+            if not in_flight or remaining <= 0:
+                break
+
+            # Ждём ответа, но не дольше момента, когда пора хеджировать следующим переводчиком
+            wait_for = min(remaining, max(0.0, hedge_at - time.monotonic())) if queue else remaining
+            done, _ = wait(list(in_flight), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for finished in done:
+                finished_backend = in_flight.pop(finished)
+                try:
+                    return finished.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"Переводчик {finished_backend.name} не смог перевести: {e}")
+
+            # Ошибка - сразу следующий переводчик, медленный ответ - хеджируем
+            if done or time.monotonic() >= hedge_at:
+                launch_next = True
+
+        raise TranslationError(f"Не удалось перевести текст: {last_error or 'превышено время ожидания'}")
+
+    def get_stats(self) -> List[Dict]:
+        """
+        Задержки и состояние каждого переводчика
+        """
+        return [backend.get_stats() for backend in self.backends]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _mymemory_factory(source: str, target: str):
+    # MyMemory не умеет автоопределение, неизвестный язык считаем английским
+    source = 'en' if source == 'auto' else source
+    return MyMemoryTranslator(
+        source=MYMEMORY_CODES.get(source, source),
+        target=MYMEMORY_CODES.get(target, target)
+    )
+
+
+def _libre_factory(source: str, target: str):
+    return LibreTranslator(
+        source=LIBRE_CODES.get(source, source),
+        target=LIBRE_CODES.get(target, target),
+        api_key=LIBRE_TRANSLATE_API_KEY,
+        custom_url=LIBRE_TRANSLATE_URL,
+        use_free_api=False
+    )
+
+
+BACKEND_FACTORIES = {
+    'google': lambda source, target: GoogleTranslator(source=source, target=target),
+    'mymemory': _mymemory_factory,
+    'libre': _libre_factory,
+}
+
+
+def build_translator_chain(names: Optional[List[str]] = None) -> TranslatorChain:
+    """
+    Собрать цепочку переводчиков из настроек (TRANSLATION_BACKENDS)
+    """
+    backends = []
+    for name in names or TRANSLATION_BACKENDS:
+        if name not in BACKEND_FACTORIES:
+            logger.warning(f"Неизвестный переводчик в настройках: {name}")
+            continue
+        if name == 'libre' and not LIBRE_TRANSLATE_URL:
+            logger.warning("LibreTranslate пропущен: не задан LIBRE_TRANSLATE_URL")
+            continue
+        backends.append(TranslationBackend(name, BACKEND_FACTORIES[name], max_chars=BACKEND_MAX_CHARS.get(name)))
+
+    logger.info(f"Цепочка переводчиков: {', '.join(backend.name for backend in backends)}")
+    return TranslatorChain(backends)
@@ -0,0 +1,170 @@
+import sqlite3
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+from config import (
+    TRANSLATION_CACHE_DB,
+    TRANSLATION_CACHE_MEMORY_SIZE,
+    TRANSLATION_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Нормализовать текст для ключа кеша (лишние пробелы и переводы строк не важны)
+    """
+    return ' '.join(text.split())
+
+
+class TranslationCache:
+    """
+    Кеш переводов: LRU в памяти поверх таблицы SQLite
+
+    Ключ - нормализованный исходный текст и целевой язык. Когда записей
+    на диске становится больше max_entries, удаляются давно не использованные.
+    """
+
+    def __init__(
+        self,
+        db_path: str = TRANSLATION_CACHE_DB,
+        memory_size: int = TRANSLATION_CACHE_MEMORY_SIZE,
+        max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES
+    ):
+        """
+        Args:
+            db_path: Путь к файлу SQLite
+            memory_size: Сколько переводов держать в памяти
+            max_entries: Максимум записей на диске
+        """
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+
+        self._memory: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.init_db()
+
+    def init_db(self):
+        """
+        Инициализация таблицы переводов
+        """
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS translations (
+                    source_text TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    last_used INTEGER NOT NULL,
+                    PRIMARY KEY (source_text, target)
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)')
+            self._conn.commit()
+            self._disk_entries = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        logger.info(f"Кеш переводов инициализирован: {self.db_path} ({self._disk_entries} записей)")
+
+    def _remember(self, key: Tuple[str, str], translated: str):
+        """
+        Положить перевод в LRU в памяти (вызывается под блокировкой)
+        """
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str, target: str) -> Optional[str]:
+        """
+        Найти перевод в кеше
+
+        Returns:
+            Переведённый текст или None, если перевода в кеше нет
+        """
+        key = (normalize_text(text), target)
+
+        with self._lock:
+            translated = self._memory.get(key)
+            if translated is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return translated
+
+            row = self._conn.execute(
+                'SELECT translated FROM translations WHERE source_text = ? AND target = ?',
+                key
+            ).fetchone()
+
+            if not row:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                'UPDATE translations SET last_used = ? WHERE source_text = ? AND target = ?',
+                (int(time.time()), *key)
+            )
+            self._conn.commit()
+            self._remember(key, row[0])
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, text: str, target: str, translated: str):
+        """
+        Сохранить перевод в кеш
+        """
+        key = (normalize_text(text), target)
+
+        with self._lock:
+            self._remember(key, translated)
+            self._conn.execute('''
+                INSERT OR REPLACE INTO translations (source_text, target, translated, last_used)
+                VALUES (?, ?, ?, ?)
+            ''', (*key, translated, int(time.time())))
+            self._conn.commit()
+            # Счётчик приблизительный (замена тоже +1), точное значение пересчитывается при очистке
+            self._disk_entries += 1
+
+            if self._disk_entries > self.max_entries:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        """
+        Удалить ~10% давно не использованных записей с диска
+        """
+        self._conn.execute('''
+            DELETE FROM translations WHERE rowid IN (
+                SELECT rowid FROM translations ORDER BY last_used LIMIT ?
+            )
+        ''', (max(1, self.max_entries // 10),))
+        self._conn.commit()
+        self._disk_entries = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        logger.info(f"Кеш переводов очищен до {self._disk_entries} записей")
+
+    def get_stats(self) -> Dict:
+        """
+        Счётчики попаданий и промахов кеша
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': self._disk_entries
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,36 +1,189 @@
-from deep_translator import GoogleTranslator
+import asyncio
 import logging
+from typing import Dict, List, Optional, Tuple
+
+from config import TRANSLATE_BATCH_MAX_CHARS, TRANSLATE_BATCH_CONCURRENCY
+from services.language_detector import needs_translation
+from services.translation_backends import build_translator_chain
 
 logger = logging.getLogger(__name__)
 
 
 class Translator:
-    def __init__(self):
-        self.translator = GoogleTranslator(source='auto', target='ru')
+    def __init__(self, cache=None, chain=None):
+        """
+        Args:
+            cache: TranslationCache для уже переведённых текстов (опционально)
+            chain: TranslatorChain (по умолчанию собирается из TRANSLATION_BACKENDS)
+        """
+        self.target = 'ru'
+        self.chain = chain or build_translator_chain()
+        self.cache = cache
 
     def translate_to_russian(self, text: str) -> str:
         """
         Перевести текст на русский язык
         """
         try:
-            # Если текст уже на русском, вернём как есть
-            if self._is_russian(text):
-                logger.info("Текст уже на русском языке")
+            # Если текст уже на русском или переводить нечего (эмодзи, хештеги, ссылки), вернём как есть
+            should_translate, source = needs_translation(text, self.target)
+            if not should_translate:
+                logger.info("Перевод не нужен: текст уже на русском или без слов")
                 return text
             
-            logger.info(f"Перевод текста: {text[:50]}...")
-            translated = self.translator.translate(text)
+            if self.cache:
+                cached = self.cache.get(text, self.target)
+                if cached is not None:
+                    logger.info(f"Перевод взят из кеша: {cached[:50]}...")
+                    return cached
+            
+            logger.info(f"Перевод текста ({source or 'auto'}): {text[:50]}...")
+            translated = self.chain.translate(text, source, self.target)
             logger.info(f"Переведено: {translated[:50]}...")
+            
+            if self.cache and translated:
+                self.cache.put(text, self.target, translated)
             return translated
             
         except Exception as e:
             logger.error(f"Ошибка перевода: {e}")
             return text  # Возвращаем оригинал если перевод не удался
 
-    def _is_russian(self, text: str) -> bool:
+    def translate_many(self, texts: List[str]) -> List[str]:
+        """
+        Перевести список текстов на русский минимальным числом запросов
+
+        Тексты склеиваются в пачки до TRANSLATE_BATCH_MAX_CHARS символов и
+        переводятся одним запросом на пачку. Порядок сохраняется, а если
+        перевести отдельный текст не удалось, на его месте остаётся оригинал.
+        """
+        results, pending = self._prepare_batch(texts)
+        for source, chunk in self._make_chunks(pending):
+            self._apply_chunk(results, pending, chunk, self._translate_chunk(chunk, source))
+        return results
+
+    async def translate_many_async(
+        self,
+        texts: List[str],
+        executor,
+        concurrency: int = TRANSLATE_BATCH_CONCURRENCY
+    ) -> List[str]:
+        """
+        Асинхронный translate_many: пачки переводятся параллельно, не больше concurrency одновременно
+
+        Args:
+            texts: Тексты для перевода
+            executor: BlockingExecutor (блокирующие вызовы идут под общим лимитом 'translate')
+            concurrency: Сколько пачек этого вызова переводить одновременно
+        """
+        results, pending = await executor.run('translate', self._prepare_batch, texts)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def translate_chunk(source: Optional[str], chunk: List[str]):
+            async with semaphore:
+                translated = await executor.run('translate', self._translate_chunk, chunk, source)
+            self._apply_chunk(results, pending, chunk, translated)
+
+        await asyncio.gather(*(translate_chunk(source, chunk) for source, chunk in self._make_chunks(pending)))
+        return results
+
+    def _prepare_batch(self, texts: List[str]) -> Tuple[List[str], Dict[str, Tuple[Optional[str], List[int]]]]:
+        """
+        Отсеять тексты, которым перевод не нужен или он уже есть в кеше
+
+        Returns:
+            (список результатов с оригиналами на местах непереведённых текстов,
+             словарь "текст -> (исходный язык, индексы)" для текстов, которые нужно перевести)
+        """
+        results = list(texts)
+        pending: Dict[str, Tuple[Optional[str], List[int]]] = {}
+
+        for index, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+
+            if text in pending:
+                pending[text][1].append(index)
+                continue
+
+            should_translate, source = needs_translation(text, self.target)
+            if not should_translate:
+                continue
+
+            cached = self.cache.get(text, self.target) if self.cache else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending[text] = (source, [index])
+
+        return results, pending
+
+    def _make_chunks(self, pending: Dict[str, Tuple[Optional[str], List[int]]]) -> List[Tuple[Optional[str], List[str]]]:
+        """
+        Разбить тексты на пачки для одного запроса (тексты склеиваются через перевод строки)
+
+        В одну пачку попадают только тексты с одинаковым исходным языком.
+        """
+        chunks: List[Tuple[Optional[str], List[str]]] = []
+        current: Dict[Optional[str], Tuple[List[str], int]] = {}
+
+        for text, (source, _) in pending.items():
+            # Многострочный или слишком длинный текст не склеить без потери границ - переводим отдельно
+            if '\n' in text or len(text) >= TRANSLATE_BATCH_MAX_CHARS:
+                chunks.append((source, [text]))
+                continue
+
+            chunk, size = current.get(source, ([], 0))
+            if chunk and size + len(text) + 1 > TRANSLATE_BATCH_MAX_CHARS:
+                chunks.append((source, chunk))
+                chunk, size = [], 0
+
+            chunk.append(text)
+            current[source] = (chunk, size + len(text) + 1)
+
+        chunks.extend((source, chunk) for source, (chunk, _) in current.items() if chunk)
+        return chunks
+
+    def _translate_chunk(self, chunk: List[str], source: Optional[str] = None) -> List[str]:
+        """
+        Перевести пачку одним запросом, при сбое - по одному тексту
+
+        Returns:
+            Переводы в том же порядке (None на месте текста, который перевести не удалось)
+        """
+        if len(chunk) > 1:
+            try:
+                logger.info(f"Пакетный перевод {len(chunk)} текстов ({source or 'auto'})")
+                parts = self.chain.translate('\n'.join(chunk), source, self.target).split('\n')
+                if len(parts) == len(chunk):
+                    return [part.strip() for part in parts]
+                logger.warning(f"Пакетный перевод вернул {len(parts)} строк вместо {len(chunk)}, перевожу по одному")
+            except Exception as e:
+                logger.error(f"Ошибка пакетного перевода: {e}, перевожу по одному")
+
+        translations = []
+        for text in chunk:
+            try:
+                translations.append(self.chain.translate(text, source, self.target))
+            except Exception as e:
+                logger.error(f"Ошибка перевода: {e}")
+                translations.append(None)
+        return translations
+
+    def _apply_chunk(
+        self,
+        results: List[str],
+        pending: Dict[str, Tuple[Optional[str], List[int]]],
+        chunk: List[str],
+        translations: List[str]
+    ):
         """
-        Проверить, содержит ли текст русские буквы
+        Разложить переводы пачки по позициям и сохранить их в кеш
         """
-        russian_chars = set('абвгдеёжзийклмнопрстуфхцчшщъыьэюя')
-        text_lower = text.lower()
-        return any(char in russian_chars for char in text_lower)
+        for text, translated in zip(chunk, translations):
+            if not translated:
+                continue  # На месте текста остаётся оригинал
+            for index in pending[text][1]:
+                results[index] = translated
+            if self.cache:
+                self.cache.put(text, self.target, translated)
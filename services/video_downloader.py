@@ -1,7 +1,8 @@
 import logging
 import os
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator
 from .platforms import YouTubePlatform, TikTokPlatform, InstagramPlatform
+from .media_url import media_url_expires_at, is_media_url_fresh
 
 logger = logging.getLogger(__name__)
 
@@ -11,10 +12,12 @@ class VideoDownloader:
     Главный класс для работы с видео из разных платформ
     """
     
-    def __init__(self, instagram_cookies: Optional[str] = None):
+    def __init__(self, instagram_cookies: Optional[str] = None, extraction_pool=None, metadata_cache=None):
         """
         Args:
             instagram_cookies: Путь к файлу cookies для Instagram (опционально)
+            extraction_pool: ExtractionPool для запуска yt-dlp в отдельных процессах (опционально)
+            metadata_cache: VideoMetadataCache для повторных ссылок на то же видео (опционально)
         """
         # Проверяем существует ли файл cookies для Instagram
         if instagram_cookies:
@@ -38,6 +41,11 @@ class VideoDownloader:
             TikTokPlatform(),
             instagram_platform
         ]
+        
+        self.extraction_pool = extraction_pool
+        self.metadata_cache = metadata_cache
+        for platform in self.platforms:
+            platform.extraction_pool = extraction_pool
     
     def get_platform_for_url(self, url: str):
         """
@@ -48,6 +56,53 @@ class VideoDownloader:
                 return platform
         return None
     
+    def get_video_key(self, url: str) -> str:
+        """
+        Канонический ключ видео: "платформа:ID", одинаковый для разных ссылок на одно видео
+        
+        Для ссылок без ID в адресе (короткие vm.tiktok.com) ключом служит сама ссылка.
+        """
+        platform = self.get_platform_for_url(url)
+        video_id = platform.extract_video_id(url) if platform else None
+        if video_id:
+            return f"{platform.get_platform_name()}:{video_id}"
+        return url.strip()
+    
+    def get_platform_for_source(self, url: str):
+        """
+        Определить платформу канала/профиля/плейлиста по URL
+        """
+        for platform in self.platforms:
+            if platform.is_source_url(url):
+                return platform
+        return None
+    
+    def is_source_url(self, url: str) -> bool:
+        """
+        Проверить, что URL - поддерживаемый канал, профиль или плейлист
+        """
+        return self.get_platform_for_source(url) is not None
+    
+    def iter_source_entries(self, url: str) -> Iterator[Dict]:
+        """
+        Лениво перечислить видео источника плоским извлечением (сначала новые)
+        
+        Полностью видео не извлекаются: для этого есть get_video_info,
+        который стоит вызывать только для новых записей.
+        
+        Yields:
+            Dict с полями id, url, title и platform
+        """
+        platform = self.get_platform_for_source(url)
+        if not platform:
+            logger.error(f"Неподдерживаемый источник: {url}")
+            return
+        
+        platform_name = platform.get_platform_name()
+        for entry in platform.iter_source_entries(url):
+            entry['platform'] = platform_name
+            yield entry
+    
     def get_video_info(self, url: str) -> Optional[Dict]:
         """
         Получить информацию о видео (автоматически определяет платформу)
@@ -58,8 +113,65 @@ class VideoDownloader:
             logger.error(f"Неподдерживаемая платформа для URL: {url}")
             return None
         
-        logger.info(f"Определена платформа: {platform.get_platform_name()}")
-        return platform.get_video_info(url)
+        platform_name = platform.get_platform_name()
+        logger.info(f"Определена платформа: {platform_name}")
+        
+        video_id = platform.extract_video_id(url)
+        if self.metadata_cache and video_id:
+            cached = self.metadata_cache.get(platform_name, video_id)
+            if cached:
+                # Прямая ссылка могла протухнуть - её обновит ensure_fresh_media_url перед постом
+                logger.info(f"[{platform_name}] Информация о видео {video_id} взята из кеша")
+                cached['source_url'] = url
+                return cached
+        
+        return self._extract(platform, url, video_id)
+    
+    def _extract(self, platform, url: str, video_id: Optional[str]) -> Optional[Dict]:
+        """
+        Извлечь информацию через yt-dlp и сохранить её в кеш
+        """
+        info = platform.get_video_info(url)
+        if not info:
+            return None
+        
+        info['source_url'] = url
+        info['url_expires_at'] = media_url_expires_at(info.get('url'))
+        
+        # Для коротких ссылок ID известен только после извлечения
+        video_id = video_id or info.get('id')
+        if self.metadata_cache and video_id:
+            self.metadata_cache.put(video_id, info)
+        
+        return info
+    
+    def ensure_fresh_media_url(self, video_info: Dict) -> Optional[Dict]:
+        """
+        Вернуть video_info с рабочей прямой ссылкой на файл
+        
+        Ссылки CDN подписаны и истекают, а между получением ссылки и
+        публикацией может пройти много времени. Если ссылка ещё свежая,
+        возвращаем video_info без изменений, иначе заново извлекаем видео.
+        
+        Returns:
+            Dict с обновлёнными url/url_expires_at или None, если обновить не удалось
+        """
+        if is_media_url_fresh(video_info):
+            return video_info
+        
+        source_url = video_info.get('source_url') or video_info.get('webpage_url')
+        platform = self.get_platform_for_url(source_url) if source_url else None
+        if not platform:
+            logger.error("Не удалось обновить ссылку на видео: неизвестен исходный URL")
+            return None
+        
+        logger.info(f"[{platform.get_platform_name()}] Прямая ссылка устарела, обновляю: {source_url}")
+        fresh_info = self._extract(platform, source_url, video_info.get('id'))
+        if not fresh_info:
+            return None
+        
+        # Название и прочие данные оставляем как были (их мог видеть пользователь)
+        return dict(video_info, url=fresh_info['url'], url_expires_at=fresh_info['url_expires_at'])
     
     def is_valid_url(self, url: str) -> bool:
         """
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# config.py требует токены при импорте - для тестов хватит заглушек
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'test-telegram-token')
+os.environ.setdefault('SMMBOX_API_TOKEN', 'test-smmbox-token')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.executor import BlockingExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = BlockingExecutor(max_workers=4, limits={})
+    yield executor
+    executor.shutdown()
+
+
+def test_run_shared_coalesces_concurrent_calls(executor):
+    calls = []
+    release = threading.Event()
+
+    def extract(url):
+        calls.append(url)
+        release.wait(5)
+        return {'url': url}
+
+    async def main():
+        waiters = [asyncio.create_task(executor.run_shared('extract', 'YouTube:abc', extract, 'u')) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(main())
+
+    assert calls == ['u']
+    assert results == [{'url': 'u'}] * 3
+    assert executor.coalesced == 2
+    assert executor._inflight == {}
+
+
+def test_run_shared_does_not_coalesce_different_keys(executor):
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        return url
+
+    async def main():
+        return await asyncio.gather(
+            executor.run_shared('extract', 'YouTube:a', extract, 'a'),
+            executor.run_shared('extract', 'YouTube:b', extract, 'b'),
+            executor.run_shared('extract', None, extract, 'c'),
+        )
+
+    assert asyncio.run(main()) == ['a', 'b', 'c']
+    assert sorted(calls) == ['a', 'b', 'c']
+
+
+def test_run_shared_fans_out_errors_and_forgets_failed_call(executor):
+    calls = []
+    release = threading.Event()
+
+    def extract(url):
+        calls.append(url)
+        release.wait(5)
+        raise RuntimeError('video unavailable')
+
+    async def main():
+        waiters = [asyncio.create_task(executor.run_shared('extract', 'YouTube:abc', extract, 'u')) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+    # Следующий вызов после ошибки выполняется заново
+    release.clear()
+    release.set()
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.run_shared('extract', 'YouTube:abc', extract, 'u'))
+    assert len(calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call(executor):
+    release = threading.Event()
+
+    def extract(url):
+        release.wait(5)
+        return url
+
+    async def main():
+        first = asyncio.create_task(executor.run_shared('extract', 'YouTube:abc', extract, 'u'))
+        second = asyncio.create_task(executor.run_shared('extract', 'YouTube:abc', extract, 'u'))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        return await second
+
+    assert asyncio.run(main()) == 'u'
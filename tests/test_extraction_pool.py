@@ -0,0 +1,28 @@
+from services.extraction_pool import ExtractionPool
+
+
+def test_stale_pool_failure_does_not_recycle_replacement():
+    pool = ExtractionPool(workers=1, max_jobs_per_worker=5)
+    try:
+        broken = pool._get_pool()
+        pool._recycle_if_current(broken, "воркер завис", kill=True)
+        fresh = pool._get_pool()
+
+        # Остальные задачи сломанного пула сообщают о поломке позже
+        pool._recycle_if_current(broken, "воркер аварийно завершился")
+
+        assert pool._get_pool() is fresh
+        assert pool.generation == 2
+    finally:
+        pool.shutdown()
+
+
+def test_workers_are_replaced_after_job_limit():
+    limited = ExtractionPool(workers=2, max_jobs_per_worker=5)
+    unlimited = ExtractionPool(workers=1, max_jobs_per_worker=0)
+    try:
+        assert limited._get_pool()._max_tasks_per_child == 5
+        assert unlimited._get_pool()._max_tasks_per_child is None
+    finally:
+        limited.shutdown()
+        unlimited.shutdown()
@@ -0,0 +1,42 @@
+import pytest
+
+from services.language_detector import detect_language, needs_translation
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Уверенно определяемые языки
+    ('Обзор нового телефона', 'ru'),
+    ('Обзор нового iPhone Pro', 'ru'),
+    ('Їжак і ґава', 'uk'),
+    ('This is the best video of the year', 'en'),
+    ('El gato de la casa es muy bonito', 'es'),
+    ('O gato não é meu', 'pt'),
+    ('Le chat est sur la table', 'fr'),
+    ('Der Hund ist nicht mit dem Ball', 'de'),
+    ('Bu kedi çok güzel ve tatlı', 'tr'),
+    ('Kot i pies są w domu', 'pl'),
+    ('猫がかわいい', 'ja'),
+    ('고양이 영상', 'ko'),
+    # Одно-два общих коротких слова - не повод указывать язык
+    ('Wat is dit voor een hond', None),
+    ('Det är en katt i huset', None),
+    ('Con mèo này is so cute', None),
+    ('Funny cat', None),
+    # Переводить нечего
+    ('😂😂😂 #shorts https://youtu.be/abc', 'und'),
+    ('2024', 'und'),
+])
+def test_detect_language(text, expected):
+    assert detect_language(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Обзор нового iPhone Pro', (False, 'ru')),
+    ('🔥🔥 @author', (False, 'und')),
+    ('This is the best video of the year', (True, 'en')),
+    ('Wat is dit voor een hond', (True, None)),
+    ('Con mèo này is so cute', (True, None)),
+    ('Їжак і ґава', (True, 'uk')),
+])
+def test_needs_translation(text, expected):
+    assert needs_translation(text) == expected
@@ -0,0 +1,171 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.scheduler as scheduler_module
+from services.publish_queue import PublishQueue
+from services.scheduler import PostScheduler, SCHEMA_MIGRATIONS, migrate
+from services.source_tracker import SourceStore
+
+# Схема базы до миграций (так её создавала первая версия бота)
+BASELINE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS scheduled_posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_url TEXT NOT NULL,
+        video_title TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        scheduled_date INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        status TEXT DEFAULT 'pending'
+    )
+'''
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """
+    База старой версии: два поста на одно время (дубликат), опубликованный и упавший пост
+    """
+    path = str(tmp_path / 'scheduler.db')
+    tomorrow = datetime.now().replace(hour=12, minute=17, second=0, microsecond=0) + timedelta(days=1)
+    slot = int(tomorrow.timestamp())
+    created = int(datetime.now().timestamp())
+
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany(
+        'INSERT INTO scheduled_posts (video_url, video_title, platform, scheduled_date, created_at, status) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [
+            ('https://youtu.be/a', 'A', 'YouTube', slot, created, 'pending'),
+            ('https://youtu.be/b', 'B', 'YouTube', slot, created, 'pending'),
+            ('https://youtu.be/c', 'C', 'YouTube', slot + 3600, created, 'posted'),
+            ('https://youtu.be/d', 'D', 'YouTube', slot + 7200, created, 'failed'),
+        ]
+    )
+    conn.commit()
+    conn.close()
+    return path, slot
+
+
+def test_migrations_upgrade_baseline_database(baseline_db):
+    path, slot = baseline_db
+
+    scheduler = PostScheduler(db_path=path)
+    try:
+        conn = scheduler._conn
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(SCHEMA_MIGRATIONS)
+
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(scheduled_posts)')}
+        assert {'group_key', 'video_id'} <= columns
+
+        # Дубликат времени снят с расписания, остальные посты сохранились
+        statuses = dict(conn.execute('SELECT video_title, status FROM scheduled_posts').fetchall())
+        assert statuses == {'A': 'pending', 'B': 'cancelled', 'C': 'posted', 'D': 'failed'}
+
+        # Счётчики /stats заполнены по существующим постам
+        stats = scheduler.get_stats()
+        assert stats['total_pending'] == 1
+        assert stats['total_posted'] == 1
+        assert stats['tomorrow'] == 2
+
+        # Старые посты без группы занимают слоты только до переноса в группу
+        assert scheduler._is_slot_taken(slot, '')
+        assert scheduler.adopt_legacy_posts('vk:1') == 4
+        assert scheduler._is_slot_taken(slot, 'vk:1')
+        assert not scheduler._is_slot_taken(slot, '')
+    finally:
+        scheduler.close()
+
+
+def test_migrations_are_idempotent_on_reopen(baseline_db):
+    path, _ = baseline_db
+
+    PostScheduler(db_path=path).close()
+    scheduler = PostScheduler(db_path=path)
+    try:
+        assert scheduler._conn.execute('PRAGMA user_version').fetchone()[0] == len(SCHEMA_MIGRATIONS)
+        post = scheduler.add_post('https://youtu.be/e', 'E', 'YouTube', group_key='vk:1', video_id='e')
+        assert scheduler.known_video_ids('YouTube', ['e', 'zzz']) == {'e'}
+        assert scheduler.get_post(post['id'])['group_key'] == 'vk:1'
+    finally:
+        scheduler.close()
+
+
+def test_failed_migration_leaves_previous_version(baseline_db, monkeypatch):
+    path, _ = baseline_db
+    PostScheduler(db_path=path).close()
+    broken = SCHEMA_MIGRATIONS + [[
+        'ALTER TABLE scheduled_posts ADD COLUMN extra TEXT',
+        'INSERT INTO no_such_table VALUES (1)',
+    ]]
+    monkeypatch.setattr(scheduler_module, 'SCHEMA_MIGRATIONS', broken)
+
+    with pytest.raises(sqlite3.OperationalError):
+        PostScheduler(db_path=path)
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(SCHEMA_MIGRATIONS)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(scheduled_posts)')}
+        assert 'extra' not in columns
+    finally:
+        conn.close()
+
+
+def test_half_applied_column_migration_is_resumed(baseline_db):
+    path, _ = baseline_db
+    # Старая версия упала после первого ALTER миграции 7, не успев поднять user_version
+    conn = sqlite3.connect(path)
+    for statements in SCHEMA_MIGRATIONS[:6]:
+        for statement in statements:
+            conn.execute(statement)
+    conn.execute('ALTER TABLE scheduled_posts ADD COLUMN video_id TEXT')
+    conn.execute('PRAGMA user_version = 6')
+    conn.commit()
+
+    assert migrate(conn) == len(SCHEMA_MIGRATIONS)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(scheduled_posts_archive)')}
+    assert 'video_id' in columns
+    conn.close()
+
+
+def test_publish_queue_table_from_old_self_migration(tmp_path):
+    path = str(tmp_path / 'scheduler.db')
+    scheduler = PostScheduler(db_path=path)
+    scheduler._conn.execute('PRAGMA user_version = 7')
+    scheduler._conn.commit()
+    scheduler.close()
+    # Так таблицу оставлял PublishQueue, пока добавлял колонки сам
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE publish_jobs')
+    conn.execute(SCHEMA_MIGRATIONS[7][0])
+    conn.execute('ALTER TABLE publish_jobs ADD COLUMN target TEXT')
+    conn.execute('ALTER TABLE publish_jobs ADD COLUMN batch_id TEXT')
+    conn.commit()
+    conn.close()
+
+    queue = PublishQueue(db_path=path)
+    try:
+        video = {'url': 'https://youtu.be/a', 'platform': 'YouTube', 'id': 'a'}
+        queue.enqueue(1, 2, video, 'A')
+        assert queue.known_video_ids('YouTube', ['a']) == {'a'}
+        assert queue._conn.execute('PRAGMA user_version').fetchone()[0] == len(SCHEMA_MIGRATIONS)
+    finally:
+        queue.close()
+
+
+def test_stores_share_one_schema(tmp_path):
+    path = str(tmp_path / 'scheduler.db')
+    store = SourceStore(path)
+    queue = PublishQueue(db_path=path)
+    scheduler = PostScheduler(db_path=path)
+    try:
+        source, created = store.add(1, 'https://youtube.com/@author', 'YouTube')
+        assert created and source['id']
+        assert scheduler._conn.execute('PRAGMA user_version').fetchone()[0] == len(SCHEMA_MIGRATIONS)
+    finally:
+        store.close()
+        queue.close()
+        scheduler.close()
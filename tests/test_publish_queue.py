@@ -0,0 +1,97 @@
+import pytest
+
+from services.publish_queue import PublishQueue
+
+VIDEO = {'url': 'https://youtu.be/abc', 'title': 'Video', 'platform': 'YouTube', 'id': 'abc'}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = PublishQueue(db_path=str(tmp_path / 'queue.db'), max_attempts=2, lease_seconds=600)
+    yield queue
+    queue.close()
+
+
+def job_status(queue, job_id):
+    return queue._conn.execute('SELECT status FROM publish_jobs WHERE id = ?', (job_id,)).fetchone()[0]
+
+
+def test_claim_leases_jobs_once(queue):
+    first, second = queue.enqueue_many(1, 10, VIDEO, 'Title', [None, {'social': 'vk', 'id': 2}])
+
+    jobs = queue.claim_many(5)
+
+    assert [job['id'] for job in jobs] == [first, second]
+    assert all(job['lease'] and job['attempts'] == 1 for job in jobs)
+    assert jobs[1]['group'] == {'social': 'vk', 'id': 2}
+    # Задачи в аренде другой воркер не получит
+    assert queue.claim_many(5) == []
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(queue):
+    queue.enqueue(1, 10, VIDEO, 'Title')
+    queue.lease_seconds = -1
+    stale = queue.claim()
+
+    queue.lease_seconds = 600
+    fresh = queue.claim()
+
+    assert fresh['id'] == stale['id']
+    assert fresh['attempts'] == 2
+    assert queue.extend_lease([stale, fresh]) == [fresh]
+    assert stale['lease_lost']
+    # Потерянную задачу нельзя ни завершить, ни вернуть в очередь
+    queue.complete(stale)
+    assert queue.release([stale]) == 0
+    assert job_status(queue, fresh['id']) == 'running'
+
+
+def test_extend_lease_keeps_job_from_other_workers(queue):
+    queue.enqueue(1, 10, VIDEO, 'Title')
+    queue.lease_seconds = -1
+    job = queue.claim()
+
+    queue.lease_seconds = 600
+    assert queue.extend_lease([job]) == [job]
+    assert queue.claim() is None
+
+
+def test_retry_requeues_until_attempts_run_out(queue):
+    job_id = queue.enqueue(1, 10, VIDEO, 'Title')
+
+    job = queue.claim()
+    assert queue.retry(job, 'timeout', delay=0)
+    assert job['lease'] is None
+    assert job_status(queue, job_id) == 'queued'
+    # Завершённую попытку продлевать нечего
+    assert queue.extend_lease([job]) == []
+
+    job = queue.claim()
+    assert job['attempts'] == 2
+    assert not queue.retry(job, 'timeout', delay=0)
+    assert job_status(queue, job_id) == 'failed'
+    assert queue.claim() is None
+
+
+def test_retry_delay_postpones_claim(queue):
+    queue.enqueue(1, 10, VIDEO, 'Title')
+    queue.retry(queue.claim(), 'busy', delay=3600)
+
+    assert queue.claim() is None
+    assert queue.count_active() == 1
+
+
+def test_release_returns_jobs_without_spending_them(queue):
+    job_id = queue.enqueue(1, 10, VIDEO, 'Title')
+    job = queue.claim()
+
+    assert queue.release([job]) == 1
+    assert job_status(queue, job_id) == 'queued'
+    assert queue.claim()['id'] == job_id
+
+
+def test_known_video_ids(queue):
+    queue.enqueue(1, 10, VIDEO, 'Title')
+
+    assert queue.known_video_ids('YouTube', ['abc', 'xyz']) == {'abc'}
+    assert queue.known_video_ids('TikTok', ['abc']) == set()
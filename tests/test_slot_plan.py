@@ -0,0 +1,59 @@
+import random
+from datetime import datetime, timedelta
+
+from services.slot_plan import SlotPlanner, parse_posting_windows
+
+
+def baseline_slot(day: datetime, slot_number: int) -> int:
+    """
+    Время слота, как его считал PostScheduler до появления SlotPlanner
+    """
+    slot_minutes = [17, 42, 13, 51, 24, 38, 56]
+    random.seed(f"{day.year}{day.month}{day.day}{slot_number}")
+    random_offset = random.uniform(0, 0.5)
+    random.seed()
+
+    post_hour = max(8.0, min(21.9, 8 + slot_number * 2.0 + random_offset))
+    minute = slot_minutes[slot_number % len(slot_minutes)]
+    return int(datetime(day.year, day.month, day.day, int(post_hour), minute).timestamp())
+
+
+def test_default_plan_matches_baseline_timestamps():
+    planner = SlotPlanner(posts_per_day=7)
+    start = datetime(2026, 1, 1)
+
+    for offset in range(120):
+        day = start + timedelta(days=offset)
+        expected = sorted(baseline_slot(day, slot_number) for slot_number in range(7))
+        assert planner.get_day_plan(day) == expected, day.date()
+
+
+def test_plan_does_not_touch_global_random():
+    random.seed(42)
+    expected = random.random()
+
+    random.seed(42)
+    SlotPlanner(posts_per_day=7).get_day_plan(datetime(2026, 3, 1))
+
+    assert random.random() == expected
+
+
+def test_plan_fits_posting_window():
+    windows = parse_posting_windows('mon-fri=9-18;sat,sun=10:30-23')
+    planner = SlotPlanner(posts_per_day=12, windows=windows)
+
+    saturday = datetime(2026, 3, 7)
+    plan = planner.get_day_plan(saturday)
+
+    assert len(plan) == 12
+    assert plan == sorted(plan)
+    assert datetime.fromtimestamp(plan[0]) >= saturday.replace(hour=10, minute=30)
+    assert datetime.fromtimestamp(plan[-1]) < saturday.replace(hour=23)
+
+
+def test_plan_cache_is_bounded():
+    planner = SlotPlanner(horizon_days=5)
+    planner.warm_up(datetime(2026, 1, 1))
+    planner.get_day_plan(datetime(2026, 2, 1))
+
+    assert len(planner._plans) == 5
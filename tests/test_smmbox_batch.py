@@ -0,0 +1,99 @@
+import asyncio
+
+from services.retry_policy import CircuitOpenError
+from services.smmbox_api import AsyncSMMBoxAPI
+
+CONFLICT_MESSAGE = 'На это время запланирован другой пост'
+
+
+def make_entries(count):
+    return [{'group_id': 1, 'date': 1700000000 + index} for index in range(count)]
+
+
+def make_api(handler):
+    """
+    Клиент, у которого /posts/postpone отвечает handler(posts)
+    """
+    api = AsyncSMMBoxAPI(batch_size=10)
+    requests = []
+
+    async def request(method, path, payload=None, timeout=None):
+        requests.append([post['date'] for post in payload['posts']])
+        return handler(payload['posts'])
+
+    api._request = request
+    return api, requests
+
+
+def accept(posts):
+    return {'success': True, 'response': {'posts': [{'id': post['date']} for post in posts]}}
+
+
+def test_accepted_batch_maps_posts_in_order():
+    api, requests = make_api(accept)
+    entries = make_entries(3)
+
+    results = asyncio.run(api.postpone_posts(entries))
+
+    assert len(requests) == 1
+    assert [result['response']['posts'][0]['id'] for result in results] == [entry['date'] for entry in entries]
+    assert all(result['ok'] and result['sent'] for result in results)
+
+
+def test_rejected_batch_is_split_down_to_failing_post():
+    bad = 1700000002
+
+    def handler(posts):
+        if any(post['date'] == bad for post in posts):
+            return {'success': False, 'error': {'message': CONFLICT_MESSAGE}}
+        return accept(posts)
+
+    api, requests = make_api(handler)
+
+    results = asyncio.run(api.postpone_posts(make_entries(4)))
+
+    assert [result['ok'] for result in results] == [True, True, False, True]
+    assert results[2]['conflict'] and results[2]['sent']
+    assert requests[0] == [1700000000 + index for index in range(4)]
+
+
+def test_circuit_open_mid_split_keeps_accepted_posts():
+    calls = []
+
+    def handler(posts):
+        calls.append(posts)
+        if len(calls) == 1:
+            return {'success': False, 'error': {'message': 'Ошибка в одном из постов'}}
+        if len(calls) == 2:
+            return accept(posts)
+        raise CircuitOpenError(30)
+
+    api, _ = make_api(handler)
+
+    results = asyncio.run(api.postpone_posts(make_entries(4)))
+
+    assert [result['ok'] for result in results] == [True, True, False, False]
+    assert [result['sent'] for result in results] == [True, True, False, False]
+    assert results[3]['retry_after'] == 30
+
+
+def test_retryable_failure_marks_posts_unsent():
+    def handler(posts):
+        raise asyncio.TimeoutError()
+
+    api, requests = make_api(handler)
+
+    results = asyncio.run(api.postpone_posts(make_entries(3), max_retries=1))
+
+    # Недоступность SMMBox не повод делить пачку
+    assert len(requests) == 1
+    assert all(not result['ok'] and not result['sent'] for result in results)
+
+
+def test_unexpected_response_shape_is_a_failure():
+    api, _ = make_api(lambda posts: {'success': True, 'response': {'posts': [{'id': 1}]}})
+
+    results = asyncio.run(api.postpone_posts(make_entries(2)))
+
+    assert all(not result['ok'] and result['sent'] for result in results)
+    assert results[0]['error'] == 'неожиданный ответ SMMBox'
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from deep_translator.exceptions import NotValidLength
+
+from services.translation_backends import TranslationBackend, TranslationError, TranslatorChain
+
+
+class RacyClient:
+    """
+    Клиент как в deep-translator: текст запроса хранится в самом объекте
+    """
+
+    def __init__(self, source, target):
+        self._url_params = {}
+
+    def translate(self, text):
+        self._url_params['q'] = text
+        time.sleep(0.01)
+        return f"ru:{self._url_params['q']}"
+
+
+def test_concurrent_calls_do_not_share_client_state():
+    backend = TranslationBackend('racy', RacyClient)
+    titles = [f"title {index}" for index in range(8)]
+    barrier = threading.Barrier(len(titles))
+
+    def translate(title):
+        barrier.wait()
+        return backend.translate(title, 'en', 'ru')
+
+    with ThreadPoolExecutor(max_workers=len(titles)) as pool:
+        results = list(pool.map(translate, titles))
+
+    assert results == [f"ru:{title}" for title in titles]
+
+
+def test_client_is_reused_within_thread():
+    created = []
+
+    def factory(source, target):
+        created.append((source, target))
+        return RacyClient(source, target)
+
+    backend = TranslationBackend('racy', factory)
+    backend.translate('a', 'en', 'ru')
+    backend.translate('b', 'en', 'ru')
+    backend.translate('c', 'de', 'ru')
+
+    assert created == [('en', 'ru'), ('de', 'ru')]
+
+
+class EchoClient:
+    def __init__(self, source, target):
+        pass
+
+    def translate(self, text):
+        return f"ru:{text}"
+
+
+class FailingClient(EchoClient):
+    def translate(self, text):
+        raise ConnectionError('down')
+
+
+def test_chain_skips_backend_that_cannot_take_long_text():
+    calls = []
+
+    class CountingClient(EchoClient):
+        def translate(self, text):
+            calls.append(len(text))
+            return super().translate(text)
+
+    short = TranslationBackend('short', CountingClient, max_chars=500)
+    chain = TranslatorChain([TranslationBackend('down', FailingClient, max_failures=1), short], timeout=5)
+    try:
+        with pytest.raises(TranslationError):
+            chain.translate('x' * 600, 'en', 'ru')
+        assert chain.translate('x' * 10, 'en', 'ru') == 'ru:' + 'x' * 10
+    finally:
+        chain.shutdown()
+
+    assert calls == [10]
+    assert short.consecutive_failures == 0 and not short.is_demoted()
+
+
+def test_length_validation_error_is_not_a_backend_failure():
+    class ValidatingClient(EchoClient):
+        def translate(self, text):
+            raise NotValidLength(text, 0, 500)
+
+    backend = TranslationBackend('mymemory', ValidatingClient, max_failures=1)
+
+    with pytest.raises(NotValidLength):
+        backend.translate('x' * 600, 'en', 'ru')
+    assert not backend.is_demoted()
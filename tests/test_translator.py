@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from config import EXECUTOR_LIMITS
+from services.executor import BlockingExecutor
+from services.translation_backends import TranslationBackend, TranslatorChain
+from services.translator import Translator
+
+
+class RacyClient:
+    """
+    Клиент как в deep-translator: текст запроса хранится в самом объекте
+    """
+
+    def __init__(self, source, target):
+        self._url_params = {}
+
+    def translate(self, text):
+        self._url_params['q'] = text
+        time.sleep(0.01)
+        return f"ru:{self._url_params['q']}"
+
+
+def test_parallel_translations_through_executor_keep_their_texts():
+    chain = TranslatorChain([TranslationBackend('racy', RacyClient)], hedge_delay=5, timeout=5)
+    translator = Translator(chain=chain)
+    executor = BlockingExecutor()
+    titles = [f"Funny cat video number {index}" for index in range(EXECUTOR_LIMITS['translate'] * 2)]
+
+    async def main():
+        return await asyncio.gather(
+            *(executor.run('translate', translator.translate_to_russian, title) for title in titles)
+        )
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        executor.shutdown()
+        chain.shutdown()
+
+    assert results == [f"ru:{title}" for title in titles]